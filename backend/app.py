@@ -1,10 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from config import Config
+from utils.cache import TTLCache
+from utils.serialization import FastJSONProvider
+from utils.passwords import password_hasher
+from utils.metrics import metrics
 
 # Initialize extensions
 db = SQLAlchemy()
@@ -15,14 +19,28 @@ migrate = Migrate()
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
     
     # Simple CORS setup with default settings
     CORS(app)
     
-    # Initialize extensions with app
+    # Initialize extensions with app (metrics first: it picks the engine's pool class)
+    metrics.init_app(app)
     db.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
+    password_hasher.init_app(app)
+    
+    # Per-worker caches
+    app.extensions['membership_cache'] = TTLCache(
+        maxsize=app.config['MEMBERSHIP_CACHE_SIZE'],
+        ttl=app.config['MEMBERSHIP_CACHE_TTL']
+    )
+    app.extensions['profile_cache'] = TTLCache(
+        maxsize=app.config['PROFILE_CACHE_SIZE'],
+        ttl=app.config['PROFILE_CACHE_TTL']
+    )
+    app.extensions['profile_versions'] = {}
     
     # Import and register blueprints
     from routes.auth_routes import auth_bp
@@ -35,23 +53,62 @@ def create_app(config_class=Config):
     app.register_blueprint(message_bp, url_prefix='/api/messages')
     app.register_blueprint(user_bp, url_prefix='/api/users')
     
-    # Initialize Socket.IO
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='gevent')
+    from services.membership_service import MembershipService
+    from services.profile_service import ProfileService
+    
+    metrics.track_cache('membership', MembershipService.get_cache_stats)
+    metrics.track_cache('profile', ProfileService.get_cache_stats)
+    
+    # Initialize Socket.IO, sharing emits across processes through the message queue;
+    # packets use the same JSON codec as HTTP responses
+    from sockets.message_queue import get_message_queue_options
+    
+    socketio.init_app(app, cors_allowed_origins="*", async_mode='gevent', json=app.json.codec,
+                      **get_message_queue_options(app, json=app.json.codec))
     
     # Import socket event handlers
     from sockets.connection import register_connection_events
     from sockets.channel_events import register_channel_events
     from sockets.message_events import register_message_events
+    from sockets.typing import typing_aggregator
+    from sockets.presence import presence_tracker
+    
+    typing_aggregator.init_app(app, socketio)
+    presence_tracker.init_app(app, socketio)
     
     # Register socket events
     register_connection_events(socketio)
     register_channel_events(socketio)
     register_message_events(socketio)
+    metrics.init_socketio(socketio)
+    
+    # Register CLI commands
+    from commands.query_plans import check_query_plans_command
+    from commands.query_budgets import check_query_budgets_command
+    from commands.benchmark_json import benchmark_json_command
+    from commands.benchmark_search import benchmark_search_command
+    from commands.benchmark_hashing import benchmark_hashing_command
+    from commands.export_messages import export_messages_command
+    from commands.seed import seed_command, import_command
+    
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(check_query_budgets_command)
+    app.cli.add_command(benchmark_json_command)
+    app.cli.add_command(benchmark_search_command)
+    app.cli.add_command(benchmark_hashing_command)
+    app.cli.add_command(export_messages_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(import_command)
     
     @app.route('/api/health')
     def health_check():
         return {'status': 'healthy'}
     
+    @app.route('/metrics')
+    def metrics_endpoint():
+        body, content_type = metrics.export()
+        return Response(body, content_type=content_type)
+    
     # Add a special handler for OPTIONS requests which browsers send for CORS preflight
     @app.route('/', defaults={'path': ''}, methods=['OPTIONS'])
     @app.route('/<path:path>', methods=['OPTIONS'])
@@ -0,0 +1,72 @@
+import statistics
+import time
+import bcrypt
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from utils.passwords import PasswordHasher
+
+# How often the probe greenlet asks to be woken up (seconds)
+PROBE_INTERVAL = 0.005
+
+
+def _measure(gevent, logins, login):
+    """Run `logins` concurrent login greenlets and return how late the hub woke a probe greenlet (ms)."""
+    delays = []
+    running = [True]
+
+    def probe():
+        while running[0]:
+            started = time.perf_counter()
+            gevent.sleep(PROBE_INTERVAL)
+            delays.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+    prober = gevent.spawn(probe)
+    gevent.sleep(0.05)  # Baseline samples before the logins start
+
+    started = time.perf_counter()
+    gevent.joinall([gevent.spawn(login) for _ in range(logins)], raise_error=True)
+    elapsed = time.perf_counter() - started
+
+    running[0] = False
+    prober.join()
+    return delays, elapsed
+
+
+@click.command('benchmark-hashing')
+@click.option('--logins', default=20, show_default=True, help='Concurrent logins per run.')
+@click.option('--rounds', type=int, help='bcrypt cost factor (defaults to BCRYPT_ROUNDS).')
+@with_appcontext
+def benchmark_hashing_command(logins, rounds):
+    """Show event-loop (gevent hub) latency while logins hash passwords.
+
+    Runs the same burst of concurrent password verifications twice on a
+    gevent hub: once calling bcrypt inline, as a request handler would
+    without the pool, and once through PasswordHasher. A probe greenlet
+    sleeping in a loop records how late it is woken, which is how long every
+    other socket on a worker would stall.
+    """
+    try:
+        import gevent
+    except ImportError:
+        raise click.ClickException('gevent is required to measure hub latency')
+
+    rounds = rounds or current_app.config['BCRYPT_ROUNDS']
+    hasher = PasswordHasher(
+        rounds=rounds,
+        threads=current_app.config['PASSWORD_HASH_THREADS'],
+        queue_size=max(current_app.config['PASSWORD_HASH_QUEUE_SIZE'], logins),
+        use_gevent=True
+    )
+    password_hash = hasher.hash('correct horse battery staple')
+
+    runs = [
+        ('inline bcrypt', lambda: bcrypt.checkpw(b'correct horse battery staple', password_hash.encode('utf-8'))),
+        ('hashing pool', lambda: hasher.verify('correct horse battery staple', password_hash)),
+    ]
+
+    click.echo(f'{logins} concurrent logins, bcrypt cost {rounds}, {hasher.threads} hashing threads')
+    for name, login in runs:
+        delays, elapsed = _measure(gevent, logins, login)
+        click.echo(f'{name:<14} hub delay median {statistics.median(delays):7.1f} ms  '
+                   f'max {max(delays):7.1f} ms  (burst took {elapsed:.2f}s)')
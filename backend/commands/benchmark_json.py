@@ -0,0 +1,88 @@
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask.json.provider import DefaultJSONProvider
+from models.message import Message
+from models.user import User
+from utils.serialization import OrjsonCodec, StdlibCodec, orjson
+
+
+def _history_page(size):
+    """Build an in-memory history page: messages with senders and reaction summaries."""
+    now = datetime.utcnow()
+    senders = [
+        User(id=i, username=f'user{i}', email=f'user{i}@example.com', display_name=f'User {i}',
+             avatar_url=None, status='online', created_at=now - timedelta(days=30), last_active=now)
+        for i in range(1, 11)
+    ]
+    messages = [
+        Message(id=i, content=f'Message number {i} with some realistic text in it ✓',
+                sender_id=senders[i % 10].id, channel_id=1, created_at=now - timedelta(seconds=size - i),
+                updated_at=None, is_edited=False)
+        for i in range(size)
+    ]
+    reactions = [{'emoji': '👍', 'count': 3, 'me': True}, {'emoji': '🎉', 'count': 1, 'me': False}]
+    return messages, {sender.id: sender for sender in senders}, reactions
+
+
+def _serialize(messages, senders, reactions):
+    # Same shape as HydrationService.hydrate_messages
+    message_list = []
+    for message in messages:
+        message_data = message.to_dict(reactions=reactions)
+        message_data['sender'] = senders[message.sender_id].to_dict()
+        message_list.append(message_data)
+    return {'success': True, 'messages': message_list, 'next_cursor': 'abc', 'has_more': True}
+
+
+def _stringify_datetimes(data):
+    # What to_dict used to do itself: isoformat() + 'Z' on every timestamp
+    if isinstance(data, dict):
+        return {key: _stringify_datetimes(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_stringify_datetimes(value) for value in data]
+    if isinstance(data, datetime):
+        return data.isoformat() + 'Z'
+    return data
+
+
+def _measure(encode, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode()
+    return iterations / (time.perf_counter() - start)
+
+
+@click.command('benchmark-json')
+@click.option('--page-size', default=50, show_default=True, help='Messages per history page.')
+@click.option('--iterations', default=2000, show_default=True, help='Pages encoded per variant.')
+@with_appcontext
+def benchmark_json_command(page_size, iterations):
+    """Compare history-page encoding throughput: stdlib jsonify path vs the JSON codecs."""
+    messages, senders, reactions = _history_page(page_size)
+    flask_default = DefaultJSONProvider(current_app._get_current_object())
+
+    variants = [
+        ('before: isoformat strings + Flask default provider',
+         lambda: flask_default.dumps(_stringify_datetimes(_serialize(messages, senders, reactions)))),
+        ('stdlib codec', lambda: StdlibCodec.dumps(_serialize(messages, senders, reactions))),
+    ]
+    if orjson is not None:
+        variants.append(('orjson codec', lambda: OrjsonCodec.dumps(_serialize(messages, senders, reactions))))
+
+    # Both codecs must produce identical output for the same page
+    if orjson is not None:
+        page = _serialize(messages, senders, reactions)
+        if StdlibCodec.loads(StdlibCodec.dumps(page)) != OrjsonCodec.loads(OrjsonCodec.dumps(page)):
+            raise click.ClickException('stdlib and orjson codecs disagree on the encoded page')
+
+    click.echo(f'Encoding {iterations} history pages of {page_size} messages '
+               f'(active codec: {current_app.json.codec.name})')
+
+    baseline = None
+    for name, encode in variants:
+        rate = _measure(encode, iterations)
+        baseline = baseline or rate
+        click.echo(f'{name:<52} {rate:10.0f} pages/s  {rate / baseline:5.2f}x')
@@ -0,0 +1,78 @@
+import statistics
+import time
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from commands.query_plans import first_chat, first_user
+from commands.seed import RARE_WORD, Population, load_population, rolled_back_session
+from utils.passwords import password_hasher
+
+
+def _seed(connection, messages):
+    population = Population(1, users=5000, channels=200, direct_chats=2000, messages=messages, days=365,
+                            password_hash=password_hasher.hash('password123'))
+    load_population(connection, population)
+    return population
+
+
+def _scenarios(population):
+    from services.search_service import SearchService
+
+    # The searcher is in the busiest channel, whose second member is one of its most active senders
+    user_id = first_user(population)
+    channel_id = population.channel_id(0)
+    chat_id = first_chat(population)
+    sender_id = population.channel_member(0, 1)
+
+    def search(query, **filters):
+        return lambda: SearchService.search_messages(user_id, query, **filters)
+
+    def second_page(query, **filters):
+        def run():
+            result, _ = SearchService.search_messages(user_id, query, **filters)
+            return SearchService.search_messages(user_id, query, cursor=result['next_cursor'], **filters)
+        return run
+
+    return [
+        ('common term', search('deploy')),
+        ('two terms', search('deploy rollback')),
+        ('rare term', search(RARE_WORD)),
+        ('phrase', search('"deploy release"')),
+        ('prefix', search('deplo*')),
+        ('common term, by relevance', search('deploy', sort='relevance')),
+        ('common term, second page', second_page('deploy')),
+        ('common term in one channel', search('deploy', channel_id=channel_id)),
+        ('common term in one DM', search('deploy', chat_id=chat_id)),
+        ('common term by sender', search('deploy', sender_id=sender_id)),
+        ('common term, last day', search('deploy', after=(datetime.utcnow() - timedelta(days=1)).isoformat())),
+    ]
+
+
+@click.command('benchmark-search')
+@click.option('--messages', default=1000000, show_default=True, help='Messages to seed.')
+@click.option('--runs', default=5, show_default=True, help='Timed runs per scenario (after one warm-up).')
+@with_appcontext
+def benchmark_search_command(messages, runs):
+    """Seed a large message corpus and time /api/messages/search queries against it.
+
+    Everything happens in one transaction that is rolled back at the end.
+    """
+    with rolled_back_session() as connection:
+        click.echo(f'Seeding {messages} messages (this takes a while)...')
+        started = time.perf_counter()
+        population = _seed(connection, messages)
+        click.echo(f'Seeded in {time.perf_counter() - started:.0f}s')
+
+        for name, call in _scenarios(population):
+            result, status_code = call()  # Warm-up
+            if status_code != 200:
+                raise click.ClickException(f'{name}: {result["message"]}')
+
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - started) * 1000)
+
+            click.echo(f'{name:<32} median {statistics.median(timings):8.1f} ms  '
+                       f'max {max(timings):8.1f} ms  ({len(result["messages"])} results)')
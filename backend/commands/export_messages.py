@@ -0,0 +1,31 @@
+import click
+from flask.cli import with_appcontext
+from services.export_service import ExportService
+
+
+@click.command('export-messages')
+@click.option('--channel-id', type=int, help='Channel to export.')
+@click.option('--chat-id', type=int, help='DM chat to export.')
+@click.option('--after-id', type=int, help='Resume after this message id (the last line of a partial export).')
+@click.option('--gzip', 'compress', is_flag=True, help='gzip the output (implied by a .gz output file).')
+@click.option('--output', '-o', type=click.Path(allow_dash=True), default='-', show_default=True,
+              help='File to write; - for stdout.')
+@with_appcontext
+def export_messages_command(channel_id, chat_id, after_id, compress, output):
+    """Export a channel's or DM chat's history as NDJSON, one message per line.
+
+    Streams through a server-side cursor, so memory use is constant. To
+    resume an interrupted export, pass the id on its last complete line as
+    --after-id and append to the file (for gzip, each run adds a gzip member,
+    which gunzip reads as one stream).
+    """
+    if (channel_id is None) == (chat_id is None):
+        raise click.UsageError('Pass exactly one of --channel-id or --chat-id')
+
+    compress = compress or output.endswith('.gz')
+    mode = 'ab' if after_id else 'wb'
+
+    with click.open_file(output, mode) as out:
+        for chunk in ExportService.stream(channel_id=channel_id, chat_id=chat_id, after_id=after_id,
+                                          compress=compress):
+            out.write(chunk)
@@ -0,0 +1,244 @@
+import statistics
+import time
+from contextlib import contextmanager
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from commands.query_plans import first_chat, first_user, seed_dataset, user_in_direct_chats
+from commands.seed import rolled_back_session
+from models.message import Message
+from services.channel_service import ChannelService
+from services.message_service import MessageService
+from services.read_state_service import ReadStateService
+from app import db
+
+# History and batch calls are checked at each of these sizes against the same budget
+PAGE_SIZES = (10, 50, 100)
+
+# The DM list is checked for users in at least this many chats against the same budget
+DIRECT_CHAT_COUNTS = (1, 10, 50)
+
+# Savepoints come from the check's own rolled-back transaction, not from the services
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryCounter:
+    """Counts the SQL statements run on the engine, and the time spent in them, while active."""
+
+    def __init__(self):
+        self.statements = []
+        self.db_time = 0.0
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_budget_started', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_budget_started'].pop()
+
+        if not statement.lstrip().upper().startswith(IGNORED_PREFIXES):
+            self.statements.append(statement)
+            self.db_time += elapsed
+
+    @contextmanager
+    def active(self):
+        event.listen(db.engine, 'before_cursor_execute', self._before)
+        event.listen(db.engine, 'after_cursor_execute', self._after)
+        try:
+            yield self
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', self._before)
+            event.remove(db.engine, 'after_cursor_execute', self._after)
+
+
+def clear_caches():
+    current_app.extensions['membership_cache'].clear()
+    current_app.extensions['profile_cache'].clear()
+
+
+def _history(get, target, per_page):
+    def prepare(population):
+        target_id = target(population)
+        return lambda: get(target_id, first_user(population), per_page=per_page, before='')
+    return prepare
+
+
+def _scrollback(per_page):
+    # The budget covers the second page; the first only provides its cursor
+    def prepare(population):
+        channel_id, user_id = population.channel_id(0), first_user(population)
+        result, _ = MessageService.get_channel_messages(channel_id, user_id, per_page=per_page, before='')
+        return lambda: MessageService.get_channel_messages(channel_id, user_id, per_page=per_page,
+                                                           before=result['next_cursor'])
+    return prepare
+
+
+def _send_batch(size):
+    def prepare(population):
+        channel_id, chat_id = population.channel_id(0), first_chat(population)
+        return lambda: MessageService.send_message_batch(first_user(population), [
+            {'channel_id': channel_id, 'content': f'budget {i}'} if i % 2 else
+            {'chat_id': chat_id, 'content': f'budget {i}'}
+            for i in range(size)
+        ])
+    return prepare
+
+
+def _add_and_remove_reaction(population):
+    user_id = population.user_id(1)
+    message_id = db.session.query(Message.id).filter_by(channel_id=population.channel_id(0)) \
+        .order_by(Message.id.desc()).limit(1).scalar()
+
+    def call():
+        result, status = MessageService.add_reaction(user_id, message_id, 'tada')
+        if status >= 300:
+            return result, status
+        return MessageService.remove_reaction(user_id, message_id, 'tada')
+    return call
+
+
+def _mark_channel_read(population):
+    # An internal helper, not a service response; it returns the new cursor position,
+    # or None when the seeded cursor is already at the latest message
+    def call():
+        read_id = ReadStateService.mark_read(first_user(population), channel_id=population.channel_id(0))
+        return {'last_read_message_id': read_id}, 200
+    return call
+
+
+def _create_direct_message(population):
+    partners = {user for pair in population.direct_chats if 0 in pair for user in pair}
+    recipient_id = population.user_id(next(user for user in range(1, population.users) if user not in partners))
+    return lambda: ChannelService.create_direct_message(first_user(population), recipient_id)
+
+
+def _user_direct_messages(count):
+    def prepare(population):
+        user_id = user_in_direct_chats(population, count)
+        return lambda: ChannelService.get_user_direct_messages(user_id)
+    return prepare
+
+
+# (name, max queries, prepare) for each hot service call, counted with cold per-worker caches.
+# prepare takes the seeded Population and returns the call, which returns the service's
+# (result, status) response; only the call is counted. The membership and profile cache
+# misses are two of each history budget; with warm caches a page of channel history is
+# four queries (channel, messages, reactions, read cursor), and a DM page adds the
+# notifications update.
+BUDGETS = [
+    *((f'channel history (per_page={per_page})', 6,
+       _history(MessageService.get_channel_messages, lambda population: population.channel_id(0), per_page))
+      for per_page in PAGE_SIZES),
+    *((f'channel scrollback (per_page={per_page})', 6, _scrollback(per_page)) for per_page in PAGE_SIZES),
+    *((f'direct history (per_page={per_page})', 7,
+       _history(MessageService.get_direct_messages, first_chat, per_page))
+      for per_page in PAGE_SIZES),
+    *((f'send batch ({size} messages)', 9, _send_batch(size)) for size in PAGE_SIZES),
+    ('send channel message', 5, lambda population:
+        lambda: MessageService.send_channel_message(first_user(population), population.channel_id(0), 'budget')),
+    ('send direct message', 7, lambda population:
+        lambda: MessageService.send_direct_message(first_user(population), first_chat(population), 'budget')),
+    ('add and remove reaction', 13, _add_and_remove_reaction),
+    ('mark channel read', 1, _mark_channel_read),
+    ('unread counts', 2, lambda population: lambda: ReadStateService.get_unread_counts(first_user(population))),
+    ('get channel', 2, lambda population:
+        lambda: ChannelService.get_channel(population.channel_id(0), first_user(population))),
+    ('user channels', 2, lambda population: lambda: ChannelService.get_user_channels(first_user(population))),
+    *((f'user direct messages ({count}+ chats)', 3, _user_direct_messages(count)) for count in DIRECT_CHAT_COUNTS),
+    ('direct message inbox', 4, lambda population:
+        lambda: ChannelService.get_direct_message_inbox(first_user(population))),
+    ('create direct message', 8, _create_direct_message),
+]
+
+
+class CallFailed(Exception):
+    """A budgeted call returned an error, so its query count says nothing about the success path."""
+
+
+def measure(call):
+    """Run call, counting its statements; returns (QueryCounter, wall seconds)."""
+    counter = QueryCounter()
+    started = time.perf_counter()
+
+    with counter.active():
+        result, status = call()
+
+    # Batch sends succeed as a whole even when some of their messages fail
+    if status >= 300 or not result.get('success', True) or result.get('failed'):
+        raise CallFailed(f'returned {status}: {result.get("message") or result}')
+
+    return counter, time.perf_counter() - started
+
+
+@click.command('check-query-budgets')
+@click.option('--scale', default=0.1, show_default=True, help='Multiplier for the seeded dataset size.')
+@click.option('--max-db-ms', type=float, help='Also fail any call that spends longer than this in the database.')
+@click.option('--benchmark', 'runs', type=int, default=0,
+              help='Instead of checking budgets, time each call this many times with warm caches.')
+@click.option('--verbose', '-v', is_flag=True, help='Print the statements of calls over budget.')
+@with_appcontext
+def check_query_budgets_command(scale, max_db_ms, runs, verbose):
+    """Check the number of SQL statements each hot service call runs.
+
+    The same check as tests/test_query_budgets.py, against the app's
+    database: seeds the plan-check dataset, runs each call once with the
+    per-worker caches cleared and exits non-zero if any of them returns an
+    error or runs more statements than its budget. Budgets hold for every
+    page, batch and DM list size, so an N+1 pattern fails the check before
+    it reaches production. Everything happens in one transaction that is
+    rolled back at the end.
+    """
+    failures = []
+
+    with rolled_back_session() as connection:
+        click.echo(f'Seeding budget-check dataset (scale={scale})...')
+        population = seed_dataset(connection, scale)
+
+        for name, budget, prepare in BUDGETS:
+            # Each call runs in a savepoint of its own, so one call's writes don't change the next one's work
+            savepoint = connection.begin_nested()
+            try:
+                call = prepare(population)
+                if runs:
+                    measure(call)  # warm the caches
+                    samples = [measure(call) for _ in range(runs)]
+                else:
+                    clear_caches()
+                    counter, elapsed = measure(call)
+            except CallFailed as e:
+                failures.append(name)
+                click.echo(f'FAIL  {name}: {e}')
+                continue
+            finally:
+                db.session.remove()
+                savepoint.rollback()
+
+            if runs:
+                wall = sorted(elapsed for _, elapsed in samples)
+                db_time = [counter.db_time for counter, _ in samples]
+                p95 = wall[min(len(wall) - 1, int(len(wall) * 0.95))]
+                click.echo(f'{name:<40} {len(samples[-1][0].statements):>3} queries  '
+                           f'p50 {statistics.median(wall) * 1000:8.2f} ms  p95 {p95 * 1000:8.2f} ms  '
+                           f'db p50 {statistics.median(db_time) * 1000:8.2f} ms')
+                continue
+
+            queries = len(counter.statements)
+            db_ms = counter.db_time * 1000
+
+            problems = []
+            if queries > budget:
+                problems.append(f'{queries} queries, budget {budget}')
+            if max_db_ms is not None and db_ms > max_db_ms:
+                problems.append(f'{db_ms:.1f} ms in the database, budget {max_db_ms:g} ms')
+
+            if problems:
+                failures.append(name)
+                click.echo(f'FAIL  {name}: {"; ".join(problems)}')
+                if verbose:
+                    for statement in counter.statements:
+                        click.echo('        ' + ' '.join(statement.split())[:160])
+            else:
+                click.echo(f'ok    {name} ({queries}/{budget} queries, {db_ms:.1f} ms db, {elapsed * 1000:.1f} ms total)')
+
+    if failures:
+        raise click.ClickException(f'{len(failures)} service call(s) failed or went over budget')
@@ -0,0 +1,161 @@
+from collections import Counter
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from commands.seed import Population, load_population, rolled_back_session
+from services.channel_service import ChannelService
+from services.message_service import MessageService
+from services.read_state_service import ReadStateService
+from services.search_service import SearchService
+from services.user_service import UserService
+from utils.passwords import password_hasher
+from app import db
+
+# Dataset the plan and budget checks generate with the `flask seed` generators inside
+# their transaction (multiplied by --scale)
+SEED_SIZES = {
+    'users': 20000,
+    'channels': 200,
+    'direct_chats': 10000,
+    'messages': 300000,
+}
+SEED_DAYS = 90
+
+
+def seed_dataset(connection, scale):
+    """Load the check dataset over `connection` (see load_population) and return its Population."""
+    sizes = {name: max(int(size * scale), 2) for name, size in SEED_SIZES.items()}
+    population = Population(1, days=SEED_DAYS, password_hash=password_hasher.hash('password123'), **sizes)
+    load_population(connection, population)
+    return population
+
+
+def first_user(population):
+    """The first user is in the everyone channel and, being the likeliest to start a DM, in many DM chats."""
+    return population.user_id(0)
+
+
+def first_chat(population):
+    """A DM chat of first_user."""
+    return population.chat_id(next(index for index, pair in enumerate(population.direct_chats) if 0 in pair))
+
+
+def user_in_direct_chats(population, count):
+    """The user with the fewest DM chats among those with at least `count`."""
+    chats = Counter(user for pair in population.direct_chats for user in pair)
+    _, index = min((chat_count, user) for user, chat_count in chats.items() if chat_count >= count)
+    return population.user_id(index)
+
+
+def _deep_scrollback(population):
+    channel_id, user_id = population.channel_id(0), first_user(population)
+    result, _ = MessageService.get_channel_messages(channel_id, user_id, before='')
+    return MessageService.get_channel_messages(channel_id, user_id, before=result['next_cursor'])
+
+
+# (name, call) for each hot service path; calls take the seeded Population. History is
+# read the way the frontend reads it, with cursors (page mode counts the whole channel).
+# The DM lists belong to a user with a typical number of chats: for first_user, in a
+# few percent of all chats, hashing the whole chats table is the right plan.
+SCENARIOS = [
+    ('channel history', lambda population:
+        MessageService.get_channel_messages(population.channel_id(0), first_user(population), before='')),
+    ('channel history (scrollback)', _deep_scrollback),
+    ('direct message history', lambda population:
+        MessageService.get_direct_messages(first_chat(population), first_user(population), before='')),
+    ('unread counts', lambda population: ReadStateService.get_unread_counts(first_user(population))),
+    ('user channels', lambda population: ChannelService.get_user_channels(first_user(population))),
+    ('user direct messages', lambda population:
+        ChannelService.get_user_direct_messages(user_in_direct_chats(population, 10))),
+    ('direct message inbox', lambda population:
+        ChannelService.get_direct_message_inbox(user_in_direct_chats(population, 10))),
+    ('user directory', lambda population: UserService.list_directory()),
+    ('user typeahead', lambda population: UserService.typeahead('user_12')),
+    ('user search', lambda population: UserService.search('user_12')),
+    ('message search', lambda population: SearchService.search_messages(first_user(population), 'deploy release')),
+]
+
+# Served by pg_trgm indexes, so they can only avoid a sequential scan where the extension is installed
+TRIGRAM_SCENARIOS = {'user typeahead', 'user search'}
+
+
+def trigram_indexes_available(connection):
+    return bool(connection.exec_driver_sql("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").scalar())
+
+
+def large_tables(connection, min_rows):
+    return {
+        name for name, rows in connection.exec_driver_sql(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+        ) if rows >= min_rows
+    }
+
+
+def _sequential_scans(plan, large_tables):
+    """Yield relation names that the plan reads with a sequential scan."""
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in large_tables:
+        yield plan['Relation Name']
+
+    for child in plan.get('Plans', []):
+        yield from _sequential_scans(child, large_tables)
+
+
+def explain_call(connection, call, large_tables):
+    """Run call, EXPLAIN every SELECT it issued and return (queries, large tables scanned sequentially)."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        call()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    scanned = set()
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        scanned.update(_sequential_scans(plan[0]['Plan'], large_tables))
+
+    return len(statements), scanned
+
+
+@click.command('check-query-plans')
+@click.option('--scale', default=1.0, show_default=True, help='Multiplier for the seeded dataset size.')
+@click.option('--min-rows', default=10000, show_default=True,
+              help='Only flag sequential scans on tables with at least this many rows.')
+@with_appcontext
+def check_query_plans_command(scale, min_rows):
+    """EXPLAIN the hot service queries on a large seeded dataset.
+
+    The same check as tests/test_query_plans.py, against the app's database:
+    seeds the check dataset, runs each hot service call, EXPLAINs every
+    SELECT it issues and exits non-zero if any of them sequentially scans a
+    large table. Everything happens in one transaction that is rolled back
+    at the end.
+    """
+    failures = []
+
+    with rolled_back_session() as connection:
+        click.echo(f'Seeding plan-check dataset (scale={scale})...')
+        population = seed_dataset(connection, scale)
+        tables = large_tables(connection, min_rows)
+        trigrams = trigram_indexes_available(connection)
+
+        for name, call in SCENARIOS:
+            if name in TRIGRAM_SCENARIOS and not trigrams:
+                click.echo(f'skip  {name}: pg_trgm is not installed')
+                continue
+
+            queries, scanned = explain_call(connection, lambda: call(population), tables)
+
+            if scanned:
+                failures.append(name)
+                click.echo(f'FAIL  {name}: sequential scan on {", ".join(sorted(scanned))}')
+            else:
+                click.echo(f'ok    {name} ({queries} queries)')
+
+    if failures:
+        raise click.ClickException(f'{len(failures)} hot query path(s) fell back to a sequential scan')
@@ -0,0 +1,508 @@
+import bisect
+import csv
+import gzip
+import io
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from sqlalchemy.orm import scoped_session, sessionmaker
+from models.channel import DirectMessageChat
+from utils.passwords import password_hasher
+from app import db
+
+# Tables in foreign key order; `flask import` loads <table>.csv files in this order
+LOAD_ORDER = ['users', 'channels', 'channel_members', 'direct_message_chats', 'direct_message_participants',
+              'messages', 'message_reactions', 'message_reaction_counts', 'read_cursors', 'notifications']
+
+# Skew of the generated data. Channel sizes fall off as users / rank**CHANNEL_SIZE_EXPONENT,
+# so the first channel has everyone and a long tail of channels has a handful of members.
+# Channels, DM chats, senders within a channel and message lengths are all drawn from
+# Zipf-like distributions (see _zipf), so a few of each do most of the talking.
+CHANNEL_SIZE_EXPONENT = 1.1
+DIRECT_MESSAGE_SHARE = 0.1
+REACTION_RATE = 0.15
+PRIVATE_CHANNEL_SHARE = 0.2
+
+CHANNEL_NAMES = ['general', 'random', 'announcements']
+FIRST_NAMES = ['Ada', 'Ben', 'Chen', 'Dana', 'Eli', 'Fatima', 'Goran', 'Hana', 'Ivan', 'Jia',
+               'Kofi', 'Lena', 'Marco', 'Noor', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sven', 'Tariq']
+LAST_NAMES = ['Adams', 'Brown', 'Cohen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jones',
+              'Kim', 'Levi', 'Moreau', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Weber']
+EMOJI = ['thumbsup', 'heart', 'joy', 'tada', 'eyes', 'rocket', 'pray', 'fire']
+
+# Message bodies are drawn from this vocabulary; RARE_WORD is added to about one
+# message in 10000 so rare-term searches can be measured too
+VOCABULARY = (
+    'deploy deployment release build pipeline staging production rollback hotfix merge '
+    'review branch commit test flaky coverage incident outage alert pager latency '
+    'database index query migration schema backup replica cache redis queue worker '
+    'customer ticket escalation invoice billing refund contract renewal pricing demo '
+    'meeting standup retro planning roadmap sprint estimate deadline blocker priority '
+    'lunch coffee weekend holiday vacation birthday team office remote onboarding '
+    'design mockup feedback prototype frontend backend mobile android ios browser '
+    'security password token login session permission audit compliance privacy encryption'
+).split()
+RARE_WORD = 'zephyr'
+RARE_WORD_RATE = 0.0001
+
+
+def _zipf(rng, n):
+    """Draw from 0..n-1 with P(k) roughly proportional to 1 / (k + 1)."""
+    # (n + 1) ** u falls in [1, n + 1), so every k, n - 1 included, can be drawn
+    return min(int((n + 1) ** rng.random()), n) - 1
+
+
+def _copy(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    # In CSV format an unquoted empty field is NULL, which is how csv writes None
+    cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def _load(engine, task):
+    """Run one load task: COPY each (table, columns, rows) it yields in a single transaction."""
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for table, columns, rows in task():
+            _copy(cursor, table, columns, rows)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _run_batches(workers, tasks):
+    """Run load tasks on `workers` connections in parallel, keeping a bounded number in flight.
+
+    Tasks generate their rows when they run, so memory holds at most a couple
+    of batches per worker however large the load is.
+    """
+    engine = db.engine  # Looked up here: the pool's threads have no app context
+
+    with ThreadPoolExecutor(workers) as pool:
+        pending = set()
+        for task in tasks:
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(pool.submit(_load, engine, task))
+
+        for future in pending:
+            future.result()
+
+
+def _execute_in_parallel(workers, statements):
+    engine = db.engine
+
+    def run(statement):
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SET maintenance_work_mem = '256MB'")
+            cursor.execute(statement)
+            connection.commit()
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(run, statements))
+
+
+@contextmanager
+def _indexes_dropped(tables, workers):
+    """Drop the plain secondary indexes of tables for the block and rebuild them afterwards.
+
+    Loading into unindexed tables and building each index once is much faster
+    than maintaining them row by row. Primary keys and unique indexes stay, so
+    the load is still checked for duplicates. Indexes are rebuilt (in
+    parallel) even if the load fails.
+    """
+    indexes = db.session.execute(text("""
+        SELECT index_class.relname, pg_get_indexdef(index_class.oid)
+        FROM pg_index
+        JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+        JOIN pg_class table_class ON table_class.oid = pg_index.indrelid
+        WHERE table_class.relname = ANY(:tables) AND NOT pg_index.indisunique
+          AND table_class.relnamespace = 'public'::regnamespace
+    """), {'tables': list(tables)}).all()
+
+    for name, _ in indexes:
+        db.session.execute(text(f'DROP INDEX "{name}"'))
+    db.session.commit()
+
+    try:
+        yield
+    finally:
+        click.echo(f'Rebuilding {len(indexes)} indexes...')
+        started = time.perf_counter()
+        try:
+            _execute_in_parallel(workers, [definition for _, definition in indexes])
+        except Exception:
+            # Leave the operator what they need to finish by hand
+            click.echo('Index rebuild failed; recreate any of these that are missing:', err=True)
+            for _, definition in indexes:
+                click.echo(f'  {definition};', err=True)
+            raise
+        click.echo(f'Indexes rebuilt in {time.perf_counter() - started:.0f}s')
+
+
+def _reset_sequences(tables):
+    """Move id sequences past the loaded rows."""
+    for table in tables:
+        if 'id' in db.metadata.tables[table].c:
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+            ))
+    db.session.commit()
+
+
+def _analyze(tables):
+    connection = db.engine.raw_connection()
+    try:
+        connection.cursor().execute(f'ANALYZE {", ".join(tables)}')
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _finish(tables):
+    """Move id sequences past the loaded rows and refresh planner statistics."""
+    _reset_sequences(tables)
+    _analyze(tables)
+
+
+def _timed(label, function, *args):
+    click.echo(f'{label}...')
+    started = time.perf_counter()
+    function(*args)
+    click.echo(f'{label} took {time.perf_counter() - started:.0f}s')
+
+
+class Population:
+    """Sizes, id offsets and the deterministic layout of the generated data.
+
+    Seeded rows get ids after the current maximum of each table, so seeding
+    adds to an existing database. Channel membership is a window of users
+    starting at an offset per channel, which lets any batch pick a member of
+    any channel without holding the membership table in memory.
+    """
+
+    def __init__(self, seed, users, channels, direct_chats, messages, days, password_hash):
+        self.seed = seed
+        self.users = users
+        self.channels = channels
+        self.messages = messages
+        self.password_hash = password_hash
+        self.end = datetime.utcnow()
+        self.start = self.end - timedelta(days=days)
+
+        self.user_base, self.channel_base, self.chat_base, self.message_base = (
+            db.session.execute(text(f'SELECT COALESCE(MAX(id), 0) FROM {table}')).scalar()
+            for table in ('users', 'channels', 'direct_message_chats', 'messages')
+        )
+
+        self.channel_sizes = [max(2, min(users, int(users / (rank + 1) ** CHANNEL_SIZE_EXPONENT)))
+                              for rank in range(channels)]
+        self.membership_offsets = [0]
+        for size in self.channel_sizes:
+            self.membership_offsets.append(self.membership_offsets[-1] + size)
+
+        # DM chats are unique user pairs; the first user of each pair is drawn with skew
+        rng = self.rng('direct')
+        pairs = set()
+        self.direct_chats = []
+        direct_chats = min(direct_chats, users * (users - 1) // 4)
+        while len(self.direct_chats) < direct_chats:
+            pair = (_zipf(rng, users), rng.randrange(users))
+            key = (min(pair), max(pair))
+            if pair[0] != pair[1] and key not in pairs:
+                pairs.add(key)
+                self.direct_chats.append(pair)
+
+    def rng(self, *name):
+        return random.Random('-'.join(str(part) for part in (self.seed, *name)))
+
+    def user_id(self, index):
+        return self.user_base + 1 + index % self.users
+
+    def channel_id(self, rank):
+        return self.channel_base + 1 + rank
+
+    def chat_id(self, index):
+        return self.chat_base + 1 + index
+
+    def channel_member(self, rank, position):
+        """User id at position within the channel's member window."""
+        return self.user_id(rank * 7919 + position)
+
+    def channel_created_at(self, rank):
+        return self.start + timedelta(seconds=rank)
+
+
+def _user_rows(population, start, end):
+    rng = population.rng('users', start)
+    rows = []
+    for index in range(start, end):
+        user_id = population.user_id(index)
+        created_at = population.start + (population.end - population.start) * rng.random() / 2
+        rows.append((user_id, f'user_{user_id}', f'user_{user_id}@example.com', population.password_hash,
+                     f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', 'offline', created_at,
+                     population.end - timedelta(minutes=_zipf(rng, 60 * 24 * 30))))
+    yield 'users', ('id', 'username', 'email', 'password_hash', 'display_name', 'status',
+                    'created_at', 'last_active'), rows
+
+
+def _channel_rows(population):
+    rng = population.rng('channels')
+    rows = []
+    for rank in range(population.channels):
+        channel_id = population.channel_id(rank)
+        name = CHANNEL_NAMES[rank] if rank < len(CHANNEL_NAMES) else f'{rng.choice(VOCABULARY)}-{channel_id}'
+        is_private = rank >= len(CHANNEL_NAMES) and rng.random() < PRIVATE_CHANNEL_SHARE
+        rows.append((channel_id, name[:50], None, is_private, population.channel_member(rank, 0),
+                     population.channel_created_at(rank)))
+    yield 'channels', ('id', 'name', 'description', 'is_private', 'created_by', 'created_at'), rows
+
+
+def _membership_rows(population, start, end):
+    offsets = population.membership_offsets
+    rank = bisect.bisect_right(offsets, start) - 1
+    rows = []
+    for index in range(start, end):
+        while index >= offsets[rank + 1]:
+            rank += 1
+        rows.append((population.channel_id(rank), population.channel_member(rank, index - offsets[rank]),
+                     population.channel_created_at(rank)))
+    yield 'channel_members', ('channel_id', 'user_id', 'joined_at'), rows
+
+
+def _direct_chat_rows(population, start, end):
+    chats = []
+    participants = []
+    for index in range(start, end):
+        chat_id = population.chat_id(index)
+        user_ids = [population.user_id(user) for user in population.direct_chats[index]]
+        chats.append((chat_id, population.start, DirectMessageChat.participant_key_for(user_ids)))
+        participants.extend((chat_id, user_id) for user_id in user_ids)
+    yield 'direct_message_chats', ('id', 'created_at', 'participant_key'), chats
+    yield 'direct_message_participants', ('chat_id', 'user_id'), participants
+
+
+def _message_rows(population, start, end):
+    """Messages in one id range plus their reactions and reaction counts."""
+    rng = population.rng('messages', start)
+    span = population.end - population.start
+    messages = []
+    reactions = []
+    counts = []
+
+    for index in range(start, end):
+        message_id = population.message_base + 1 + index
+        created_at = population.start + span * (index / population.messages)
+
+        if population.direct_chats and rng.random() < DIRECT_MESSAGE_SHARE:
+            chat = _zipf(rng, len(population.direct_chats))
+            members = [population.user_id(user) for user in population.direct_chats[chat]]
+            sender_id = rng.choice(members)
+            channel_id, chat_id = None, population.chat_id(chat)
+        else:
+            rank = _zipf(rng, population.channels)
+            size = population.channel_sizes[rank]
+            # Senders (and reactors) near the start of the member window are the channel's power users
+            members = None
+            sender_id = population.channel_member(rank, _zipf(rng, size))
+            channel_id, chat_id = population.channel_id(rank), None
+
+        content = ' '.join(rng.choices(VOCABULARY, k=3 + _zipf(rng, 40)))
+        if rng.random() < RARE_WORD_RATE:
+            content += ' ' + RARE_WORD
+        messages.append((message_id, content, sender_id, channel_id, chat_id, created_at, False))
+
+        if rng.random() < REACTION_RATE:
+            if members is None:
+                members = [population.channel_member(rank, position) for position in range(min(size, 50))]
+            for emoji in rng.sample(EMOJI, 1 + _zipf(rng, 3)):
+                reactors = rng.sample(members, 1 + _zipf(rng, min(len(members), 8)))
+                reactions.extend((message_id, user_id, emoji, created_at) for user_id in reactors)
+                counts.append((message_id, emoji, len(reactors)))
+
+    yield 'messages', ('id', 'content', 'sender_id', 'channel_id', 'direct_message_chat_id',
+                       'created_at', 'is_edited'), messages
+    yield 'message_reactions', ('message_id', 'user_id', 'reaction', 'created_at'), reactions
+    yield 'message_reaction_counts', ('message_id', 'reaction', 'count'), counts
+
+
+def _batches(generate, population, total, batch_size):
+    for start in range(0, total, batch_size):
+        yield lambda start=start: generate(population, start, min(start + batch_size, total))
+
+
+def _phases(population, batch_size):
+    """(label, load tasks) in foreign key order; the tasks of one phase can run in parallel."""
+    return [
+        ('Users', _batches(_user_rows, population, population.users, batch_size)),
+        ('Channels and DM chats', [
+            lambda: _channel_rows(population),
+            *_batches(_direct_chat_rows, population, len(population.direct_chats), batch_size)
+        ]),
+        ('Memberships', _batches(_membership_rows, population, population.membership_offsets[-1], batch_size)),
+        ('Messages and reactions', _batches(_message_rows, population, population.messages, batch_size)),
+    ]
+
+
+@contextmanager
+def rolled_back_session():
+    """Run the block with db.session on one connection whose transaction is rolled back at the end.
+
+    Service commits only release a savepoint inside that transaction, so
+    seeded data and anything the services write is discarded. Yields the
+    connection.
+    """
+    # Rows rolled back by earlier runs stay behind as dead tuples until autovacuum gets to
+    # them, and the bloat can tip plans toward sequential scans; clear them out first
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.exec_driver_sql(f'VACUUM {", ".join(LOAD_ORDER)}')
+
+    connection = db.engine.connect()
+    transaction = connection.begin()
+
+    app_session = db.session
+    db.session = scoped_session(sessionmaker(bind=connection, join_transaction_mode='create_savepoint'))
+
+    try:
+        yield connection
+    finally:
+        db.session.remove()
+        db.session = app_session
+        transaction.rollback()
+        connection.close()
+
+
+def load_population(connection, population, batch_size=50000):
+    """Load a population over `connection` without committing, for checks that roll it back.
+
+    Expects db.session to run on the same connection (see rolled_back_session).
+    The rows are the ones `flask seed` generates, copied one batch at a time
+    into the indexed tables, followed by the same read cursors, sequence
+    reset and statistics. setval is not rolled back with the transaction;
+    that only leaves a gap in the ids.
+    """
+    cursor = connection.connection.cursor()
+    for _, tasks in _phases(population, batch_size):
+        for task in tasks:
+            for table, columns, rows in task():
+                _copy(cursor, table, columns, rows)
+
+    # Statistics before read cursors, as in `flask seed`
+    tables = LOAD_ORDER[:8]
+    connection.exec_driver_sql(f'ANALYZE {", ".join(tables)}')
+    _seed_read_cursors(population)
+    connection.exec_driver_sql('ANALYZE read_cursors')
+    _reset_sequences(tables)
+
+
+@click.command('seed')
+@click.option('--users', default=1000000, show_default=True)
+@click.option('--channels', default=10000, show_default=True)
+@click.option('--direct-chats', default=200000, show_default=True)
+@click.option('--messages', default=5000000, show_default=True)
+@click.option('--days', default=365, show_default=True, help='Span of message history.')
+@click.option('--password', default='password123', show_default=True, help='Password of every seeded user.')
+@click.option('--workers', default=4, show_default=True, help='Parallel COPY connections.')
+@click.option('--batch-size', default=50000, show_default=True, help='Rows per COPY batch.')
+@click.option('--seed', 'random_seed', default=1, show_default=True, help='Random seed; the same seed gives the same data.')
+@with_appcontext
+def seed_command(users, channels, direct_chats, messages, days, password, workers, batch_size, random_seed):
+    """Generate a production-scale dataset and bulk-load it with COPY.
+
+    Users, channels (a few huge ones and a long tail), memberships, DM chats,
+    messages with power-law sender activity, reactions and reaction counts
+    are generated in batches and loaded over parallel connections. Secondary
+    indexes are dropped during the load and rebuilt after it, sequences are
+    moved past the new ids, and every member is marked as having read their
+    channels and DMs up to the latest message.
+    """
+    population = Population(random_seed, users, channels, direct_chats, messages, days,
+                            password_hasher.hash(password))
+    tables = LOAD_ORDER[:8]
+
+    click.echo(f'Seeding {users} users, {channels} channels ({population.membership_offsets[-1]} memberships), '
+               f'{len(population.direct_chats)} DM chats and {messages} messages')
+
+    with _indexes_dropped(tables, workers):
+        for label, tasks in _phases(population, batch_size):
+            _timed(label, _run_batches, workers, tasks)
+
+    # Statistics first: without them the read cursor query can pick a nested loop over every message
+    _timed('Statistics', _analyze, tables)
+    _timed('Read cursors', _seed_read_cursors, population)
+    _finish(tables + ['read_cursors'])
+
+
+def _seed_read_cursors(population):
+    """Mark seeded members as having read up to the latest message of each channel and DM."""
+    for destination, members, member_column in (('channel_id', 'channel_members', 'channel_id'),
+                                                ('direct_message_chat_id', 'direct_message_participants', 'chat_id')):
+        base = population.channel_base if destination == 'channel_id' else population.chat_base
+        db.session.execute(text(f"""
+            INSERT INTO read_cursors (user_id, {destination}, last_read_message_id, updated_at)
+            SELECT members.user_id, members.{member_column}, latest.id, now()
+            FROM {members} members
+            JOIN (SELECT {destination}, MAX(id) AS id FROM messages
+                  WHERE {destination} > :base GROUP BY {destination}) latest
+              ON latest.{destination} = members.{member_column}
+            ON CONFLICT DO NOTHING
+        """), {'base': base})
+    db.session.commit()
+
+
+def _csv_batches(reader, table, columns, batch_size):
+    rows = []
+    for row in reader:
+        rows.append(row)
+        if len(rows) >= batch_size:
+            yield lambda rows=rows: [(table, columns, rows)]
+            rows = []
+    if rows:
+        yield lambda rows=rows: [(table, columns, rows)]
+
+
+@click.command('import')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--workers', default=4, show_default=True, help='Parallel COPY connections.')
+@click.option('--batch-size', default=50000, show_default=True, help='Rows per COPY batch.')
+@with_appcontext
+def import_command(directory, workers, batch_size):
+    """Bulk-load <table>.csv or <table>.csv.gz files from DIRECTORY with COPY.
+
+    The first line of each file names its columns (leave out the generated
+    messages.search_vector); an unquoted empty field is NULL. Tables are
+    loaded in foreign key order, each file in parallel batches, with the same
+    index rebuild and sequence reset as `flask seed`.
+    """
+    files = {}
+    for table in LOAD_ORDER:
+        for name in (f'{table}.csv', f'{table}.csv.gz'):
+            if os.path.exists(os.path.join(directory, name)):
+                files[table] = os.path.join(directory, name)
+
+    if not files:
+        raise click.ClickException(f'No <table>.csv files found; expected any of: {", ".join(LOAD_ORDER)}')
+
+    with _indexes_dropped(files, workers):
+        for table, path in files.items():
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', newline='', encoding='utf-8') as source:
+                reader = csv.reader(source)
+                columns = next(reader)
+                _timed(table, _run_batches, workers, _csv_batches(reader, table, columns, batch_size))
+
+    _finish(list(files))
@@ -16,6 +16,37 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # JSON encoding for responses and socket packets: 'auto' (orjson when installed), 'orjson' or 'stdlib'
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+    
     # SocketIO
     SOCKETIO_PING_TIMEOUT = 10
-    SOCKETIO_PING_INTERVAL = 25
\ No newline at end of file
+    SOCKETIO_PING_INTERVAL = 25
+    
+    # Pub/sub backend shared by all workers and replicas: a postgresql:// URL uses
+    # LISTEN/NOTIFY, redis:// (or any other Flask-SocketIO queue URL) uses that service
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'socketio')
+    
+    # Password hashing: bcrypt cost factor, and the per-worker thread pool that runs it
+    # (hashes in progress plus queued ones beyond which logins are refused with a 503)
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    PASSWORD_HASH_THREADS = int(os.environ.get('PASSWORD_HASH_THREADS', 4))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 64))
+    
+    # Per-worker membership cache used for authorization checks
+    MEMBERSHIP_CACHE_SIZE = int(os.environ.get('MEMBERSHIP_CACHE_SIZE', 100000))
+    MEMBERSHIP_CACHE_TTL = int(os.environ.get('MEMBERSHIP_CACHE_TTL', 300))
+    
+    # Per-worker user profile cache used to embed message senders
+    PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 50000))
+    PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 60))
+    
+    # Typing indicators: flush interval and how long a typist stays active without events (seconds)
+    TYPING_FLUSH_INTERVAL = float(os.environ.get('TYPING_FLUSH_INTERVAL', 0.5))
+    TYPING_TIMEOUT = float(os.environ.get('TYPING_TIMEOUT', 6))
+    
+    # Presence: how often diffs are sent and how often status/last_active are written (seconds)
+    PRESENCE_FLUSH_INTERVAL = float(os.environ.get('PRESENCE_FLUSH_INTERVAL', 2))
+    PRESENCE_PERSIST_INTERVAL = float(os.environ.get('PRESENCE_PERSIST_INTERVAL', 15))
+    PRESENCE_MAX_SUBSCRIPTIONS = int(os.environ.get('PRESENCE_MAX_SUBSCRIPTIONS', 500))
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Read automatically by gunicorn when started from this directory (as in the Dockerfile)
+import os
+import shutil
+
+# Shared metric files for /metrics across workers. Set here rather than in the
+# environment so that flask CLI commands, which never read this file, keep
+# their metrics in memory and leave no files behind
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+
+def on_starting(server):
+    # Start with an empty metrics directory so counters from a previous run are not reported
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (connected sockets, pool usage)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,134 @@
+"""End-to-end load test for the REST API and Socket.IO server.
+
+Drives a running app (gunicorn, against a local Postgres) with simulated
+users, and writes machine-readable results that can be compared across
+commits:
+
+    python -m loadtest run --users 200 --output results/$(git rev-parse --short HEAD).json
+    python -m loadtest compare results/base.json results/head.json
+
+Each run registers its own users and channel, so it can be pointed at a
+development database repeatedly. Run from the backend directory after
+`pip install -r loadtest/requirements.txt`.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime
+import aiohttp
+from loadtest.scenarios import SCENARIOS, Run, setup
+from loadtest.stats import Recorder, compare
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(name, summary):
+    print(f'\n{name} ({summary["elapsed_s"]}s)')
+    for timing, values in summary['timings'].items():
+        print(f'  {timing:<14} n={values["count"]:<7} {values["per_second"]:>8}/s  '
+              f'p50={values["p50_ms"]}ms  p99={values["p99_ms"]}ms  max={values["max_ms"]}ms')
+    for counter, value in summary['counters'].items():
+        print(f'  {counter:<14} {value}')
+    for error, value in summary['errors'].items():
+        print(f'  ERROR {error} x{value}')
+
+
+async def run_scenarios(options):
+    connector = aiohttp.TCPConnector(limit=options.connections)
+    timeout = aiohttp.ClientTimeout(total=60)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+        run = Run(options.base_url, http, options)
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        await setup(run, recorder)
+        results = {'setup': recorder.summary(time.perf_counter() - started)}
+        print_summary('setup', results['setup'])
+
+        for name in options.scenarios:
+            recorder = Recorder()
+            started = time.perf_counter()
+            await SCENARIOS[name](run, recorder)
+            results[name] = recorder.summary(time.perf_counter() - started)
+            print_summary(name, results[name])
+
+        return results
+
+
+def run_command(options):
+    unknown = set(options.scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f'Unknown scenarios: {", ".join(sorted(unknown))} (choose from {", ".join(SCENARIOS)})')
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.utcnow().isoformat(),
+            'options': {key: value for key, value in vars(options).items() if key != 'func'}
+        },
+        'scenarios': asyncio.run(run_scenarios(options))
+    }
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResults written to {options.output}')
+
+
+def compare_command(options):
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+    with open(options.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, options.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+
+    if regressions:
+        sys.exit(1)
+    print('No regressions')
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(required=True)
+
+    run = commands.add_parser('run', help='Run scenarios against a live app')
+    run.add_argument('--base-url', default='http://localhost:5000')
+    run.add_argument('--users', type=int, default=100, help='Users registered, all members of one channel')
+    run.add_argument('--senders', type=int, default=5,
+                     help='Users sending (or typing, or scrolling) at once in each scenario')
+    run.add_argument('--rate', type=float, default=5, help='Messages per second per sender')
+    run.add_argument('--duration', type=float, default=20, help='Seconds per scenario')
+    run.add_argument('--history-messages', type=int, default=2000, help='Messages loaded for the history scenario')
+    run.add_argument('--page-size', type=int, default=50)
+    run.add_argument('--connections', type=int, default=100, help='Concurrent HTTP connections')
+    run.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), metavar='SCENARIO',
+                     help=f'Any of: {", ".join(SCENARIOS)}')
+    run.add_argument('--output', '-o', help='Write results as JSON to this file')
+    run.set_defaults(func=run_command)
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files; exits 1 on regression')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--tolerance', type=float, default=0.2,
+                                help='Allowed relative slowdown before flagging (0.2 = 20%%)')
+    compare_parser.set_defaults(func=compare_command)
+
+    options = parser.parse_args()
+    options.func(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import aiohttp
+import socketio
+
+
+class VirtualUser:
+    """One simulated user: a REST session plus an optional Socket.IO connection.
+
+    Every REST call and connect is timed into the scenario's Recorder under
+    the name it is given, and non-2xx responses and connection failures are
+    counted as errors rather than raised, so one slow or failed request
+    never stops a run.
+    """
+
+    def __init__(self, base_url, http, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.http = http
+        self.username = username
+        self.password = password
+        self.user_id = None
+        self.token = None
+        self.socket = None
+
+    async def request(self, recorder, name, method, path, **kwargs):
+        """Make an API call; returns the decoded body, or None on failure."""
+        headers = {'Authorization': f'Bearer {self.token}'} if self.token else {}
+        started = time.perf_counter()
+
+        try:
+            async with self.http.request(method, f'{self.base_url}/api{path}', headers=headers, **kwargs) as response:
+                body = await response.json(content_type=None)
+                recorder.timing(name, time.perf_counter() - started)
+
+                if response.status >= 300:
+                    recorder.error(name, response.status)
+                    return None
+                return body
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            recorder.error(name, type(e).__name__)
+            return None
+
+    async def register(self, recorder):
+        body = await self.request(recorder, 'register', 'POST', '/auth/register', json={
+            'username': self.username,
+            'email': f'{self.username}@loadtest.example.com',
+            'password': self.password
+        })
+        if body is not None:
+            self.user_id = body['user']['id']
+            self.token = body['access_token']
+        return body is not None
+
+    async def connect(self, recorder, handlers=None, name='connect'):
+        """Open a websocket Socket.IO connection with the given {event: handler} callbacks."""
+        self.socket = socketio.AsyncClient(reconnection=False)
+        for event, handler in (handlers or {}).items():
+            self.socket.on(event, handler)
+
+        started = time.perf_counter()
+        try:
+            await self.socket.connect(self.base_url, auth={'token': self.token}, transports=['websocket'],
+                                      wait_timeout=30)
+            recorder.timing(name, time.perf_counter() - started)
+            return True
+        except (socketio.exceptions.ConnectionError, asyncio.TimeoutError) as e:
+            recorder.error(name, type(e).__name__)
+            self.socket = None
+            return False
+
+    async def disconnect(self):
+        if self.socket is not None:
+            await self.socket.disconnect()
+            self.socket = None
@@ -0,0 +1,275 @@
+import asyncio
+import time
+from loadtest.client import VirtualUser
+
+# Simultaneous requests while setting the run up (registration hashes passwords)
+SETUP_CONCURRENCY = 8
+
+# Seconds to keep listening after the last send, for in-flight deliveries
+SETTLE_SECONDS = 3
+
+
+class Run:
+    """Users and the shared channel for one load-test run."""
+
+    def __init__(self, base_url, http, options):
+        self.base_url = base_url
+        self.http = http
+        self.options = options
+        self.users = []
+        self.channel_id = None
+
+    @property
+    def deadline(self):
+        return time.perf_counter() + self.options.duration
+
+
+async def _bounded(coroutines, limit):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+
+async def _connect_all(recorder, users, handlers_for, name='connect'):
+    """Connect every user, with handlers_for(user) giving its event callbacks; returns those connected."""
+    results = await asyncio.gather(*(user.connect(recorder, handlers_for(user), name) for user in users))
+    return [user for user, connected in zip(users, results) if connected]
+
+
+async def _disconnect_all(users):
+    await asyncio.gather(*(user.disconnect() for user in users))
+
+
+async def setup(run, recorder):
+    """Register the run's users and put them all in one channel (the large room)."""
+    tag = f'lt{int(time.time())}'
+    run.users = [
+        VirtualUser(run.base_url, run.http, f'{tag}_{i}', 'loadtest-password')
+        for i in range(run.options.users)
+    ]
+
+    registered = await _bounded((user.register(recorder) for user in run.users), SETUP_CONCURRENCY)
+    run.users = [user for user, ok in zip(run.users, registered) if ok]
+    if len(run.users) < 2:
+        raise RuntimeError('Could not register enough users; is the app running at ' + run.base_url + '?')
+
+    owner = run.users[0]
+    body = await owner.request(recorder, 'create_channel', 'POST', '/channels/', json={'name': tag})
+    if body is None:
+        raise RuntimeError('Could not create the load-test channel')
+    run.channel_id = body['channel']['id']
+
+    await _bounded((
+        owner.request(recorder, 'add_member', 'POST', f'/channels/{run.channel_id}/members',
+                      json={'user_id': user.user_id})
+        for user in run.users[1:]
+    ), SETUP_CONCURRENCY)
+
+
+async def fanout(run, recorder):
+    """A few senders post into the shared channel while every member listens.
+
+    delivery_lag is from just before the POST to the 'new_message' event on
+    each receiving socket; 'expected' vs 'delivered' shows dropped events.
+    """
+    options = run.options
+    sent_at = {}
+
+    def handlers_for(user):
+        def on_message(data):
+            started = sent_at.get(data['message']['content'])
+            if started is not None:
+                recorder.timing('delivery_lag', time.perf_counter() - started)
+                recorder.count('delivered')
+        return {'new_message': on_message}
+
+    listeners = await _connect_all(recorder, run.users, handlers_for)
+    deadline = run.deadline
+
+    async def send_loop(user):
+        n = 0
+        while time.perf_counter() < deadline:
+            token = f'fanout {user.user_id}-{n}'
+            n += 1
+            sent_at[token] = time.perf_counter()
+            if await user.request(recorder, 'send', 'POST', f'/messages/channel/{run.channel_id}',
+                                  json={'content': token}):
+                recorder.count('sent')
+                recorder.count('expected', len(listeners))
+            await asyncio.sleep(1 / options.rate)
+
+    await asyncio.gather(*(send_loop(user) for user in run.users[:options.senders]))
+    await asyncio.sleep(SETTLE_SECONDS)
+    await _disconnect_all(listeners)
+
+
+async def history(run, recorder):
+    """Readers scroll the channel's history from the newest page back, over and over."""
+    options = run.options
+    owner = run.users[0]
+
+    for start in range(0, options.history_messages, 100):
+        await owner.request(recorder, 'preload', 'POST', '/messages/batch', json={'messages': [
+            {'channel_id': run.channel_id, 'content': f'history {i}'}
+            for i in range(start, min(start + 100, options.history_messages))
+        ]})
+
+    deadline = run.deadline
+
+    async def scroll(user):
+        while time.perf_counter() < deadline:
+            cursor = ''
+            while time.perf_counter() < deadline:
+                body = await user.request(recorder, 'page', 'GET', f'/messages/channel/{run.channel_id}',
+                                          params={'before': cursor, 'per_page': options.page_size})
+                if body is None or not body['has_more']:
+                    break
+                cursor = body['next_cursor']
+            recorder.count('scrolls')
+
+    await asyncio.gather(*(scroll(user) for user in run.users[:options.senders]))
+
+
+async def reconnect(run, recorder):
+    """Every user connects at once, drops, and connects again until the time is up."""
+    deadline = run.deadline
+
+    while time.perf_counter() < deadline:
+        connected = await _connect_all(recorder, run.users, lambda user: {})
+        recorder.count('storms')
+        await _disconnect_all(connected)
+
+
+async def typing(run, recorder):
+    """Typists send a keystroke event every 100ms in bursts; everyone else watches.
+
+    typing_lag is from the first keystroke of a burst to the 'typing_update'
+    naming the typist on each receiving socket. The ratio of updates
+    received to keystrokes sent shows how well the server coalesces.
+    """
+    started_at = {}
+    seen = set()
+
+    def handlers_for(user):
+        def on_update(data):
+            recorder.count('updates_received')
+            for typist in data.get('typing', []):
+                started = started_at.get(typist)
+                if started is not None and (user.user_id, typist, started) not in seen:
+                    seen.add((user.user_id, typist, started))
+                    recorder.timing('typing_lag', time.perf_counter() - started)
+        return {'typing_update': on_update}
+
+    listeners = await _connect_all(recorder, run.users, handlers_for)
+    typists = listeners[:run.options.senders]
+    deadline = run.deadline
+
+    async def type_loop(user):
+        payload = {'channel_id': run.channel_id}
+        while time.perf_counter() < deadline:
+            started_at[user.user_id] = time.perf_counter()
+            for _ in range(20):
+                await user.socket.emit('typing_channel', payload)
+                recorder.count('keystrokes')
+                await asyncio.sleep(0.1)
+            await user.socket.emit('stopped_typing_channel', payload)
+            await asyncio.sleep(0.5)
+
+    await asyncio.gather(*(type_loop(user) for user in typists))
+    await asyncio.sleep(SETTLE_SECONDS)
+    await _disconnect_all(listeners)
+
+
+async def direct(run, recorder):
+    """Pairs of users open a DM with each other at the same moment, then message over it.
+
+    Both sides must get the same chat back. dm_joined is from the create
+    request to the recipient's socket joining the new chat's room (via
+    'direct_message_created'); delivery_lag is for the first message sent.
+    """
+    joined = {}
+    sent_at = {}
+
+    def joined_waiter(user_id, chat_id):
+        # Created by whichever comes first: the 'joined_direct' event or the creating request returning
+        if (user_id, chat_id) not in joined:
+            joined[(user_id, chat_id)] = asyncio.get_running_loop().create_future()
+        return joined[(user_id, chat_id)]
+
+    def handlers_for(user):
+        async def on_created(data):
+            await user.socket.emit('join_direct', {'chat_id': data['direct_message']['id']})
+
+        def on_joined(data):
+            waiter = joined_waiter(user.user_id, data['chat_id'])
+            if not waiter.done():
+                waiter.set_result(time.perf_counter())
+
+        def on_message(data):
+            message = data['message']
+            started = sent_at.get(message['content'])
+            if started is not None and message['sender_id'] != user.user_id:
+                recorder.timing('delivery_lag', time.perf_counter() - started)
+                recorder.count('delivered')
+
+        return {
+            'direct_message_created': on_created,
+            'joined_direct': on_joined,
+            'new_direct_message': on_message
+        }
+
+    users = await _connect_all(recorder, run.users, handlers_for)
+    deadline = run.deadline
+
+    async def pair(initiator, recipient):
+        started = time.perf_counter()
+        ours, theirs = await asyncio.gather(
+            initiator.request(recorder, 'create_dm', 'POST', '/channels/direct-messages',
+                              json={'recipient_id': recipient.user_id}),
+            recipient.request(recorder, 'create_dm', 'POST', '/channels/direct-messages',
+                              json={'recipient_id': initiator.user_id})
+        )
+        if ours is None or theirs is None:
+            return
+
+        chat_id = ours['direct_message']['id']
+        if theirs['direct_message']['id'] != chat_id:
+            recorder.error('create_dm', 'duplicate chat')
+            return
+
+        waiter = joined_waiter(recipient.user_id, chat_id)
+        try:
+            recorder.timing('dm_joined', await asyncio.wait_for(waiter, 10) - started)
+        except asyncio.TimeoutError:
+            recorder.error('dm_joined', 'timeout')
+            return
+
+        token = f'direct {chat_id}'
+        sent_at[token] = time.perf_counter()
+        if await initiator.request(recorder, 'send', 'POST', f'/messages/direct/{chat_id}', json={'content': token}):
+            recorder.count('sent')
+
+    # Round r pairs each user with the one r places along, so every pair is new
+    for offset in range(1, len(users) // 2 + 1):
+        if time.perf_counter() >= deadline:
+            break
+        await asyncio.gather(*(
+            pair(user, users[(i + offset) % len(users)]) for i, user in enumerate(users)
+            if offset * 2 != len(users) or i < offset
+        ))
+
+    await asyncio.sleep(SETTLE_SECONDS)
+    await _disconnect_all(users)
+
+
+SCENARIOS = {
+    'fanout': fanout,
+    'history': history,
+    'reconnect': reconnect,
+    'typing': typing,
+    'direct': direct
+}
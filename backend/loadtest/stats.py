@@ -0,0 +1,77 @@
+import math
+from collections import Counter, defaultdict
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+class Recorder:
+    """Collects latency samples and counters for one scenario."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.counters = Counter()
+        self.errors = Counter()
+
+    def timing(self, name, seconds):
+        self.timings[name].append(seconds)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def error(self, name, detail):
+        self.errors[f'{name}: {detail}'] += 1
+
+    def summary(self, elapsed):
+        """Machine-readable results: per timing its count, rate per second and percentiles in ms."""
+        timings = {}
+        for name, samples in self.timings.items():
+            samples = sorted(samples)
+            timings[name] = {
+                'count': len(samples),
+                'per_second': round(len(samples) / elapsed, 2) if elapsed else None,
+                'p50_ms': round(percentile(samples, 0.50) * 1000, 2),
+                'p90_ms': round(percentile(samples, 0.90) * 1000, 2),
+                'p99_ms': round(percentile(samples, 0.99) * 1000, 2),
+                'max_ms': round(samples[-1] * 1000, 2)
+            }
+
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'timings': timings,
+            'counters': dict(self.counters),
+            'errors': dict(self.errors)
+        }
+
+
+def compare(baseline, current, tolerance):
+    """List regressions of current against baseline results (both as written by `run`).
+
+    A timing regresses if its p50 or p99 grew, or its rate fell, by more
+    than `tolerance` (a fraction). Scenarios or timings missing from either
+    side are ignored.
+    """
+    regressions = []
+
+    for scenario, results in current['scenarios'].items():
+        before = baseline['scenarios'].get(scenario)
+        if not before:
+            continue
+
+        for name, timing in results['timings'].items():
+            old = before['timings'].get(name)
+            if not old:
+                continue
+
+            for metric in ('p50_ms', 'p99_ms'):
+                if old[metric] and timing[metric] > old[metric] * (1 + tolerance):
+                    regressions.append(f'{scenario}.{name}.{metric}: {old[metric]} -> {timing[metric]}')
+
+            if old['per_second'] and timing['per_second'] < old['per_second'] * (1 - tolerance):
+                regressions.append(f'{scenario}.{name}.per_second: {old["per_second"]} -> {timing["per_second"]}')
+
+    return regressions
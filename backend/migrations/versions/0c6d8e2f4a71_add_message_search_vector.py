@@ -0,0 +1,38 @@
+"""add message search vector
+
+Revision ID: 0c6d8e2f4a71
+Revises: f41a9c6e2b58
+Create Date: 2026-10-18 16:48:03.552170
+
+Stored generated tsvector column on messages with a GIN index built
+CONCURRENTLY. Adding a stored generated column rewrites the table under an
+ACCESS EXCLUSIVE lock, so run this in a maintenance window on large tables.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0c6d8e2f4a71'
+down_revision = 'f41a9c6e2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('messages', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                        sa.Computed("to_tsvector('english', content)", persisted=True)))
+    
+    with op.get_context().autocommit_block():
+        op.create_index('ix_messages_search_vector', 'messages', ['search_vector'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_search_vector', table_name='messages',
+                      postgresql_concurrently=True)
+    
+    op.drop_column('messages', 'search_vector')
@@ -0,0 +1,37 @@
+"""add message reaction counts
+
+Revision ID: 7a4e6b2c91d3
+Revises: 3f1c2a9d8e01
+Create Date: 2026-10-18 09:14:03.218846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4e6b2c91d3'
+down_revision = '3f1c2a9d8e01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('message_reaction_counts',
+    sa.Column('message_id', sa.Integer(), nullable=False),
+    sa.Column('reaction', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('message_id', 'reaction')
+    )
+
+    # Backfill counters from the existing reaction rows
+    op.execute(
+        'INSERT INTO message_reaction_counts (message_id, reaction, count) '
+        'SELECT message_id, reaction, COUNT(*) FROM message_reactions '
+        'GROUP BY message_id, reaction'
+    )
+
+
+def downgrade():
+    op.drop_table('message_reaction_counts')
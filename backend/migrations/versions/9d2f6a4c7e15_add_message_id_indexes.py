@@ -0,0 +1,41 @@
+"""add message id indexes
+
+Revision ID: 9d2f6a4c7e15
+Revises: 0c6d8e2f4a71
+Create Date: 2026-10-18 19:05:41.218734
+
+(destination, id) indexes for the read state queries: the newest message
+of a chat (mark read) and the messages past a read cursor (unread counts)
+become index range scans instead of walking every message of the chat.
+Built CONCURRENTLY so existing deployments keep accepting writes.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2f6a4c7e15'
+down_revision = '0c6d8e2f4a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_messages_channel_id_id', 'messages',
+                        ['channel_id', 'id'], unique=False,
+                        postgresql_where=sa.text('channel_id IS NOT NULL'),
+                        postgresql_concurrently=True)
+        op.create_index('ix_messages_direct_message_chat_id_id', 'messages',
+                        ['direct_message_chat_id', 'id'], unique=False,
+                        postgresql_where=sa.text('direct_message_chat_id IS NOT NULL'),
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_direct_message_chat_id_id', table_name='messages',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_messages_channel_id_id', table_name='messages',
+                      postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""add read cursors
+
+Revision ID: b82d5f0c3e47
+Revises: 7a4e6b2c91d3
+Create Date: 2026-10-18 09:15:27.640192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b82d5f0c3e47'
+down_revision = '7a4e6b2c91d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('read_cursors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('channel_id', sa.Integer(), nullable=True),
+    sa.Column('direct_message_chat_id', sa.Integer(), nullable=True),
+    sa.Column('last_read_message_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.CheckConstraint('(channel_id IS NULL AND direct_message_chat_id IS NOT NULL) OR (channel_id IS NOT NULL AND direct_message_chat_id IS NULL)', name='read_cursor_destination_check'),
+    sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['direct_message_chat_id'], ['direct_message_chats.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'channel_id'),
+    sa.UniqueConstraint('user_id', 'direct_message_chat_id')
+    )
+
+
+def downgrade():
+    op.drop_table('read_cursors')
@@ -0,0 +1,55 @@
+"""add hot path indexes
+
+Revision ID: d5e9a1f7c264
+Revises: b82d5f0c3e47
+Create Date: 2026-10-18 09:21:55.087311
+
+Indexes are built CONCURRENTLY so existing deployments keep accepting
+writes while they are created.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e9a1f7c264'
+down_revision = 'b82d5f0c3e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_messages_channel_id_created_at', 'messages',
+                        ['channel_id', 'created_at', 'id'], unique=False,
+                        postgresql_where=sa.text('channel_id IS NOT NULL'),
+                        postgresql_concurrently=True)
+        op.create_index('ix_messages_direct_message_chat_id_created_at', 'messages',
+                        ['direct_message_chat_id', 'created_at', 'id'], unique=False,
+                        postgresql_where=sa.text('direct_message_chat_id IS NOT NULL'),
+                        postgresql_concurrently=True)
+        op.create_index('ix_notifications_user_id_unread', 'notifications',
+                        ['user_id', 'message_id'], unique=False,
+                        postgresql_where=sa.text('NOT is_read'),
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_channel_members_user_id'), 'channel_members',
+                        ['user_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_direct_message_participants_user_id'), 'direct_message_participants',
+                        ['user_id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_direct_message_participants_user_id'), table_name='direct_message_participants',
+                      postgresql_concurrently=True)
+        op.drop_index(op.f('ix_channel_members_user_id'), table_name='channel_members',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_notifications_user_id_unread', table_name='notifications',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_messages_direct_message_chat_id_created_at', table_name='messages',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_messages_channel_id_created_at', table_name='messages',
+                      postgresql_concurrently=True)
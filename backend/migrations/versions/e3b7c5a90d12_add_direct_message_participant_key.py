@@ -0,0 +1,44 @@
+"""add direct message participant key
+
+Revision ID: e3b7c5a90d12
+Revises: d5e9a1f7c264
+Create Date: 2026-10-18 14:02:51.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b7c5a90d12'
+down_revision = 'd5e9a1f7c264'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('direct_message_chats', sa.Column('participant_key', sa.String(length=32), nullable=True))
+
+    # Same key as DirectMessageChat.participant_key_for. If duplicate chats already
+    # exist for a participant set, only the oldest one gets the key.
+    op.execute("""
+        UPDATE direct_message_chats AS chats
+        SET participant_key = keyed.participant_key
+        FROM (
+            SELECT DISTINCT ON (participant_key) chat_id, participant_key
+            FROM (
+                SELECT chat_id, md5(string_agg(user_id::text, ':' ORDER BY user_id)) AS participant_key
+                FROM direct_message_participants
+                GROUP BY chat_id
+            ) AS keys
+            ORDER BY participant_key, chat_id
+        ) AS keyed
+        WHERE chats.id = keyed.chat_id
+    """)
+
+    op.create_index(op.f('ix_direct_message_chats_participant_key'), 'direct_message_chats', ['participant_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_direct_message_chats_participant_key'), table_name='direct_message_chats')
+    op.drop_column('direct_message_chats', 'participant_key')
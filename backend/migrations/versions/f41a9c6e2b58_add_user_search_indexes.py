@@ -0,0 +1,45 @@
+"""add user search indexes
+
+Revision ID: f41a9c6e2b58
+Revises: e3b7c5a90d12
+Create Date: 2026-10-18 15:37:12.904551
+
+Prefix (text_pattern_ops) and trigram (pg_trgm) indexes on the lowercased
+username and display name, built CONCURRENTLY.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41a9c6e2b58'
+down_revision = 'e3b7c5a90d12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_username_prefix', 'users',
+                        [sa.text('lower(username) text_pattern_ops')], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_users_display_name_prefix', 'users',
+                        [sa.text('lower(display_name) text_pattern_ops')], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_users_username_trgm', 'users',
+                        [sa.text('lower(username) gin_trgm_ops')], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_users_display_name_trgm', 'users',
+                        [sa.text('lower(display_name) gin_trgm_ops')], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_display_name_trgm', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_username_trgm', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_display_name_prefix', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_username_prefix', table_name='users', postgresql_concurrently=True)
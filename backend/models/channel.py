@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime
 from app import db
 
@@ -25,7 +26,7 @@ class Channel(db.Model):
             'description': self.description,
             'is_private': self.is_private,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() + 'Z'
+            'created_at': self.created_at
         }
         
         if include_members:
@@ -39,7 +40,7 @@ class ChannelMember(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     channel_id = db.Column(db.Integer, db.ForeignKey('channels.id', ondelete='CASCADE'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (db.UniqueConstraint('channel_id', 'user_id'),)
@@ -49,7 +50,7 @@ class ChannelMember(db.Model):
             'id': self.id,
             'channel_id': self.channel_id,
             'user_id': self.user_id,
-            'joined_at': self.joined_at.isoformat() + 'Z'
+            'joined_at': self.joined_at
         }
 
 
@@ -58,6 +59,9 @@ class DirectMessageChat(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Identifies the chat's participant set (see participant_key_for); NULL only on
+    # duplicate chats created before the key existed
+    participant_key = db.Column(db.String(32), unique=True, index=True)
     
     # Relationships
     participants = db.relationship('DirectMessageParticipant', backref='chat',
@@ -66,10 +70,16 @@ class DirectMessageChat(db.Model):
                              foreign_keys='Message.direct_message_chat_id',
                              cascade="all, delete-orphan")
     
+    @staticmethod
+    def participant_key_for(user_ids):
+        """Canonical key of a participant set: md5 of the sorted, de-duplicated user ids."""
+        canonical = ':'.join(str(user_id) for user_id in sorted({int(user_id) for user_id in user_ids}))
+        return hashlib.md5(canonical.encode('ascii')).hexdigest()
+    
     def to_dict(self, include_participants=False):
         data = {
             'id': self.id,
-            'created_at': self.created_at.isoformat() + 'Z'
+            'created_at': self.created_at
         }
         
         if include_participants:
@@ -83,7 +93,7 @@ class DirectMessageParticipant(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     chat_id = db.Column(db.Integer, db.ForeignKey('direct_message_chats.id', ondelete='CASCADE'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     
     __table_args__ = (db.UniqueConstraint('chat_id', 'user_id'),)
     
@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from app import db
 
 class Message(db.Model):
@@ -12,10 +13,15 @@ class Message(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
     is_edited = db.Column(db.Boolean, default=False)
+    # Maintained by Postgres for full-text search (see SearchService, whose text search
+    # configuration must match); deferred so ordinary message loads never fetch it
+    search_vector = db.deferred(db.Column(TSVECTOR, db.Computed("to_tsvector('english', content)", persisted=True)))
     
     # Relationships
     reactions = db.relationship('MessageReaction', backref='message', lazy='dynamic',
                               cascade="all, delete-orphan")
+    reaction_counts = db.relationship('MessageReactionCount', backref='message', lazy='dynamic',
+                                    cascade="all, delete-orphan")
     notifications = db.relationship('Notification', backref='message', lazy='dynamic',
                                   cascade="all, delete-orphan")
     
@@ -23,24 +29,38 @@ class Message(db.Model):
         db.CheckConstraint('(channel_id IS NULL AND direct_message_chat_id IS NOT NULL) OR '
                           '(channel_id IS NOT NULL AND direct_message_chat_id IS NULL)',
                           name='message_destination_check'),
+        # History pages and keyset cursors seek on (destination, created_at, id)
+        db.Index('ix_messages_channel_id_created_at', 'channel_id', 'created_at', 'id',
+                 postgresql_where=db.text('channel_id IS NOT NULL')),
+        db.Index('ix_messages_direct_message_chat_id_created_at', 'direct_message_chat_id', 'created_at', 'id',
+                 postgresql_where=db.text('direct_message_chat_id IS NOT NULL')),
+        # Read state seeks on (destination, id): the newest message, messages past a read cursor
+        db.Index('ix_messages_channel_id_id', 'channel_id', 'id',
+                 postgresql_where=db.text('channel_id IS NOT NULL')),
+        db.Index('ix_messages_direct_message_chat_id_id', 'direct_message_chat_id', 'id',
+                 postgresql_where=db.text('direct_message_chat_id IS NOT NULL')),
+        db.Index('ix_messages_search_vector', 'search_vector', postgresql_using='gin'),
     )
     
-    def to_dict(self, include_reactions=False):
+    def to_dict(self, include_reactions=False, reactions=None):
         data = {
             'id': self.id,
             'content': self.content,
             'sender_id': self.sender_id,
             'channel_id': self.channel_id,
             'direct_message_chat_id': self.direct_message_chat_id,
-            'created_at': self.created_at.isoformat() + 'Z',
+            'created_at': self.created_at,
             'is_edited': self.is_edited
         }
         
         if self.updated_at:
-            data['updated_at'] = self.updated_at.isoformat() + 'Z'
+            data['updated_at'] = self.updated_at
             
-        if include_reactions:
-            data['reactions'] = [reaction.to_dict() for reaction in self.reactions]
+        # Preloaded reaction summaries (see HydrationService) avoid the lazy per-message query
+        if reactions is not None:
+            data['reactions'] = reactions
+        elif include_reactions:
+            data['reactions'] = [count.to_dict() for count in self.reaction_counts.order_by(MessageReactionCount.reaction)]
             
         return data
 
@@ -62,5 +82,20 @@ class MessageReaction(db.Model):
             'message_id': self.message_id,
             'user_id': self.user_id,
             'reaction': self.reaction,
-            'created_at': self.created_at.isoformat() + 'Z'
+            'created_at': self.created_at
+        }
+
+
+class MessageReactionCount(db.Model):
+    """Per-message, per-emoji reaction total, maintained alongside MessageReaction."""
+    __tablename__ = 'message_reaction_counts'
+    
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id', ondelete='CASCADE'), primary_key=True)
+    reaction = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'emoji': self.reaction,
+            'count': self.count
         }
\ No newline at end of file
@@ -13,11 +13,17 @@ class Notification(db.Model):
     # Relationship
     user = db.relationship('User', backref=db.backref('notifications', lazy='dynamic'))
     
+    __table_args__ = (
+        # Only unread notifications are ever looked up by user
+        db.Index('ix_notifications_user_id_unread', 'user_id', 'message_id',
+                 postgresql_where=db.text('NOT is_read')),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
             'user_id': self.user_id,
             'message_id': self.message_id,
             'is_read': self.is_read,
-            'created_at': self.created_at.isoformat() + 'Z'
+            'created_at': self.created_at
         }
\ No newline at end of file
@@ -0,0 +1,30 @@
+from datetime import datetime
+from app import db
+
+class ReadCursor(db.Model):
+    """Last message a user has read in a channel or DM chat."""
+    __tablename__ = 'read_cursors'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    channel_id = db.Column(db.Integer, db.ForeignKey('channels.id', ondelete='CASCADE'))
+    direct_message_chat_id = db.Column(db.Integer, db.ForeignKey('direct_message_chats.id', ondelete='CASCADE'))
+    last_read_message_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'channel_id'),
+        db.UniqueConstraint('user_id', 'direct_message_chat_id'),
+        db.CheckConstraint('(channel_id IS NULL AND direct_message_chat_id IS NOT NULL) OR '
+                          '(channel_id IS NOT NULL AND direct_message_chat_id IS NULL)',
+                          name='read_cursor_destination_check'),
+    )
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'channel_id': self.channel_id,
+            'direct_message_chat_id': self.direct_message_chat_id,
+            'last_read_message_id': self.last_read_message_id,
+            'updated_at': self.updated_at
+        }
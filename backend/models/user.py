@@ -1,6 +1,7 @@
 from datetime import datetime
-import bcrypt
 from app import db
+from utils.passwords import password_hasher
+from sqlalchemy import func
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -15,6 +16,19 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_active = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Directory search (see UserService): prefix lookups for typeahead and
+        # trigram indexes for substring matches
+        db.Index('ix_users_username_prefix', func.lower(username).label('username_lower'),
+                 postgresql_ops={'username_lower': 'text_pattern_ops'}),
+        db.Index('ix_users_display_name_prefix', func.lower(display_name).label('display_name_lower'),
+                 postgresql_ops={'display_name_lower': 'text_pattern_ops'}),
+        db.Index('ix_users_username_trgm', func.lower(username).label('username_lower'),
+                 postgresql_using='gin', postgresql_ops={'username_lower': 'gin_trgm_ops'}),
+        db.Index('ix_users_display_name_trgm', func.lower(display_name).label('display_name_lower'),
+                 postgresql_using='gin', postgresql_ops={'display_name_lower': 'gin_trgm_ops'}),
+    )
+    
     # Relationships
     sent_messages = db.relationship('Message', backref='sender', lazy='dynamic',
                                    foreign_keys='Message.sender_id')
@@ -22,15 +36,13 @@ class User(db.Model):
     direct_message_participations = db.relationship('DirectMessageParticipant', 
                                                    backref='user', lazy='dynamic')
     
+    # Both run bcrypt on the password hashing pool (see PasswordHasher) and may
+    # raise PasswordHasherBusy when it is saturated
     def set_password(self, password):
-        password_bytes = password.encode('utf-8')
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        password_bytes = password.encode('utf-8')
-        hash_bytes = self.password_hash.encode('utf-8')
-        return bcrypt.checkpw(password_bytes, hash_bytes)
+        return password_hasher.verify(password, self.password_hash)
     
     def to_dict(self, include_email=False):
         data = {
@@ -39,8 +51,8 @@ class User(db.Model):
             'display_name': self.display_name,
             'avatar_url': self.avatar_url,
             'status': self.status,
-            'created_at': self.created_at.isoformat() + 'Z',
-            'last_active': self.last_active.isoformat() + 'Z'
+            'created_at': self.created_at,
+            'last_active': self.last_active
         }
         if include_email:
             data['email'] = self.email
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.channel_service import ChannelService
+from services.read_state_service import ReadStateService
 
 channel_bp = Blueprint('channels', __name__)
 
@@ -30,6 +31,13 @@ def get_user_channels():
     result, status_code = ChannelService.get_user_channels(user_id)
     return jsonify(result), status_code
 
+@channel_bp.route('/unread', methods=['GET'])
+@jwt_required()
+def get_unread_counts():
+    user_id = int(get_jwt_identity())
+    result, status_code = ReadStateService.get_unread_counts(user_id)
+    return jsonify(result), status_code
+
 @channel_bp.route('/<int:channel_id>', methods=['GET'])
 @jwt_required()
 def get_channel(channel_id):
@@ -76,4 +84,14 @@ def create_direct_message():
 def get_user_direct_messages():
     user_id = int(get_jwt_identity())
     result, status_code = ChannelService.get_user_direct_messages(user_id)
+    return jsonify(result), status_code
+
+@channel_bp.route('/direct-messages/inbox', methods=['GET'])
+@jwt_required()
+def get_direct_message_inbox():
+    user_id = int(get_jwt_identity())
+    per_page = max(1, min(request.args.get('per_page', 30, type=int), 100))
+    cursor = request.args.get('cursor')
+    
+    result, status_code = ChannelService.get_direct_message_inbox(user_id, per_page, cursor)
     return jsonify(result), status_code
\ No newline at end of file
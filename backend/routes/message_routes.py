@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.export_service import ExportService
 from services.message_service import MessageService
+from services.search_service import SearchService
 
 message_bp = Blueprint('messages', __name__)
 
@@ -28,9 +30,18 @@ def get_channel_messages(channel_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
     
-    result, status_code = MessageService.get_channel_messages(channel_id, user_id, page, per_page)
+    # Cursor mode: pass `before` (empty for the newest page) or `after`
+    before = request.args.get('before')
+    after = request.args.get('after')
+    
+    result, status_code = MessageService.get_channel_messages(channel_id, user_id, page, per_page, before, after)
     return jsonify(result), status_code
 
+@message_bp.route('/channel/<int:channel_id>/export', methods=['GET'])
+@jwt_required()
+def export_channel_messages(channel_id):
+    return _export_response(int(get_jwt_identity()), f'channel-{channel_id}', channel_id=channel_id)
+
 @message_bp.route('/direct/<int:chat_id>', methods=['POST'])
 @jwt_required()
 def send_direct_message(chat_id):
@@ -48,6 +59,19 @@ def send_direct_message(chat_id):
     result, status_code = MessageService.send_direct_message(user_id, chat_id, content)
     return jsonify(result), status_code
 
+@message_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def send_message_batch():
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'success': False, 'message': 'No input data provided'}), 400
+        
+    # {"messages": [{"channel_id": 1, "content": "..."}, {"chat_id": 2, "content": "..."}, ...]}
+    result, status_code = MessageService.send_message_batch(user_id, data.get('messages'))
+    return jsonify(result), status_code
+
 @message_bp.route('/direct/<int:chat_id>', methods=['GET'])
 @jwt_required()
 def get_direct_messages(chat_id):
@@ -55,9 +79,39 @@ def get_direct_messages(chat_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
     
-    result, status_code = MessageService.get_direct_messages(chat_id, user_id, page, per_page)
+    # Cursor mode: pass `before` (empty for the newest page) or `after`
+    before = request.args.get('before')
+    after = request.args.get('after')
+    
+    result, status_code = MessageService.get_direct_messages(chat_id, user_id, page, per_page, before, after)
     return jsonify(result), status_code
 
+@message_bp.route('/direct/<int:chat_id>/export', methods=['GET'])
+@jwt_required()
+def export_direct_messages(chat_id):
+    return _export_response(int(get_jwt_identity()), f'direct-{chat_id}', chat_id=chat_id)
+
+def _export_response(user_id, name, channel_id=None, chat_id=None):
+    error = ExportService.check_access(user_id, channel_id=channel_id, chat_id=chat_id)
+    if error:
+        result, status_code = error
+        return jsonify(result), status_code
+        
+    # Resume an interrupted export with the id of the last message received
+    after_id = request.args.get('after_id', type=int)
+    compress = request.args.get('gzip', 'false').lower() == 'true'
+    
+    chunks = ExportService.stream(channel_id=channel_id, chat_id=chat_id, after_id=after_id, compress=compress)
+    filename = f'{name}.ndjson.gz' if compress else f'{name}.ndjson'
+    
+    return Response(stream_with_context(chunks),
+                    mimetype='application/gzip' if compress else 'application/x-ndjson',
+                    headers={
+                        'Content-Disposition': f'attachment; filename={filename}',
+                        # Stream through reverse proxies instead of buffering the whole export
+                        'X-Accel-Buffering': 'no'
+                    })
+
 @message_bp.route('/<int:message_id>/reactions', methods=['POST'])
 @jwt_required()
 def add_reaction(message_id):
@@ -73,4 +127,46 @@ def add_reaction(message_id):
         return jsonify({'success': False, 'message': 'Reaction is required'}), 400
         
     result, status_code = MessageService.add_reaction(user_id, message_id, reaction)
+    return jsonify(result), status_code
+
+@message_bp.route('/<int:message_id>/reactions', methods=['DELETE'])
+@jwt_required()
+def remove_reaction(message_id):
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'success': False, 'message': 'No input data provided'}), 400
+        
+    reaction = data.get('reaction')
+    
+    if not reaction:
+        return jsonify({'success': False, 'message': 'Reaction is required'}), 400
+        
+    result, status_code = MessageService.remove_reaction(user_id, message_id, reaction)
+    return jsonify(result), status_code
+
+@message_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_messages():
+    user_id = int(get_jwt_identity())
+    query = request.args.get('q', '')
+    sort = request.args.get('sort', 'recent')
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+    
+    if sort not in ['recent', 'relevance']:
+        return jsonify({'success': False, 'message': 'Invalid sort'}), 400
+        
+    # Optional filters; after/before are ISO dates or datetimes
+    result, status_code = SearchService.search_messages(
+        user_id, query,
+        channel_id=request.args.get('channel_id', type=int),
+        chat_id=request.args.get('chat_id', type=int),
+        sender_id=request.args.get('sender_id', type=int),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        sort=sort,
+        per_page=per_page,
+        cursor=request.args.get('cursor')
+    )
     return jsonify(result), status_code
\ No newline at end of file
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
+from services.profile_service import ProfileService
+from services.user_service import UserService
 from app import db
 
 user_bp = Blueprint('users', __name__)
@@ -9,14 +11,14 @@ user_bp = Blueprint('users', __name__)
 @jwt_required()
 def get_current_user():
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
+    user = ProfileService.get(user_id, include_email=True)
     
     if not user:
         return jsonify({'success': False, 'message': 'User not found'}), 404
         
     return jsonify({
         'success': True,
-        'user': user.to_dict(include_email=True)
+        'user': user
     }), 200
 
 @user_bp.route('/status', methods=['PUT'])
@@ -40,6 +42,7 @@ def update_status():
         
     user.status = status
     db.session.commit()
+    ProfileService.invalidate(user_id)
     
     return jsonify({
         'success': True,
@@ -50,33 +53,37 @@ def update_status():
 @user_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_users():
-    query = request.args.get('query', '')
+    query = request.args.get('query', '').strip()[:100]
+    mode = request.args.get('mode', 'search')
+    cursor = request.args.get('cursor')
     
-    # Search users by username or display name
-    if query:
-        users = User.query.filter(
-            (User.username.ilike(f'%{query}%')) | 
-            (User.display_name.ilike(f'%{query}%'))
-        ).all()
+    if mode not in ['search', 'typeahead']:
+        return jsonify({'success': False, 'message': 'Invalid mode'}), 400
+        
+    # Without a query: the paginated directory
+    if not query:
+        per_page = max(1, min(request.args.get('per_page', 50, type=int), 100))
+        result, status_code = UserService.list_directory(per_page, cursor)
+    elif mode == 'typeahead':
+        limit = max(1, min(request.args.get('per_page', 8, type=int), 20))
+        result, status_code = UserService.typeahead(query, limit)
     else:
-        users = User.query.all()
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+        result, status_code = UserService.search(query, per_page, cursor)
         
-    return jsonify({
-        'success': True,
-        'users': [user.to_dict() for user in users]
-    }), 200
+    return jsonify(result), status_code
 
 @user_bp.route('/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_user(user_id):
-    user = User.query.get(user_id)
+    user = ProfileService.get(user_id)
     
     if not user:
         return jsonify({'success': False, 'message': 'User not found'}), 404
         
     return jsonify({
         'success': True,
-        'user': user.to_dict()
+        'user': user
     }), 200
 
 @user_bp.route('/me', methods=['PUT'])
@@ -101,6 +108,7 @@ def update_profile():
         user.avatar_url = data['avatar_url']
         
     db.session.commit()
+    ProfileService.invalidate(user_id)
     
     return jsonify({
         'success': True,
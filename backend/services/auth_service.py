@@ -1,9 +1,13 @@
 from flask_jwt_extended import create_access_token, create_refresh_token
 from models.user import User
+from services.profile_service import ProfileService
+from utils.passwords import password_hasher, PasswordHasherBusy
 from app import db
 from sqlalchemy.exc import IntegrityError
 import re
 
+BUSY_RESPONSE = {'success': False, 'message': 'Server is busy, please try again shortly'}, 503
+
 class AuthService:
     @staticmethod
     def register_user(username, email, password, display_name=None):
@@ -50,6 +54,9 @@ class AuthService:
                 'refresh_token': refresh_token
             }, 201
             
+        except PasswordHasherBusy:
+            db.session.rollback()
+            return BUSY_RESPONSE
         except IntegrityError:
             db.session.rollback()
             return {'success': False, 'message': 'Error creating user'}, 500
@@ -66,10 +73,20 @@ class AuthService:
         user = User.query.filter_by(username=username).first()
         
         # Check if user exists and password is correct
-        if user and user.check_password(password):
+        try:
+            password_ok = user is not None and user.check_password(password)
+            
+            # Upgrade hashes made with an old cost factor while the password is at hand
+            if password_ok and password_hasher.needs_rehash(user.password_hash):
+                user.set_password(password)
+        except PasswordHasherBusy:
+            return BUSY_RESPONSE
+        
+        if password_ok:
             # Update last_active
             user.status = 'online'
             db.session.commit()
+            ProfileService.invalidate(user.id)
             
             # Generate tokens
             access_token = create_access_token(identity=str(user.id))
@@ -1,8 +1,20 @@
+from collections import defaultdict
+from datetime import datetime
 from models.channel import Channel, ChannelMember, DirectMessageChat, DirectMessageParticipant
+from models.message import Message
 from models.user import User
+from services.membership_service import MembershipService
+from services.profile_service import ProfileService
+from services.read_state_service import ReadStateService
+from utils.pagination import encode_cursor, decode_cursor
 from app import db, socketio
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
+# Characters of the last message shown in the DM inbox
+INBOX_PREVIEW_LENGTH = 140
+
 class ChannelService:
     @staticmethod
     def create_channel(user_id, name, description=None, is_private=False):
@@ -27,11 +39,13 @@ class ChannelService:
             db.session.add(member)
             db.session.commit()
             
+            MembershipService.remember_channel_member(channel.id, user_id)
+            
             # Notify users via Socket.IO
             socketio.emit('channel_created', {
                 'channel': channel.to_dict(),
                 'creator_id': user_id
-            }, broadcast=True)
+            })
             
             return {
                 'success': True,
@@ -54,10 +68,7 @@ class ChannelService:
             
         # If private channel, check if user is a member
         if channel.is_private and user_id:
-            is_member = ChannelMember.query.filter_by(
-                channel_id=channel_id, 
-                user_id=user_id
-            ).first() is not None
+            is_member = MembershipService.is_channel_member(channel_id, user_id)
             
             if not is_member:
                 return {'success': False, 'message': 'Access denied'}, 403
@@ -94,19 +105,13 @@ class ChannelService:
             return {'success': False, 'message': 'User not found'}, 404
             
         # Check if adder is a member
-        is_adder_member = ChannelMember.query.filter_by(
-            channel_id=channel_id, 
-            user_id=added_by_id
-        ).first() is not None
+        is_adder_member = MembershipService.is_channel_member(channel_id, added_by_id)
         
         if not is_adder_member:
             return {'success': False, 'message': 'You must be a channel member to add users'}, 403
             
         # Check if user is already a member
-        is_already_member = ChannelMember.query.filter_by(
-            channel_id=channel_id, 
-            user_id=user_id
-        ).first() is not None
+        is_already_member = MembershipService.is_channel_member(channel_id, user_id)
         
         if is_already_member:
             return {'success': False, 'message': 'User is already a channel member'}, 409
@@ -121,6 +126,8 @@ class ChannelService:
             db.session.add(member)
             db.session.commit()
             
+            MembershipService.remember_channel_member(channel_id, user_id)
+            
             # Notify users via Socket.IO
             socketio.emit('channel_member_added', {
                 'channel_id': channel_id,
@@ -158,42 +165,37 @@ class ChannelService:
         if not user or not recipient:
             return {'success': False, 'message': 'User not found'}, 404
             
-        # Check if DM already exists between these users
-        existing_dms = DirectMessageChat.query.join(
-            DirectMessageParticipant, 
-            DirectMessageChat.id == DirectMessageParticipant.chat_id
-        ).filter(
-            DirectMessageParticipant.user_id.in_([user_id, recipient_id])
-        ).all()
+        # Check if DM already exists between these users (one lookup on the unique key)
+        participant_key = DirectMessageChat.participant_key_for([user_id, recipient_id])
+        existing_dm = DirectMessageChat.query.filter_by(participant_key=participant_key).first()
         
-        for dm in existing_dms:
-            # Count participants to ensure it's just these two users
-            participant_count = DirectMessageParticipant.query.filter_by(chat_id=dm.id).count()
-            
-            if participant_count == 2:
-                # Check if both users are participants
-                user_is_participant = DirectMessageParticipant.query.filter_by(
-                    chat_id=dm.id, 
-                    user_id=user_id
-                ).first() is not None
-                
-                recipient_is_participant = DirectMessageParticipant.query.filter_by(
-                    chat_id=dm.id, 
-                    user_id=recipient_id
-                ).first() is not None
-                
-                if user_is_participant and recipient_is_participant:
-                    return {
-                        'success': True,
-                        'direct_message': dm.to_dict(include_participants=True),
-                        'message': 'Direct message already exists'
-                    }, 200
+        if existing_dm:
+            return {
+                'success': True,
+                'direct_message': existing_dm.to_dict(include_participants=True),
+                'message': 'Direct message already exists'
+            }, 200
         
         try:
-            # Create new direct message chat
-            dm_chat = DirectMessageChat()
-            db.session.add(dm_chat)
-            db.session.flush()  # Get chat ID before commit
+            # Create new direct message chat; a concurrent request for the same pair
+            # waits on the key and then inserts nothing
+            chat_id = db.session.execute(
+                insert(DirectMessageChat.__table__)
+                .values(participant_key=participant_key, created_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=['participant_key'])
+                .returning(DirectMessageChat.__table__.c.id)
+            ).scalar()
+            
+            if chat_id is None:
+                db.session.rollback()
+                existing_dm = DirectMessageChat.query.filter_by(participant_key=participant_key).first()
+                return {
+                    'success': True,
+                    'direct_message': existing_dm.to_dict(include_participants=True),
+                    'message': 'Direct message already exists'
+                }, 200
+                
+            dm_chat = DirectMessageChat.query.get(chat_id)
             
             # Add participants
             participant1 = DirectMessageParticipant(
@@ -210,6 +212,9 @@ class ChannelService:
             db.session.add(participant2)
             db.session.commit()
             
+            MembershipService.remember_dm_participant(dm_chat.id, user_id)
+            MembershipService.remember_dm_participant(dm_chat.id, recipient_id)
+            
             # Notify users via Socket.IO
             socketio.emit('direct_message_created', {
                 'direct_message': dm_chat.to_dict(),
@@ -233,33 +238,120 @@ class ChannelService:
             db.session.rollback()
             return {'success': False, 'message': str(e)}, 500
     
+    @staticmethod
+    def _other_participants(chat_ids, user_id):
+        """Return {chat_id: [profile]} of everyone but user_id in the chats, in two queries at most."""
+        others = defaultdict(list)
+        if chat_ids:
+            participants = DirectMessageParticipant.query \
+                .with_entities(DirectMessageParticipant.chat_id, DirectMessageParticipant.user_id) \
+                .filter(
+                    DirectMessageParticipant.chat_id.in_(chat_ids),
+                    DirectMessageParticipant.user_id != user_id
+                ) \
+                .all()
+                
+            for chat_id, participant_id in participants:
+                others[chat_id].append(participant_id)
+                
+        profiles = ProfileService.get_many([pid for ids in others.values() for pid in ids])
+        
+        return {
+            chat_id: [profiles[pid] for pid in sorted(ids) if pid in profiles]
+            for chat_id, ids in others.items()
+        }
+    
     @staticmethod
     def get_user_direct_messages(user_id):
-        # Get DM chat IDs where user is a participant
-        dm_participants = DirectMessageParticipant.query.filter_by(user_id=user_id).all()
-        chat_ids = [p.chat_id for p in dm_participants]
+        # The user's DM chats with their other participants, loaded for all chats at once
+        dm_chats = DirectMessageChat.query \
+            .join(DirectMessageParticipant, DirectMessageParticipant.chat_id == DirectMessageChat.id) \
+            .filter(DirectMessageParticipant.user_id == user_id) \
+            .all()
         
-        # Get DM chats
-        dm_chats = DirectMessageChat.query.filter(DirectMessageChat.id.in_(chat_ids)).all()
+        others = ChannelService._other_participants([chat.id for chat in dm_chats], user_id)
         
-        # For each chat, get the other participants for easy display
         result_dms = []
         for chat in dm_chats:
             chat_dict = chat.to_dict()
+            chat_dict['other_participants'] = others.get(chat.id, [])
+            result_dms.append(chat_dict)
+        
+        return {
+            'success': True,
+            'direct_messages': result_dms
+        }, 200
+    
+    @staticmethod
+    def get_direct_message_inbox(user_id, per_page=30, cursor=None):
+        """Return the user's DM chats by most recent activity, one keyset page at a time.
+
+        Each chat comes with its other participants, a preview of the last
+        message, the last activity time and the unread count. A page costs a
+        constant number of queries: the chats with their last message, the
+        other participants, the unread counts and (for uncached profiles) the
+        users.
+        """
+        # Latest message per chat: a top-1 probe of the (chat, created_at, id) index
+        last_message_id = db.session.query(Message.id) \
+            .filter(Message.direct_message_chat_id == DirectMessageParticipant.chat_id) \
+            .order_by(Message.created_at.desc(), Message.id.desc()) \
+            .limit(1) \
+            .correlate(DirectMessageParticipant) \
+            .scalar_subquery()
             
-            # Get participant user IDs
-            participants = DirectMessageParticipant.query.filter_by(chat_id=chat.id).all()
-            participant_ids = [p.user_id for p in participants]
+        inbox = db.session.query(
+            DirectMessageParticipant.chat_id.label('chat_id'),
+            last_message_id.label('last_message_id')
+        ).filter(DirectMessageParticipant.user_id == user_id).subquery()
+        
+        last_activity = func.coalesce(Message.created_at, DirectMessageChat.created_at)
+        
+        query = db.session.query(DirectMessageChat, Message, last_activity) \
+            .select_from(inbox) \
+            .join(DirectMessageChat, DirectMessageChat.id == inbox.c.chat_id) \
+            .outerjoin(Message, Message.id == inbox.c.last_message_id)
             
-            # Get the other participant(s)
-            other_participants = User.query.filter(
-                User.id.in_([pid for pid in participant_ids if pid != user_id])
-            ).all()
+        if cursor:
+            try:
+                activity_at, chat_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            except ValueError as e:
+                return {'success': False, 'message': str(e)}, 400
+                
+            query = query.filter(tuple_(last_activity, DirectMessageChat.id) < tuple_(activity_at, chat_id))
             
-            chat_dict['other_participants'] = [user.to_dict() for user in other_participants]
+        # Fetch one extra row to know whether another page exists
+        rows = query.order_by(last_activity.desc(), DirectMessageChat.id.desc()) \
+            .limit(per_page + 1) \
+            .all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        
+        chat_ids = [chat.id for chat, _, _ in rows]
+        
+        # Other participants and unread counts for the whole page
+        others = ChannelService._other_participants(chat_ids, user_id)
+        unread_counts = ReadStateService.get_direct_unread_counts(user_id, chat_ids) if chat_ids else {}
+        
+        result_dms = []
+        for chat, message, activity_at in rows:
+            chat_dict = chat.to_dict()
+            chat_dict['other_participants'] = others.get(chat.id, [])
+            chat_dict['last_message'] = {
+                'id': message.id,
+                'sender_id': message.sender_id,
+                'content': message.content[:INBOX_PREVIEW_LENGTH],
+                'created_at': message.created_at
+            } if message else None
+            chat_dict['last_activity'] = activity_at
+            chat_dict['unread_count'] = unread_counts.get(chat.id, 0)
             result_dms.append(chat_dict)
+            
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0].id) if rows else (cursor or None)
         
         return {
             'success': True,
-            'direct_messages': result_dms
+            'direct_messages': result_dms,
+            'next_cursor': next_cursor,
+            'has_more': has_more
         }, 200
\ No newline at end of file
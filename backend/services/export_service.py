@@ -0,0 +1,95 @@
+import zlib
+from flask import current_app
+from models.channel import Channel, DirectMessageChat
+from models.message import Message
+from services.hydration_service import HydrationService
+from services.membership_service import MembershipService
+from app import db
+from sqlalchemy import select
+
+# Messages fetched per round trip of the server-side cursor (and hydrated together)
+EXPORT_BATCH_SIZE = 1000
+
+class ExportService:
+    """Streaming NDJSON export of a channel's or DM chat's whole history.
+
+    Messages are read in id order through a server-side cursor (yield_per),
+    hydrated a batch at a time and written one JSON object per line, so
+    memory use does not depend on the size of the history. Each line carries
+    the message id; an interrupted export resumes with after_id set to the
+    last id received.
+    """
+
+    @staticmethod
+    def check_access(user_id, channel_id=None, chat_id=None):
+        """Return an (error, status) pair if the user may not read the history, else None.
+        
+        Same rules as reading history: public channels are open to everyone,
+        private channels and DMs only to their members.
+        """
+        if channel_id is not None:
+            channel = Channel.query.get(channel_id)
+            if not channel:
+                return {'success': False, 'message': 'Channel not found'}, 404
+            
+            if channel.is_private and not MembershipService.is_channel_member(channel_id, user_id):
+                return {'success': False, 'message': 'Access denied'}, 403
+        else:
+            if not DirectMessageChat.query.get(chat_id):
+                return {'success': False, 'message': 'Direct message chat not found'}, 404
+            
+            if not MembershipService.is_dm_participant(chat_id, user_id):
+                return {'success': False, 'message': 'Access denied'}, 403
+        
+        return None
+
+    @staticmethod
+    def iter_messages(channel_id=None, chat_id=None, after_id=None, batch_size=EXPORT_BATCH_SIZE):
+        """Yield hydrated message dicts (sender and reaction counts) oldest first."""
+        query = select(Message)
+        
+        if channel_id is not None:
+            query = query.where(Message.channel_id == channel_id)
+        else:
+            query = query.where(Message.direct_message_chat_id == chat_id)
+        
+        if after_id:
+            query = query.where(Message.id > after_id)
+        
+        result = db.session.execute(query.order_by(Message.id).execution_options(yield_per=batch_size))
+        
+        try:
+            for batch in result.scalars().partitions():
+                yield from HydrationService.hydrate_messages(batch)
+                
+                # Drop the batch from the identity map so memory stays flat
+                for message in batch:
+                    db.session.expunge(message)
+        finally:
+            result.close()
+
+    @staticmethod
+    def stream(channel_id=None, chat_id=None, after_id=None, compress=False, batch_size=EXPORT_BATCH_SIZE):
+        """Yield the export as bytes chunks of NDJSON, gzip-compressed if compress is set."""
+        codec = current_app.json.codec
+        compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+        lines = []
+        
+        def flush():
+            chunk = ''.join(lines).encode('utf-8')
+            lines.clear()
+            return compressor.compress(chunk) if compressor else chunk
+        
+        for message_data in ExportService.iter_messages(channel_id, chat_id, after_id, batch_size):
+            lines.append(codec.dumps(message_data) + '\n')
+            
+            if len(lines) >= batch_size:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+        
+        chunk = flush()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
@@ -0,0 +1,49 @@
+from collections import defaultdict
+from models.message import MessageReaction, MessageReactionCount
+from services.profile_service import ProfileService
+from app import db
+from sqlalchemy import and_
+
+class HydrationService:
+    @staticmethod
+    def hydrate_messages(messages, user_id=None):
+        """Serialize a page of messages with their senders and reaction summaries.
+
+        Senders come from the profile cache (one query for any misses); reaction
+        counts, with whether the viewer made each one, are loaded with one query
+        for the whole page, instead of one query per message.
+        """
+        if not messages:
+            return []
+            
+        message_ids = [message.id for message in messages]
+        sender_ids = {message.sender_id for message in messages if message.sender_id}
+        
+        # Get all senders for the page
+        senders = ProfileService.get_many(sender_ids) if sender_ids else {}
+        
+        # Get reaction counts for the page, grouped by message, each joined to the
+        # viewer's own reaction of that kind if there is one
+        reactions_by_message = defaultdict(list)
+        counts = db.session.query(MessageReactionCount, MessageReaction.id.isnot(None)) \
+            .outerjoin(MessageReaction, and_(
+                MessageReaction.message_id == MessageReactionCount.message_id,
+                MessageReaction.reaction == MessageReactionCount.reaction,
+                MessageReaction.user_id == user_id
+            )) \
+            .filter(MessageReactionCount.message_id.in_(message_ids)) \
+            .order_by(MessageReactionCount.reaction) \
+            .all()
+        
+        for count, mine in counts:
+            summary = count.to_dict()
+            summary['me'] = mine
+            reactions_by_message[count.message_id].append(summary)
+        
+        message_list = []
+        for message in messages:
+            message_data = message.to_dict(reactions=reactions_by_message[message.id])
+            message_data['sender'] = senders.get(message.sender_id)
+            message_list.append(message_data)
+            
+        return message_list
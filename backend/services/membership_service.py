@@ -0,0 +1,63 @@
+from flask import current_app
+from models.channel import ChannelMember, DirectMessageParticipant
+
+class MembershipService:
+    """Authorization lookups for channels and DM chats, backed by a per-worker cache.
+
+    Only positive results are cached: a membership confirmed here stays valid
+    until its TTL expires, while a miss always falls through to the database,
+    so a member added by another worker is never refused. Write paths call
+    remember_* so new members are cached straight away.
+    """
+
+    @staticmethod
+    def _cache():
+        return current_app.extensions['membership_cache']
+
+    @staticmethod
+    def is_channel_member(channel_id, user_id):
+        key = ('channel', int(channel_id), int(user_id))
+        cache = MembershipService._cache()
+        
+        if cache.get(key):
+            return True
+            
+        is_member = ChannelMember.query.filter_by(
+            channel_id=channel_id, 
+            user_id=user_id
+        ).first() is not None
+        
+        if is_member:
+            cache.set(key, True)
+            
+        return is_member
+
+    @staticmethod
+    def is_dm_participant(chat_id, user_id):
+        key = ('direct', int(chat_id), int(user_id))
+        cache = MembershipService._cache()
+        
+        if cache.get(key):
+            return True
+            
+        is_participant = DirectMessageParticipant.query.filter_by(
+            chat_id=chat_id, 
+            user_id=user_id
+        ).first() is not None
+        
+        if is_participant:
+            cache.set(key, True)
+            
+        return is_participant
+
+    @staticmethod
+    def remember_channel_member(channel_id, user_id):
+        MembershipService._cache().set(('channel', int(channel_id), int(user_id)), True)
+
+    @staticmethod
+    def remember_dm_participant(chat_id, user_id):
+        MembershipService._cache().set(('direct', int(chat_id), int(user_id)), True)
+
+    @staticmethod
+    def get_cache_stats():
+        return MembershipService._cache().stats()
@@ -1,11 +1,20 @@
 from datetime import datetime
-from models.message import Message, MessageReaction
-from models.channel import Channel, ChannelMember, DirectMessageChat, DirectMessageParticipant
+from models.message import Message, MessageReaction, MessageReactionCount
+from models.channel import Channel, DirectMessageChat, DirectMessageParticipant
 from models.notification import Notification
-from models.user import User
+from services.hydration_service import HydrationService
+from services.profile_service import ProfileService
+from services.read_state_service import ReadStateService
+from services.membership_service import MembershipService
+from utils.pagination import encode_cursor, decode_cursor
 from app import db, socketio
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
+# Upper bound on POST /api/messages/batch
+MAX_BATCH_MESSAGES = 100
+
 class MessageService:
     @staticmethod
     def send_channel_message(user_id, channel_id, content):
@@ -19,10 +28,7 @@ class MessageService:
             return {'success': False, 'message': 'Channel not found'}, 404
             
         # Check if user is a member of the channel
-        is_member = ChannelMember.query.filter_by(
-            channel_id=channel_id, 
-            user_id=user_id
-        ).first() is not None
+        is_member = MembershipService.is_channel_member(channel_id, user_id)
         
         if not is_member:
             return {'success': False, 'message': 'You must be a channel member to send messages'}, 403
@@ -36,29 +42,15 @@ class MessageService:
             )
             
             db.session.add(message)
-            db.session.flush()  # Get message ID before commit
-            
-            # Create notifications for channel members (except sender)
-            channel_members = ChannelMember.query.filter(
-                ChannelMember.channel_id == channel_id,
-                ChannelMember.user_id != user_id
-            ).all()
-            
-            for member in channel_members:
-                notification = Notification(
-                    user_id=member.user_id,
-                    message_id=message.id
-                )
-                db.session.add(notification)
             
+            # No per-member notification rows: channel unread counts come from
+            # read cursors (see ReadStateService), so send cost is independent
+            # of channel size
             db.session.commit()
             
-            # Get sender for response
-            sender = User.query.get(user_id)
-            
             # Construct response with sender info
             message_data = message.to_dict()
-            message_data['sender'] = sender.to_dict()
+            message_data['sender'] = ProfileService.get(user_id)
             
             # Notify channel members via Socket.IO
             socketio.emit('new_message', {
@@ -89,10 +81,7 @@ class MessageService:
             return {'success': False, 'message': 'Direct message chat not found'}, 404
             
         # Check if user is a participant in the DM chat
-        is_participant = DirectMessageParticipant.query.filter_by(
-            chat_id=chat_id, 
-            user_id=user_id
-        ).first() is not None
+        is_participant = MembershipService.is_dm_participant(chat_id, user_id)
         
         if not is_participant:
             return {'success': False, 'message': 'You must be a participant to send messages'}, 403
@@ -123,19 +112,14 @@ class MessageService:
             
             db.session.commit()
             
-            # Get sender for response
-            sender = User.query.get(user_id)
-            
             # Construct response with sender info
             message_data = message.to_dict()
-            message_data['sender'] = sender.to_dict()
+            message_data['sender'] = ProfileService.get(user_id)
             
-            # Notify participants via Socket.IO
-            participants = DirectMessageParticipant.query.filter_by(chat_id=chat_id).all()
-            for participant in participants:
-                socketio.emit('new_direct_message', {
-                    'message': message_data
-                }, room=f'user_{participant.user_id}')
+            # Notify participants via Socket.IO (one emit to the chat's room)
+            socketio.emit('new_direct_message', {
+                'message': message_data
+            }, room=f'direct_{chat_id}')
             
             return {
                 'success': True,
@@ -150,135 +134,319 @@ class MessageService:
             return {'success': False, 'message': str(e)}, 500
     
     @staticmethod
-    def get_channel_messages(channel_id, user_id, page=1, per_page=50):
+    def send_message_batch(user_id, items):
+        """Send many messages to channels and/or DM chats in one transaction.
+        
+        Each item is {'content', 'channel_id'} or {'content', 'chat_id'}. Every
+        distinct channel and chat is authorized once, the messages are inserted
+        with one multi-row INSERT, and each room gets a single 'new_messages' or
+        'new_direct_messages' event. Returns a result per item, in order; items
+        that fail validation or authorization don't stop the others.
+        """
+        if not isinstance(items, list) or not items:
+            return {'success': False, 'message': 'messages must be a non-empty list'}, 400
+            
+        if len(items) > MAX_BATCH_MESSAGES:
+            return {'success': False, 'message': f'At most {MAX_BATCH_MESSAGES} messages per batch'}, 400
+        
+        results = [None] * len(items)
+        targets = {}
+        
+        for index, item in enumerate(items):
+            error = MessageService._validate_batch_item(item)
+            if error:
+                results[index] = {'success': False, 'message': error, 'status': 400}
+            else:
+                target = ('channel', item['channel_id']) if 'channel_id' in item else ('direct', item['chat_id'])
+                targets.setdefault(target, []).append(index)
+        
+        # Authorize each distinct channel and chat once
+        channel_ids = [target_id for kind, target_id in targets if kind == 'channel']
+        chat_ids = [target_id for kind, target_id in targets if kind == 'direct']
+        existing_channels = {channel_id for channel_id, in db.session.query(Channel.id).filter(Channel.id.in_(channel_ids))}
+        existing_chats = {chat_id for chat_id, in db.session.query(DirectMessageChat.id).filter(DirectMessageChat.id.in_(chat_ids))}
+        
+        rows = []
+        for (kind, target_id), indexes in targets.items():
+            if kind == 'channel':
+                if target_id not in existing_channels:
+                    error = ('Channel not found', 404)
+                elif not MembershipService.is_channel_member(target_id, user_id):
+                    error = ('You must be a channel member to send messages', 403)
+                else:
+                    error = None
+            else:
+                if target_id not in existing_chats:
+                    error = ('Direct message chat not found', 404)
+                elif not MembershipService.is_dm_participant(target_id, user_id):
+                    error = ('You must be a participant to send messages', 403)
+                else:
+                    error = None
+            
+            for index in indexes:
+                if error:
+                    results[index] = {'success': False, 'message': error[0], 'status': error[1]}
+                else:
+                    rows.append((index, {
+                        'content': items[index]['content'],
+                        'sender_id': user_id,
+                        'channel_id': target_id if kind == 'channel' else None,
+                        'direct_message_chat_id': target_id if kind == 'direct' else None
+                    }))
+        
+        # Channel messages first, then DMs: the ORM issues one multi-row INSERT per run of rows
+        # with the same columns set. Within a room, messages keep the order they were given in
+        rows.sort(key=lambda row: (row[1]['channel_id'] is None, row[0]))
+        
+        if rows:
+            try:
+                messages = db.session.scalars(
+                    insert(Message).returning(Message, sort_by_parameter_order=True),
+                    [values for _, values in rows]
+                ).all()
+                
+                # Serialized before commit, which would expire them and reload each one
+                message_list = [message.to_dict() for message in messages]
+                
+                # DM participants other than the sender get a notification per message, as in send_direct_message
+                direct_messages = [message for message in messages if message.direct_message_chat_id]
+                if direct_messages:
+                    recipients = {}
+                    for chat_id, participant_id in db.session.query(
+                        DirectMessageParticipant.chat_id, DirectMessageParticipant.user_id
+                    ).filter(
+                        DirectMessageParticipant.chat_id.in_({message.direct_message_chat_id for message in direct_messages}),
+                        DirectMessageParticipant.user_id != user_id
+                    ):
+                        recipients.setdefault(chat_id, []).append(participant_id)
+                    
+                    notifications = [
+                        {'user_id': participant_id, 'message_id': message.id}
+                        for message in direct_messages
+                        for participant_id in recipients.get(message.direct_message_chat_id, [])
+                    ]
+                    if notifications:
+                        db.session.execute(insert(Notification), notifications)
+                
+                db.session.commit()
+                
+            except Exception as e:
+                db.session.rollback()
+                return {'success': False, 'message': str(e)}, 500
+            
+            sender = ProfileService.get(user_id)
+            rooms = {}
+            
+            for (index, _), message_data in zip(rows, message_list):
+                message_data['sender'] = sender
+                results[index] = {'success': True, 'message': message_data}
+                
+                channel_id = message_data['channel_id']
+                chat_id = message_data['direct_message_chat_id']
+                if channel_id:
+                    room = ('new_messages', f'channel_{channel_id}', {'channel_id': channel_id})
+                else:
+                    room = ('new_direct_messages', f'direct_{chat_id}', {'chat_id': chat_id})
+                rooms.setdefault(room[:2], (room[2], []))[1].append(message_data)
+            
+            # One event per room for the whole batch
+            for (event, room), (payload, room_messages) in rooms.items():
+                socketio.emit(event, {**payload, 'messages': room_messages}, room=room)
+        
+        return {
+            'success': True,
+            'results': results,
+            'sent': len(rows),
+            'failed': len(items) - len(rows)
+        }, 200
+    
+    @staticmethod
+    def _validate_batch_item(item):
+        """Return an error message for a malformed batch item, or None."""
+        if not isinstance(item, dict):
+            return 'Each message must be an object'
+            
+        if ('channel_id' in item) == ('chat_id' in item):
+            return 'Each message needs exactly one of channel_id or chat_id'
+            
+        target_id = item.get('channel_id', item.get('chat_id'))
+        if not isinstance(target_id, int) or isinstance(target_id, bool):
+            return 'channel_id and chat_id must be integers'
+            
+        content = item.get('content')
+        if not isinstance(content, str) or not content.strip():
+            return 'Message content cannot be empty'
+            
+        return None
+    
+    @staticmethod
+    def get_channel_messages(channel_id, user_id, page=1, per_page=50, before=None, after=None):
         # Check if channel exists
         channel = Channel.query.get(channel_id)
         if not channel:
             return {'success': False, 'message': 'Channel not found'}, 404
             
         # Check if user is a member of the channel
-        is_member = ChannelMember.query.filter_by(
-            channel_id=channel_id, 
-            user_id=user_id
-        ).first() is not None
+        is_member = MembershipService.is_channel_member(channel_id, user_id)
         
         if not is_member and channel.is_private:
             return {'success': False, 'message': 'Access denied'}, 403
             
         # Get messages with pagination
-        messages = Message.query.filter_by(channel_id=channel_id) \
-            .order_by(Message.created_at.desc()) \
-            .paginate(page=page, per_page=per_page, error_out=False)
-        
-        # Get sender info for each message
-        message_list = []
-        for message in messages.items:
-            message_data = message.to_dict(include_reactions=True)
-            sender = User.query.get(message.sender_id)
-            message_data['sender'] = sender.to_dict() if sender else None
-            message_list.append(message_data)
-        
-        # Mark notifications as read
-        notifications = Notification.query.join(Message) \
-            .filter(
-                Notification.user_id == user_id,
-                Message.channel_id == channel_id,
-                Notification.is_read == False
-            ).all()
+        try:
+            messages, pagination = MessageService._get_history_page(
+                Message.query.filter_by(channel_id=channel_id), page, per_page, before, after
+            )
+        except ValueError:
+            return {'success': False, 'message': 'Invalid cursor'}, 400
+        
+        # Load senders and reactions for the whole page at once
+        message_list = HydrationService.hydrate_messages(messages, user_id)
         
-        for notification in notifications:
-            notification.is_read = True
+        # Mark channel as read up to the latest message
+        if is_member:
+            ReadStateService.mark_read(user_id, channel_id=channel_id)
         
         db.session.commit()
         
         return {
             'success': True,
             'messages': message_list,
-            'total': messages.total,
-            'pages': messages.pages,
-            'current_page': messages.page
+            **pagination
         }, 200
     
     @staticmethod
-    def get_direct_messages(chat_id, user_id, page=1, per_page=50):
+    def get_direct_messages(chat_id, user_id, page=1, per_page=50, before=None, after=None):
         # Check if DM chat exists
         dm_chat = DirectMessageChat.query.get(chat_id)
         if not dm_chat:
             return {'success': False, 'message': 'Direct message chat not found'}, 404
             
         # Check if user is a participant in the DM chat
-        is_participant = DirectMessageParticipant.query.filter_by(
-            chat_id=chat_id, 
-            user_id=user_id
-        ).first() is not None
+        is_participant = MembershipService.is_dm_participant(chat_id, user_id)
         
         if not is_participant:
             return {'success': False, 'message': 'Access denied'}, 403
             
         # Get messages with pagination
-        messages = Message.query.filter_by(direct_message_chat_id=chat_id) \
-            .order_by(Message.created_at.desc()) \
-            .paginate(page=page, per_page=per_page, error_out=False)
-        
-        # Get sender info for each message
-        message_list = []
-        for message in messages.items:
-            message_data = message.to_dict(include_reactions=True)
-            sender = User.query.get(message.sender_id)
-            message_data['sender'] = sender.to_dict() if sender else None
-            message_list.append(message_data)
-        
-        # Mark notifications as read
-        notifications = Notification.query.join(Message) \
-            .filter(
-                Notification.user_id == user_id,
-                Message.direct_message_chat_id == chat_id,
-                Notification.is_read == False
-            ).all()
+        try:
+            messages, pagination = MessageService._get_history_page(
+                Message.query.filter_by(direct_message_chat_id=chat_id), page, per_page, before, after
+            )
+        except ValueError:
+            return {'success': False, 'message': 'Invalid cursor'}, 400
+        
+        # Load senders and reactions for the whole page at once
+        message_list = HydrationService.hydrate_messages(messages, user_id)
+        
+        # Mark notifications as read, in one UPDATE however many there are
+        Notification.query.filter(
+            Notification.user_id == user_id,
+            Notification.is_read == False,
+            Notification.message_id.in_(select(Message.id).where(Message.direct_message_chat_id == chat_id))
+        ).update({'is_read': True}, synchronize_session=False)
         
-        for notification in notifications:
-            notification.is_read = True
+        ReadStateService.mark_read(user_id, chat_id=chat_id)
         
         db.session.commit()
         
         return {
             'success': True,
             'messages': message_list,
-            'total': messages.total,
-            'pages': messages.pages,
-            'current_page': messages.page
+            **pagination
         }, 200
     
     @staticmethod
-    def add_reaction(user_id, message_id, reaction):
-        # Validate input
-        if not reaction or not reaction.strip():
-            return {'success': False, 'message': 'Reaction cannot be empty'}, 400
-            
-        # Check if message exists
+    def _get_history_page(query, page, per_page, before=None, after=None):
+        """Return (messages, pagination fields) for a history query, newest first.
+
+        Without a cursor this is the classic page/per_page mode. With `before` or
+        `after` it seeks on (created_at, id) instead, skipping OFFSET and COUNT(*).
+        An empty `before` starts from the newest message.
+        """
+        # A page of zero would never advance the cursor
+        per_page = max(1, min(per_page, 100))
+        
+        if before is None and after is None:
+            messages = query.order_by(Message.created_at.desc()) \
+                .paginate(page=page, per_page=per_page, error_out=False)
+            
+            return messages.items, {
+                'total': messages.total,
+                'pages': messages.pages,
+                'current_page': messages.page
+            }
+        
+        newer = after is not None
+        cursor = after if newer else before
+        
+        if cursor:
+            created_at, message_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            position = tuple_(Message.created_at, Message.id)
+            if newer:
+                query = query.filter(position > tuple_(created_at, message_id))
+            else:
+                query = query.filter(position < tuple_(created_at, message_id))
+        
+        if newer:
+            query = query.order_by(Message.created_at.asc(), Message.id.asc())
+        else:
+            query = query.order_by(Message.created_at.desc(), Message.id.desc())
+        
+        # Fetch one extra row to know whether another page exists
+        messages = query.limit(per_page + 1).all()
+        has_more = len(messages) > per_page
+        messages = messages[:per_page]
+        
+        next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id) if messages else (cursor or None)
+        
+        if newer:
+            messages.reverse()
+        
+        return messages, {
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }
+    
+    @staticmethod
+    def _check_message_access(user_id, message_id):
+        """Return (message, None) if the user can see the message, else (None, error response)."""
         message = Message.query.get(message_id)
         if not message:
-            return {'success': False, 'message': 'Message not found'}, 404
+            return None, ({'success': False, 'message': 'Message not found'}, 404)
             
         # Check if user has access to this message
         if message.channel_id:
             # Channel message
-            is_member = ChannelMember.query.filter_by(
-                channel_id=message.channel_id, 
-                user_id=user_id
-            ).first() is not None
+            is_member = MembershipService.is_channel_member(message.channel_id, user_id)
             
             if not is_member:
-                return {'success': False, 'message': 'Access denied'}, 403
+                return None, ({'success': False, 'message': 'Access denied'}, 403)
         else:
             # Direct message
-            is_participant = DirectMessageParticipant.query.filter_by(
-                chat_id=message.direct_message_chat_id, 
-                user_id=user_id
-            ).first() is not None
+            is_participant = MembershipService.is_dm_participant(message.direct_message_chat_id, user_id)
             
             if not is_participant:
-                return {'success': False, 'message': 'Access denied'}, 403
+                return None, ({'success': False, 'message': 'Access denied'}, 403)
+        
+        return message, None
+    
+    @staticmethod
+    def _emit_reaction_event(event, message, payload):
+        if message.channel_id:
+            socketio.emit(event, payload, room=f'channel_{message.channel_id}')
+        else:
+            socketio.emit(event, payload, room=f'direct_{message.direct_message_chat_id}')
+    
+    @staticmethod
+    def add_reaction(user_id, message_id, reaction):
+        # Validate input
+        if not reaction or not reaction.strip():
+            return {'success': False, 'message': 'Reaction cannot be empty'}, 400
+            
+        message, error = MessageService._check_message_access(user_id, message_id)
+        if error:
+            return error
         
         # Check if this reaction already exists
         existing_reaction = MessageReaction.query.filter_by(
@@ -299,34 +467,96 @@ class MessageService:
             )
             
             db.session.add(new_reaction)
+            db.session.flush()
+            
+            # Bump the aggregated counter in the same transaction
+            upsert = insert(MessageReactionCount.__table__).values(
+                message_id=message_id,
+                reaction=reaction,
+                count=1
+            )
+            upsert = upsert.on_conflict_do_update(
+                index_elements=['message_id', 'reaction'],
+                set_={'count': MessageReactionCount.__table__.c.count + 1}
+            ).returning(MessageReactionCount.__table__.c.count)
+            count = db.session.execute(upsert).scalar()
+            
             db.session.commit()
             
             # Construct response
             reaction_data = new_reaction.to_dict()
             
             # Notify users via Socket.IO
-            if message.channel_id:
-                socketio.emit('new_reaction', {
-                    'reaction': reaction_data
-                }, room=f'channel_{message.channel_id}')
-            else:
-                participants = DirectMessageParticipant.query.filter_by(
-                    chat_id=message.direct_message_chat_id
-                ).all()
-                
-                for participant in participants:
-                    socketio.emit('new_reaction', {
-                        'reaction': reaction_data
-                    }, room=f'user_{participant.user_id}')
+            MessageService._emit_reaction_event('new_reaction', message, {
+                'reaction': reaction_data,
+                'count': count
+            })
             
             return {
                 'success': True,
-                'reaction': reaction_data
+                'reaction': reaction_data,
+                'count': count
             }, 201
             
         except IntegrityError:
             db.session.rollback()
             return {'success': False, 'message': 'Error adding reaction'}, 500
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'message': str(e)}, 500
+    
+    @staticmethod
+    def remove_reaction(user_id, message_id, reaction):
+        # Validate input
+        if not reaction or not reaction.strip():
+            return {'success': False, 'message': 'Reaction cannot be empty'}, 400
+            
+        message, error = MessageService._check_message_access(user_id, message_id)
+        if error:
+            return error
+        
+        existing_reaction = MessageReaction.query.filter_by(
+            message_id=message_id,
+            user_id=user_id,
+            reaction=reaction
+        ).first()
+        
+        if not existing_reaction:
+            return {'success': False, 'message': 'Reaction not found'}, 404
+            
+        try:
+            reaction_data = existing_reaction.to_dict()
+            db.session.delete(existing_reaction)
+            
+            # Decrement the aggregated counter and drop it once it reaches zero
+            counts = MessageReactionCount.__table__
+            count = db.session.execute(
+                counts.update()
+                .where(counts.c.message_id == message_id, counts.c.reaction == reaction)
+                .values(count=counts.c.count - 1)
+                .returning(counts.c.count)
+            ).scalar() or 0
+            
+            if count <= 0:
+                count = 0
+                db.session.execute(
+                    counts.delete().where(counts.c.message_id == message_id, counts.c.reaction == reaction)
+                )
+            
+            db.session.commit()
+            
+            # Notify users via Socket.IO
+            MessageService._emit_reaction_event('reaction_removed', message, {
+                'reaction': reaction_data,
+                'count': count
+            })
+            
+            return {
+                'success': True,
+                'reaction': reaction_data,
+                'count': count
+            }, 200
+            
         except Exception as e:
             db.session.rollback()
             return {'success': False, 'message': str(e)}, 500
\ No newline at end of file
@@ -0,0 +1,75 @@
+from flask import current_app
+from models.user import User
+
+class ProfileService:
+    """User profiles (as embedded in messages) backed by a versioned per-worker cache.
+
+    Each user has a version number that write paths bump through invalidate()
+    after committing. A cache fill remembers the version it saw before
+    querying and is only stored if that version is unchanged, so a lookup
+    racing with an update can never put the old profile back. Other workers
+    pick up changes when their entry expires (PROFILE_CACHE_TTL); status
+    changes also reach clients live through presence updates.
+
+    Returned profiles are shared between callers and must not be modified.
+    """
+
+    @staticmethod
+    def _cache():
+        return current_app.extensions['profile_cache']
+
+    @staticmethod
+    def _versions():
+        return current_app.extensions['profile_versions']
+
+    @staticmethod
+    def get_many(user_ids, include_email=False):
+        """Return {user_id: profile} for the users that exist, loading all misses in one query."""
+        cache = ProfileService._cache()
+        versions = ProfileService._versions()
+        entries = {}
+        missing = {}
+        
+        for user_id in {int(user_id) for user_id in user_ids}:
+            version = versions.get(user_id, 0)
+            entry = cache.get(user_id)
+            
+            if entry is not None and entry[0] == version:
+                entries[user_id] = entry
+            else:
+                missing[user_id] = version
+        
+        if missing:
+            for user in User.query.filter(User.id.in_(missing)).all():
+                entry = (missing[user.id], user.to_dict(), user.email)
+                
+                # Skip the store if the profile was invalidated while we were reading it
+                if versions.get(user.id, 0) == entry[0]:
+                    cache.set(user.id, entry)
+                
+                entries[user.id] = entry
+        
+        if include_email:
+            return {user_id: dict(profile, email=email) for user_id, (_, profile, email) in entries.items()}
+        
+        return {user_id: profile for user_id, (_, profile, _) in entries.items()}
+
+    @staticmethod
+    def get(user_id, include_email=False):
+        """Return the profile of one user, or None if the user does not exist."""
+        return ProfileService.get_many([user_id], include_email=include_email).get(int(user_id))
+
+    @staticmethod
+    def invalidate(*user_ids):
+        """Drop cached profiles after a committed change to the users' rows."""
+        cache = ProfileService._cache()
+        versions = ProfileService._versions()
+        
+        for user_id in user_ids:
+            user_id = int(user_id)
+            versions[user_id] = versions.get(user_id, 0) + 1
+            cache.delete(user_id)
+
+    @staticmethod
+    def get_cache_stats():
+        return ProfileService._cache().stats()
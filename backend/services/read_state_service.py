@@ -0,0 +1,127 @@
+from datetime import datetime
+from models.channel import ChannelMember, DirectMessageParticipant
+from models.message import Message
+from models.read_cursor import ReadCursor
+from app import db
+from sqlalchemy import and_, func, literal, select
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
+
+class ReadStateService:
+    @staticmethod
+    def mark_read(user_id, channel_id=None, chat_id=None, message_id=None):
+        """Move the user's read cursor forward to message_id (default: the latest message).
+
+        The cursor never moves backwards. Returns the new position, or None if
+        the cursor did not move. The caller is responsible for committing.
+        """
+        cursors = ReadCursor.__table__
+        
+        if message_id is None:
+            if channel_id:
+                destination = Message.channel_id == channel_id
+            else:
+                destination = Message.direct_message_chat_id == chat_id
+            
+            # The upsert finds the latest message itself, saving a round trip on
+            # every history load; an empty destination selects no row to insert
+            latest = func.max(Message.id)
+            upsert = insert(cursors).from_select(
+                ['user_id', 'channel_id', 'direct_message_chat_id', 'last_read_message_id', 'updated_at'],
+                select(
+                    literal(user_id, cursors.c.user_id.type),
+                    literal(channel_id, cursors.c.channel_id.type),
+                    literal(chat_id, cursors.c.direct_message_chat_id.type),
+                    latest,
+                    literal(datetime.utcnow(), cursors.c.updated_at.type)
+                ).where(destination).having(latest.isnot(None))
+            )
+        else:
+            upsert = insert(cursors).values(
+                user_id=user_id,
+                channel_id=channel_id,
+                direct_message_chat_id=chat_id,
+                last_read_message_id=message_id,
+                updated_at=datetime.utcnow()
+            )
+        
+        upsert = upsert.on_conflict_do_update(
+            index_elements=['user_id', 'channel_id' if channel_id else 'direct_message_chat_id'],
+            set_={
+                'last_read_message_id': upsert.excluded.last_read_message_id,
+                'updated_at': upsert.excluded.updated_at
+            },
+            where=cursors.c.last_read_message_id < upsert.excluded.last_read_message_id
+        )
+        
+        return db.session.execute(upsert.returning(cursors.c.last_read_message_id)).scalar()
+    
+    @staticmethod
+    def get_unread_counts(user_id):
+        # Channels: messages from others past the read cursor. Members without a
+        # cursor yet count messages sent since they joined, i.e. past the last
+        # message before joining. Counting per channel keeps that one lower bound
+        # an index range scan; a join would read every message of the channels.
+        earlier = aliased(Message)
+        last_before_join = select(earlier.id) \
+            .where(earlier.channel_id == ChannelMember.channel_id,
+                   earlier.created_at <= ChannelMember.joined_at) \
+            .order_by(earlier.created_at.desc(), earlier.id.desc()) \
+            .limit(1) \
+            .correlate(ChannelMember) \
+            .scalar_subquery()
+        
+        unread = select(func.count(Message.id)) \
+            .where(Message.channel_id == ChannelMember.channel_id,
+                   Message.id > func.coalesce(ReadCursor.last_read_message_id, last_before_join, 0),
+                   Message.sender_id != user_id) \
+            .correlate(ChannelMember, ReadCursor) \
+            .scalar_subquery()
+        
+        channel_counts = db.session.query(ChannelMember.channel_id, unread) \
+            .outerjoin(ReadCursor, and_(
+                ReadCursor.user_id == ChannelMember.user_id,
+                ReadCursor.channel_id == ChannelMember.channel_id
+            )) \
+            .filter(ChannelMember.user_id == user_id) \
+            .all()
+        
+        direct_counts = ReadStateService.get_direct_unread_counts(user_id)
+        
+        return {
+            'success': True,
+            'channels': [
+                {'channel_id': channel_id, 'unread_count': count}
+                for channel_id, count in channel_counts if count
+            ],
+            'direct_messages': [
+                {'chat_id': chat_id, 'unread_count': count}
+                for chat_id, count in direct_counts.items()
+            ]
+        }, 200
+    
+    @staticmethod
+    def get_direct_unread_counts(user_id, chat_ids=None):
+        """Return {chat_id: unread count} for the user's DM chats (optionally only chat_ids).
+
+        Chats without unread messages are left out.
+        """
+        # Messages from others past the read cursor, counted per chat like channels
+        unread = select(func.count(Message.id)) \
+            .where(Message.direct_message_chat_id == DirectMessageParticipant.chat_id,
+                   Message.id > func.coalesce(ReadCursor.last_read_message_id, 0),
+                   Message.sender_id != user_id) \
+            .correlate(DirectMessageParticipant, ReadCursor) \
+            .scalar_subquery()
+        
+        query = db.session.query(DirectMessageParticipant.chat_id, unread) \
+            .outerjoin(ReadCursor, and_(
+                ReadCursor.user_id == DirectMessageParticipant.user_id,
+                ReadCursor.direct_message_chat_id == DirectMessageParticipant.chat_id
+            )) \
+            .filter(DirectMessageParticipant.user_id == user_id)
+        
+        if chat_ids is not None:
+            query = query.filter(DirectMessageParticipant.chat_id.in_(chat_ids))
+            
+        return {chat_id: count for chat_id, count in query.all() if count}
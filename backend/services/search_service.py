@@ -0,0 +1,146 @@
+import html
+import re
+from datetime import datetime
+from models.channel import ChannelMember, DirectMessageParticipant
+from models.message import Message
+from services.hydration_service import HydrationService
+from utils.pagination import encode_cursor, decode_cursor
+from app import db
+from sqlalchemy import REAL, and_, cast, func, literal_column, or_, tuple_
+
+# Text search configuration of Message.search_vector
+SEARCH_CONFIG = literal_column("'english'")
+
+# ts_headline markers, swapped for <mark> tags once the snippet is HTML-escaped
+HIGHLIGHT_START = '⟦'
+HIGHLIGHT_STOP = '⟧'
+HEADLINE_OPTIONS = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MinWords=10, MaxWords=30, MaxFragments=2'
+
+class SearchService:
+    @staticmethod
+    def build_tsquery(query):
+        """Translate search input into to_tsquery syntax.
+        
+        Terms are ANDed. "Quoted phrases" match adjacent words and a trailing
+        * makes a term a prefix match (deploy* finds deployment). Everything
+        but letters and digits is dropped, so user input can never produce
+        invalid tsquery syntax. Returns '' if nothing searchable is left.
+        """
+        terms = []
+        
+        for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+            words = re.findall(r'[^\W_]+', phrase or word)
+            if not words:
+                continue
+            
+            if word.endswith('*'):
+                words[-1] += ':*'
+            
+            terms.append(words[0] if len(words) == 1 else '(' + ' <-> '.join(words) + ')')
+        
+        return ' & '.join(terms)
+
+    @staticmethod
+    def search_messages(user_id, query, channel_id=None, chat_id=None, sender_id=None,
+                        after=None, before=None, sort='recent', per_page=20, cursor=None):
+        """Full-text search over the messages the user can read, one keyset page at a time.
+        
+        Access is enforced in SQL by joining the caller's channel memberships and
+        DM participations. Results are ordered newest first (sort='recent') or by
+        ts_rank_cd (sort='relevance'); each carries an HTML-escaped highlight.
+        """
+        tsquery_text = SearchService.build_tsquery(query or '')
+        if not tsquery_text:
+            return {'success': False, 'message': 'Search query is required'}, 400
+        
+        try:
+            after = datetime.fromisoformat(after) if after else None
+            before = datetime.fromisoformat(before) if before else None
+        except ValueError:
+            return {'success': False, 'message': 'Invalid date'}, 400
+        
+        tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+        document = Message.search_vector
+        
+        results = db.session.query(Message) \
+            .outerjoin(ChannelMember, and_(
+                ChannelMember.channel_id == Message.channel_id,
+                ChannelMember.user_id == user_id
+            )) \
+            .outerjoin(DirectMessageParticipant, and_(
+                DirectMessageParticipant.chat_id == Message.direct_message_chat_id,
+                DirectMessageParticipant.user_id == user_id
+            )) \
+            .filter(
+                or_(ChannelMember.id.isnot(None), DirectMessageParticipant.id.isnot(None)),
+                document.op('@@')(tsquery)
+            )
+        
+        if channel_id:
+            results = results.filter(Message.channel_id == channel_id)
+        if chat_id:
+            results = results.filter(Message.direct_message_chat_id == chat_id)
+        if sender_id:
+            results = results.filter(Message.sender_id == sender_id)
+        if after:
+            results = results.filter(Message.created_at >= after)
+        if before:
+            results = results.filter(Message.created_at < before)
+        
+        if sort == 'relevance':
+            rank = func.ts_rank_cd(document, tsquery)
+            order = (rank.desc(), Message.id.desc())
+            position = tuple_(rank, Message.id)
+            # ts_rank_cd returns real: compare as real so ties with the cursor row are exact
+            parsers = (lambda value: cast(float(value), REAL), int)
+        else:
+            rank = None
+            order = (Message.created_at.desc(), Message.id.desc())
+            position = tuple_(Message.created_at, Message.id)
+            parsers = (datetime.fromisoformat, int)
+        
+        if cursor:
+            try:
+                last_position = decode_cursor(cursor, *parsers)
+            except ValueError:
+                return {'success': False, 'message': 'Invalid cursor'}, 400
+            
+            results = results.filter(position < tuple_(*last_position))
+        
+        if rank is not None:
+            rows = results.add_columns(rank).order_by(*order).limit(per_page + 1).all()
+            messages = [message for message, _ in rows]
+            ranks = {message.id: message_rank for message, message_rank in rows}
+        else:
+            messages = results.order_by(*order).limit(per_page + 1).all()
+        
+        # Fetch one extra row to know whether another page exists
+        has_more = len(messages) > per_page
+        messages = messages[:per_page]
+        
+        next_cursor = None
+        if has_more:
+            last = messages[-1]
+            next_cursor = encode_cursor(ranks[last.id] if rank is not None else last.created_at, last.id)
+        
+        # Highlights only for the page, so ts_headline never runs on every match
+        highlights = {}
+        if messages:
+            highlights = dict(
+                db.session.query(Message.id, func.ts_headline(SEARCH_CONFIG, Message.content, tsquery, HEADLINE_OPTIONS))
+                .filter(Message.id.in_([message.id for message in messages]))
+                .all()
+            )
+        
+        message_list = HydrationService.hydrate_messages(messages, user_id)
+        for message_data in message_list:
+            message_data['highlight'] = html.escape(highlights.get(message_data['id'], '')) \
+                .replace(HIGHLIGHT_START, '<mark>') \
+                .replace(HIGHLIGHT_STOP, '</mark>')
+        
+        return {
+            'success': True,
+            'messages': message_list,
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }, 200
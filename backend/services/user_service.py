@@ -0,0 +1,112 @@
+from models.user import User
+from utils.pagination import encode_cursor, decode_cursor
+from sqlalchemy import case, func, or_, tuple_
+
+# Substring matches go through the trigram indexes, which need at least one trigram
+MIN_SUBSTRING_LENGTH = 3
+
+class UserService:
+    """User directory search.
+
+    Every path is served by an index on the lowercased username or display
+    name (see User.__table_args__) and is bounded by a limit: the directory is
+    keyset-paged by username, typeahead is top-N prefix lookups, and search
+    ranks exact, prefix and substring matches with keyset paging over
+    (rank, username).
+    """
+
+    @staticmethod
+    def _like_prefix(query):
+        escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f'{escaped}%', f'%{escaped}%'
+
+    @staticmethod
+    def _page(users, per_page, cursor_values):
+        has_more = len(users) > per_page
+        users = users[:per_page]
+        
+        return {
+            'success': True,
+            'users': [user.to_dict() for user in users],
+            'next_cursor': encode_cursor(*cursor_values(users[-1])) if has_more else None,
+            'has_more': has_more
+        }, 200
+
+    @staticmethod
+    def list_directory(per_page=50, cursor=None):
+        query = User.query
+        
+        if cursor:
+            try:
+                username, = decode_cursor(cursor, str)
+            except ValueError:
+                return {'success': False, 'message': 'Invalid cursor'}, 400
+            
+            query = query.filter(User.username > username)
+        
+        users = query.order_by(User.username).limit(per_page + 1).all()
+        return UserService._page(users, per_page, lambda user: (user.username,))
+
+    @staticmethod
+    def typeahead(query, limit=8):
+        """Top prefix matches for per-keystroke lookups: one top-N index scan per field, no paging."""
+        query = query.lower()
+        prefix, _ = UserService._like_prefix(query)
+        
+        username = func.lower(User.username)
+        display_name = func.lower(User.display_name)
+        
+        by_username = User.query.filter(username.like(prefix, escape='\\')) \
+            .order_by(username) \
+            .limit(limit) \
+            .all()
+        by_display_name = User.query.filter(display_name.like(prefix, escape='\\')) \
+            .order_by(display_name) \
+            .limit(limit) \
+            .all()
+        
+        # Username matches (an exact match sorts first) rank above display name matches
+        users = {}
+        for user in by_username + by_display_name:
+            users.setdefault(user.id, user)
+        
+        return {
+            'success': True,
+            'users': [user.to_dict() for user in list(users.values())[:limit]]
+        }, 200
+
+    @staticmethod
+    def search(query, per_page=20, cursor=None):
+        """Ranked search: exact username, username prefix, display name prefix, then substring."""
+        query = query.lower()
+        prefix, substring = UserService._like_prefix(query)
+        
+        username = func.lower(User.username)
+        display_name = func.lower(User.display_name)
+        
+        matches = [username.like(prefix, escape='\\'), display_name.like(prefix, escape='\\')]
+        if len(query) >= MIN_SUBSTRING_LENGTH:
+            matches += [username.like(substring, escape='\\'), display_name.like(substring, escape='\\')]
+        
+        rank = case(
+            (username == query, 0),
+            (username.like(prefix, escape='\\'), 1),
+            (display_name.like(prefix, escape='\\'), 2),
+            else_=3
+        )
+        
+        results = User.query.with_entities(User, rank).filter(or_(*matches))
+        
+        if cursor:
+            try:
+                last_rank, last_username = decode_cursor(cursor, int, str)
+            except ValueError:
+                return {'success': False, 'message': 'Invalid cursor'}, 400
+            
+            results = results.filter(tuple_(rank, User.username) > tuple_(last_rank, last_username))
+        
+        rows = results.order_by(rank, User.username).limit(per_page + 1).all()
+        ranks = {user.id: user_rank for user, user_rank in rows}
+        
+        return UserService._page([user for user, _ in rows], per_page,
+                                 lambda user: (ranks[user.id], user.username))
@@ -0,0 +1,45 @@
+import time
+from flask import session
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+
+def authenticate_session(token):
+    """Verify a JWT once and store the identity in this socket's session.
+
+    Returns the user id, or None if the token is missing, invalid, or belongs
+    to a different user than the one this socket connected as.
+    """
+    if not token:
+        return None
+        
+    try:
+        decoded_token = decode_token(token)
+        user_id = int(decoded_token['sub'])
+    except (PyJWTError, JWTExtendedException, KeyError, TypeError, ValueError):
+        # Bad signature or claims, or a subject that is not a user id
+        return None
+        
+    if session.get('user_id') not in (None, user_id):
+        return None
+        
+    session['user_id'] = user_id
+    session['token_exp'] = decoded_token.get('exp')
+    return session['user_id']
+
+
+def get_session_user_id(data=None):
+    """Return the user id verified at connect, using a timestamp check for expiry.
+
+    Once the stored token has expired, a fresh token sent with the event (as
+    clients still do) is verified and replaces it.
+    """
+    user_id = session.get('user_id')
+    token_exp = session.get('token_exp')
+    
+    if user_id is not None and (token_exp is None or token_exp > time.time()):
+        return user_id
+        
+    token = data.get('token') if isinstance(data, dict) else None
+    return authenticate_session(token)
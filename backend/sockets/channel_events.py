@@ -1,36 +1,29 @@
-from flask import request
-from flask_socketio import emit, join_room, leave_room
-from flask_jwt_extended import decode_token
-from jwt.exceptions import PyJWTError
-from models.channel import Channel, ChannelMember
-from app import db
+from services.membership_service import MembershipService
+from sockets.auth import get_session_user_id
+from sockets.typing import typing_aggregator
 
 def register_channel_events(socketio):
     @socketio.on('typing_channel')
     def handle_channel_typing(data):
         try:
-            channel_id = data.get('channel_id')
-            token = data.get('token')
+            channel_id = int(data.get('channel_id') or 0)
             
-            if not channel_id or not token:
+            if not channel_id:
                 return
                 
-            # Decode token to get user ID
-            decoded_token = decode_token(token)
-            user_id = decoded_token['sub']
+            # Identity verified at connect
+            user_id = get_session_user_id(data)
+            if not user_id:
+                return
             
             # Check if user is a member of the channel
-            is_member = ChannelMember.query.filter_by(
-                channel_id=channel_id, 
-                user_id=user_id
-            ).first() is not None
+            is_member = MembershipService.is_channel_member(channel_id, user_id)
             
             if is_member:
-                # Broadcast typing status to channel members
-                emit('user_typing', {
-                    'channel_id': channel_id,
-                    'user_id': user_id
-                }, room=f'channel_{channel_id}', include_self=False)
+                # Coalesced into one typing_update per room per tick
+                typing_aggregator.typing(f'channel_{channel_id}', user_id, {
+                    'channel_id': channel_id
+                })
                 
         except Exception:
             pass  # Ignore errors
@@ -38,28 +31,18 @@ def register_channel_events(socketio):
     @socketio.on('stopped_typing_channel')
     def handle_channel_stopped_typing(data):
         try:
-            channel_id = data.get('channel_id')
-            token = data.get('token')
+            channel_id = int(data.get('channel_id') or 0)
             
-            if not channel_id or not token:
+            if not channel_id:
                 return
                 
-            # Decode token to get user ID
-            decoded_token = decode_token(token)
-            user_id = decoded_token['sub']
-            
-            # Check if user is a member of the channel
-            is_member = ChannelMember.query.filter_by(
-                channel_id=channel_id, 
-                user_id=user_id
-            ).first() is not None
+            # Identity verified at connect
+            user_id = get_session_user_id(data)
+            if not user_id:
+                return
             
-            if is_member:
-                # Broadcast stopped typing status to channel members
-                emit('user_stopped_typing', {
-                    'channel_id': channel_id,
-                    'user_id': user_id
-                }, room=f'channel_{channel_id}', include_self=False)
+            # Only users recorded as typing (so already authorized) have state to clear
+            typing_aggregator.stopped(f'channel_{channel_id}', user_id)
                 
         except Exception:
             pass  # Ignore errors
\ No newline at end of file
@@ -1,32 +1,27 @@
-from flask import request
+from flask import current_app, request, session
 from flask_socketio import emit, join_room, leave_room
-from flask_jwt_extended import decode_token
-from jwt.exceptions import PyJWTError
 from models.user import User
-from models.channel import ChannelMember
-from app import db
+from models.channel import ChannelMember, DirectMessageParticipant
+from services.membership_service import MembershipService
+from sockets.auth import authenticate_session, get_session_user_id
+from sockets.presence import presence_tracker
 
 def register_connection_events(socketio):
     @socketio.on('connect')
-    def handle_connect():
+    def handle_connect(auth=None):
         try:
-            # Get token from request
-            token = request.args.get('token')
-            if not token:
-                return False  # Reject connection if no token
-                
-            # Decode token to get user ID
-            decoded_token = decode_token(token)
-            user_id = int(decoded_token['sub'])
+            # Get token from the auth payload or the query string
+            token = (auth or {}).get('token') or request.args.get('token')
+            
+            # Verify the token once; later events use the identity stored in the session
+            user_id = authenticate_session(token)
+            if not user_id:
+                return False  # Reject connection if token is missing or invalid
             
             # Get user
             user = User.query.get(user_id)
             if not user:
                 return False  # Reject connection if user not found
-                
-            # Update user status
-            user.status = 'online'
-            db.session.commit()
             
             # Join user's personal room for direct messages
             join_room(f'user_{user_id}')
@@ -36,67 +31,107 @@ def register_connection_events(socketio):
             for membership in channel_memberships:
                 join_room(f'channel_{membership.channel_id}')
             
-            # Broadcast user status change to others
-            emit('user_status_change', {
-                'user_id': user_id,
-                'status': 'online'
-            }, broadcast=True)
+            # Join rooms for all direct message chats the user takes part in
+            dm_participations = DirectMessageParticipant.query.filter_by(user_id=user_id).all()
+            for participation in dm_participations:
+                join_room(f'direct_{participation.chat_id}')
+            
+            # Status is persisted and announced in batches by the presence tracker
+            presence_tracker.connect(user_id, request.sid)
             
             return True
             
-        except PyJWTError:
-            return False  # Reject connection if token is invalid
         except Exception:
             return False  # Reject connection on any error
     
     @socketio.on('disconnect')
     def handle_disconnect():
         try:
-            # Get token from request
-            token = request.args.get('token')
-            if not token:
+            # Identity was stored at connect; no need to decode the token again
+            user_id = session.get('user_id')
+            if not user_id:
                 return
                 
-            # Decode token to get user ID
-            decoded_token = decode_token(token)
-            user_id = int(decoded_token['sub'])
+            # Other tabs keep the user online; otherwise they go offline after a grace period
+            presence_tracker.disconnect(user_id, request.sid)
             
-            # Get user
-            user = User.query.get(user_id)
-            if not user:
+        except Exception:
+            pass  # Ignore errors on disconnect
+    
+    @socketio.on('authenticate')
+    def handle_authenticate(data):
+        # Lets clients hand over a refreshed token without reconnecting
+        token = data.get('token') if isinstance(data, dict) else None
+        user_id = authenticate_session(token)
+        
+        if not user_id:
+            emit('authentication_failed', {})
+            return
+            
+        emit('authenticated', {'user_id': user_id})
+    
+    @socketio.on('subscribe_presence')
+    def handle_subscribe_presence(data):
+        try:
+            if not get_session_user_id(data):
                 return
                 
-            # Update user status
-            user.status = 'offline'
-            db.session.commit()
+            subscriptions = set(session.get('presence_subscriptions', []))
+            room_left = max(current_app.config['PRESENCE_MAX_SUBSCRIPTIONS'] - len(subscriptions), 0)
             
-            # Broadcast user status change to others
-            emit('user_status_change', {
-                'user_id': user_id,
-                'status': 'offline'
-            }, broadcast=True)
+            requested = {int(uid) for uid in data.get('user_ids', [])}
+            new_ids = sorted(requested - subscriptions)[:room_left]
+            if not new_ids:
+                return
+                
+            for uid in new_ids:
+                join_room(f'presence_{uid}')
+                
+            subscriptions.update(new_ids)
+            session['presence_subscriptions'] = list(subscriptions)
+            
+            # Current status of the newly watched users; diffs follow as 'presence_update'
+            users = User.query.with_entities(User.id, User.status) \
+                .filter(User.id.in_(new_ids)) \
+                .all()
+            emit('presence_snapshot', {
+                'statuses': [{'user_id': uid, 'status': status} for uid, status in users]
+            })
             
         except Exception:
-            pass  # Ignore errors on disconnect
+            pass  # Ignore errors
+    
+    @socketio.on('unsubscribe_presence')
+    def handle_unsubscribe_presence(data):
+        try:
+            if not get_session_user_id(data):
+                return
+                
+            subscriptions = set(session.get('presence_subscriptions', []))
+            
+            for uid in {int(uid) for uid in data.get('user_ids', [])} & subscriptions:
+                leave_room(f'presence_{uid}')
+                subscriptions.discard(uid)
+                
+            session['presence_subscriptions'] = list(subscriptions)
+            
+        except Exception:
+            pass  # Ignore errors
     
     @socketio.on('join_channel')
     def handle_join_channel(data):
         channel_id = data.get('channel_id')
-        token = data.get('token')
         
-        if not channel_id or not token:
+        if not channel_id:
             return
             
         try:
-            # Decode token to get user ID
-            decoded_token = decode_token(token)
-            user_id = int(decoded_token['sub'])
+            user_id = get_session_user_id(data)
+            if not user_id:
+                return
             
             # Check if user is a member of the channel
-            is_member = ChannelMember.query.filter_by(
-                channel_id=channel_id, 
-                user_id=user_id
-            ).first() is not None
+            is_member = MembershipService.is_channel_member(channel_id, user_id)
             
             if is_member:
                 # Join the channel room
@@ -106,17 +141,38 @@ def register_connection_events(socketio):
         except Exception:
             pass  # Ignore errors
     
+    @socketio.on('join_direct')
+    def handle_join_direct(data):
+        chat_id = data.get('chat_id')
+        
+        if not chat_id:
+            return
+            
+        try:
+            user_id = get_session_user_id(data)
+            if not user_id:
+                return
+            
+            # Sent by clients on 'direct_message_created' for chats made after they connected
+            is_participant = MembershipService.is_dm_participant(chat_id, user_id)
+            
+            if is_participant:
+                join_room(f'direct_{chat_id}')
+                emit('joined_direct', {'chat_id': chat_id})
+                
+        except Exception:
+            pass  # Ignore errors
+    
     @socketio.on('leave_channel')
     def handle_leave_channel(data):
         channel_id = data.get('channel_id')
-        token = data.get('token')
         
-        if not channel_id or not token:
+        if not channel_id:
             return
             
         try:
-            # Decode token to get user ID
-            decoded_token = decode_token(token)
+            if not get_session_user_id(data):
+                return
             
             # Leave the channel room
             leave_room(f'channel_{channel_id}')
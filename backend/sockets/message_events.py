@@ -1,44 +1,30 @@
-from flask import request
-from flask_socketio import emit
-from flask_jwt_extended import decode_token
-from jwt.exceptions import PyJWTError
-from models.channel import DirectMessageParticipant
-from app import db
+from services.membership_service import MembershipService
+from sockets.auth import get_session_user_id
+from sockets.typing import typing_aggregator
 
 def register_message_events(socketio):
     @socketio.on('typing_direct')
     def handle_direct_typing(data):
         try:
-            chat_id = data.get('chat_id')
-            token = data.get('token')
+            chat_id = int(data.get('chat_id') or 0)
             
-            if not chat_id or not token:
+            if not chat_id:
                 return
                 
-            # Decode token to get user ID
-            decoded_token = decode_token(token)
-            user_id = decoded_token['sub']
+            # Identity verified at connect
+            user_id = get_session_user_id(data)
+            if not user_id:
+                return
             
             # Check if user is a participant in the direct message chat
-            is_participant = DirectMessageParticipant.query.filter_by(
-                chat_id=chat_id, 
-                user_id=user_id
-            ).first() is not None
+            is_participant = MembershipService.is_dm_participant(chat_id, user_id)
             
             if is_participant:
-                # Get other participants
-                other_participants = DirectMessageParticipant.query.filter(
-                    DirectMessageParticipant.chat_id == chat_id,
-                    DirectMessageParticipant.user_id != user_id
-                ).all()
-                
-                # Broadcast typing status to other participants
-                for participant in other_participants:
-                    emit('user_typing', {
-                        'chat_id': chat_id,
-                        'user_id': user_id,
-                        'is_direct': True
-                    }, room=f'user_{participant.user_id}')
+                # Coalesced into one typing_update per chat per tick, sent to the chat's room
+                typing_aggregator.typing(f'direct_{chat_id}', user_id, {
+                    'chat_id': chat_id,
+                    'is_direct': True
+                })
                 
         except Exception:
             pass  # Ignore errors
@@ -46,36 +32,18 @@ def register_message_events(socketio):
     @socketio.on('stopped_typing_direct')
     def handle_direct_stopped_typing(data):
         try:
-            chat_id = data.get('chat_id')
-            token = data.get('token')
+            chat_id = int(data.get('chat_id') or 0)
             
-            if not chat_id or not token:
+            if not chat_id:
                 return
                 
-            # Decode token to get user ID
-            decoded_token = decode_token(token)
-            user_id = decoded_token['sub']
-            
-            # Check if user is a participant in the direct message chat
-            is_participant = DirectMessageParticipant.query.filter_by(
-                chat_id=chat_id, 
-                user_id=user_id
-            ).first() is not None
+            # Identity verified at connect
+            user_id = get_session_user_id(data)
+            if not user_id:
+                return
             
-            if is_participant:
-                # Get other participants
-                other_participants = DirectMessageParticipant.query.filter(
-                    DirectMessageParticipant.chat_id == chat_id,
-                    DirectMessageParticipant.user_id != user_id
-                ).all()
-                
-                # Broadcast stopped typing status to other participants
-                for participant in other_participants:
-                    emit('user_stopped_typing', {
-                        'chat_id': chat_id,
-                        'user_id': user_id,
-                        'is_direct': True
-                    }, room=f'user_{participant.user_id}')
+            # Only users recorded as typing (so already authorized) have state to clear
+            typing_aggregator.stopped(f'direct_{chat_id}', user_id)
                 
         except Exception:
             pass  # Ignore errors
\ No newline at end of file
@@ -0,0 +1,163 @@
+import select
+import uuid
+import psycopg2
+import socketio
+from psycopg2 import sql
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7800
+
+
+def split_utf8(data, size):
+    """Split UTF-8 bytes into strings of at most `size` bytes each, never inside a character."""
+    parts = []
+    start = 0
+    
+    while start < len(data):
+        end = min(start + size, len(data))
+        
+        # Back up over continuation bytes (0b10xxxxxx) to the start of a character
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+            
+        parts.append(data[start:end].decode('utf-8'))
+        start = end
+        
+    return parts
+
+
+class PostgresManager(socketio.PubSubManager):
+    """Socket.IO client manager that uses Postgres LISTEN/NOTIFY as its pub/sub backend.
+
+    Lets every gunicorn worker and replica share room fan-out through the
+    database the app already uses, with no extra service to run. Payloads
+    larger than a single NOTIFY are split into chunks sent in one transaction,
+    so they are delivered together and in order.
+    """
+    name = 'postgres'
+
+    def __init__(self, url, channel='socketio', write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.url = url
+        self.publish_connection = None
+        self.pending_chunks = {}
+
+    def _publish(self, data):
+        payload = self.json.dumps(data, separators=(',', ':'))
+        encoded = payload.encode('utf-8')
+        
+        # The limit is in bytes, and the codec writes non-ASCII characters as UTF-8
+        if len(encoded) <= NOTIFY_PAYLOAD_LIMIT:
+            notifications = [payload]
+        else:
+            # Chunk header: '#<message id>:<index>:<total>:'
+            message_id = uuid.uuid4().hex
+            parts = split_utf8(encoded, NOTIFY_PAYLOAD_LIMIT - 64)
+            notifications = [
+                f'#{message_id}:{index}:{len(parts)}:{part}'
+                for index, part in enumerate(parts)
+            ]
+        
+        for retries_left in range(1, -1, -1):  # 2 attempts
+            try:
+                if self.publish_connection is None or self.publish_connection.closed:
+                    self.publish_connection = psycopg2.connect(self.url)
+                    
+                with self.publish_connection.cursor() as cursor:
+                    for notification in notifications:
+                        cursor.execute('SELECT pg_notify(%s, %s)', (self.channel, notification))
+                        
+                self.publish_connection.commit()
+                return
+                
+            except psycopg2.Error as exc:
+                self.publish_connection = None
+                if retries_left > 0:
+                    self._get_logger().error('Cannot publish to postgres... retrying: %s', exc)
+                else:
+                    self._get_logger().error('Cannot publish to postgres... giving up: %s', exc)
+
+    def _assemble(self, payload):
+        """Return the decoded message for a notification, or None while chunks are pending."""
+        if not payload.startswith('#'):
+            return self.json.loads(payload)
+            
+        message_id, index, total, part = payload[1:].split(':', 3)
+        chunks = self.pending_chunks.setdefault(message_id, {})
+        chunks[int(index)] = part
+        
+        if len(chunks) < int(total):
+            return None
+            
+        del self.pending_chunks[message_id]
+        return self.json.loads(''.join(chunks[i] for i in range(int(total))))
+
+    def _listen(self):
+        retry_sleep = 1
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(self.url)
+                connection.autocommit = True
+                
+                with connection.cursor() as cursor:
+                    cursor.execute(sql.SQL('LISTEN {}').format(sql.Identifier(self.channel)))
+                retry_sleep = 1
+                
+                while True:
+                    # select() is cooperative under gevent, so this never blocks the hub
+                    select.select([connection], [], [], 5)
+                    connection.poll()
+                    
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        try:
+                            message = self._assemble(notification.payload)
+                        except ValueError:
+                            self._get_logger().error('Dropping malformed postgres notification')
+                            continue
+                            
+                        if message is not None:
+                            yield message
+                            
+            except psycopg2.Error as exc:
+                self._get_logger().error('Cannot receive from postgres... retrying in %s secs: %s',
+                                         retry_sleep, exc)
+                # A dropped connection loses any half-received chunked messages
+                self.pending_chunks.clear()
+                self.server.sleep(retry_sleep)
+                retry_sleep = min(retry_sleep * 2, 60)
+            finally:
+                if connection is not None and not connection.closed:
+                    connection.close()
+
+
+# URL prefix -> client manager, as chosen by Flask-SocketIO plus LISTEN/NOTIFY
+QUEUE_MANAGERS = (
+    (('postgres://', 'postgresql://'), PostgresManager),
+    (('redis://', 'rediss://'), socketio.RedisManager),
+    (('kafka://',), socketio.KafkaManager),
+    (('zmq',), socketio.ZmqManager),
+)
+
+
+def get_message_queue_options(app, json=None):
+    """Build the SocketIO options that connect this process to the configured message queue.
+
+    postgres:// and postgresql:// URLs use LISTEN/NOTIFY; redis://, kafka://
+    and zmq URLs use python-socketio's managers and anything else (amqp://,
+    ...) goes through kombu, like Flask-SocketIO's message_queue option. The
+    manager is built here so it encodes with the same json codec as the
+    server.
+    """
+    url = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = app.config.get('SOCKETIO_CHANNEL', 'socketio')
+    
+    if not url:
+        return {}
+        
+    manager_class = next(
+        (manager for prefixes, manager in QUEUE_MANAGERS if url.startswith(prefixes)),
+        socketio.KombuManager
+    )
+    return {'client_manager': manager_class(url, channel=channel, json=json)}
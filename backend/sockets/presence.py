@@ -0,0 +1,257 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+
+class PresenceTracker:
+    """In-memory presence with batched persistence and coalesced diffs.
+
+    Sessions are reference-counted per user, so extra tabs never flap a user
+    offline. A user whose last session closes stays online for a grace period
+    to absorb reloads and reconnect storms. Every flush tick sends at most one
+    'presence_update' per interested room with the users that came online or
+    went offline, and every persist tick writes status changes and last_active to the database
+    in a constant number of UPDATE statements.
+
+    Each worker only knows its own sockets. Workers refresh last_active for
+    every user they hold on each persist tick. Before a user is announced
+    offline, the tracker checks that no other worker has refreshed that
+    user recently.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.socketio = None
+        self.flush_interval = 2.0
+        self.persist_interval = 15.0
+        self.sessions = {}
+        self.pending_offline = {}
+        self.announced = {}
+        self.changed = set()
+        self.went_online = set()
+        self.went_offline = set()
+        self._lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app, socketio):
+        self.app = app
+        self.socketio = socketio
+        self.flush_interval = app.config.get('PRESENCE_FLUSH_INTERVAL', self.flush_interval)
+        self.persist_interval = app.config.get('PRESENCE_PERSIST_INTERVAL', self.persist_interval)
+
+    @property
+    def offline_grace(self):
+        # Longer than the liveness window, so our own last refresh has aged out
+        return self.persist_interval * 2
+
+    def connect(self, user_id, sid):
+        with self._lock:
+            self.sessions.setdefault(user_id, set()).add(sid)
+            self.pending_offline.pop(user_id, None)
+            self.changed.add(user_id)
+            
+            if self._task is None:
+                self._task = self.socketio.start_background_task(self._run)
+
+    def disconnect(self, user_id, sid):
+        with self._lock:
+            sids = self.sessions.get(user_id)
+            if not sids:
+                return
+                
+            sids.discard(sid)
+            if not sids:
+                del self.sessions[user_id]
+                self.pending_offline[user_id] = time.monotonic() + self.offline_grace
+
+    def is_online(self, user_id):
+        with self._lock:
+            return user_id in self.sessions or user_id in self.pending_offline
+
+    def online_user_ids(self):
+        with self._lock:
+            return set(self.sessions) | set(self.pending_offline)
+
+    def _expired_offline_candidates(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                user_id for user_id, expires_at in self.pending_offline.items()
+                if expires_at <= now
+            ]
+
+    def _resolve_offline(self, candidates):
+        """Move users whose grace period ended offline, unless another worker still holds them."""
+        from models.user import User
+        
+        if not candidates:
+            return
+            
+        liveness_window = datetime.utcnow() - timedelta(seconds=self.persist_interval * 1.5)
+        alive_elsewhere = {
+            user_id for (user_id,) in User.query.with_entities(User.id).filter(
+                User.id.in_(candidates),
+                User.last_active > liveness_window
+            ).all()
+        }
+        
+        with self._lock:
+            for user_id in candidates:
+                # Reconnected on this worker in the meantime
+                if user_id not in self.pending_offline:
+                    continue
+                    
+                del self.pending_offline[user_id]
+                
+                if user_id in alive_elsewhere:
+                    # The other worker owns the announcement now; forget ours so a later
+                    # reconnect here is announced again
+                    self.announced.pop(user_id, None)
+                else:
+                    self.changed.add(user_id)
+
+    def _collect_diff(self):
+        """Return (online, offline) user ids whose announced status changed since the last flush."""
+        online, offline = [], []
+        
+        with self._lock:
+            for user_id in self.changed:
+                status = 'online' if user_id in self.sessions or user_id in self.pending_offline else 'offline'
+                
+                if self.announced.get(user_id) == status:
+                    continue
+                    
+                if status == 'online':
+                    online.append(user_id)
+                    self.went_online.add(user_id)
+                    self.went_offline.discard(user_id)
+                    self.announced[user_id] = status
+                else:
+                    offline.append(user_id)
+                    self.went_offline.add(user_id)
+                    self.went_online.discard(user_id)
+                    self.announced.pop(user_id, None)
+                    
+            self.changed = set()
+            
+        return sorted(online), sorted(offline)
+
+    def _persist(self):
+        with self._lock:
+            went_online, self.went_online = self.went_online, set()
+            went_offline, self.went_offline = self.went_offline, set()
+            connected = list(self.sessions)
+            
+        now = datetime.utcnow()
+        
+        try:
+            self._write_presence(went_online, went_offline, connected, now)
+        except Exception:
+            # Keep the transitions so the next persist tick retries them
+            with self._lock:
+                self.went_online |= went_online - self.went_offline
+                self.went_offline |= went_offline - self.went_online
+            raise
+
+    def _write_presence(self, went_online, went_offline, connected, now):
+        from models.user import User
+        from services.profile_service import ProfileService
+        from app import db
+        
+        if went_online:
+            User.query.filter(User.id.in_(went_online)) \
+                .update({'status': 'online'}, synchronize_session=False)
+                
+        if went_offline:
+            User.query.filter(User.id.in_(went_offline)) \
+                .update({'status': 'offline', 'last_active': now}, synchronize_session=False)
+                
+        # Also serves as this worker's liveness signal for the users it holds
+        if connected:
+            User.query.filter(User.id.in_(connected)) \
+                .update({'last_active': now}, synchronize_session=False)
+                
+        db.session.commit()
+        
+        # Status changed; last_active refreshes alone are left to the profile cache TTL
+        if went_online or went_offline:
+            ProfileService.invalidate(*went_online, *went_offline)
+
+    def publish(self, online, offline):
+        """Send a diff only to the sockets that care about the users in it.
+
+        Interest comes from membership: the rooms of the channels a user
+        belongs to, the personal rooms of their DM partners, and the user's
+        presence room for explicit subscribers. It is resolved with two
+        queries per flush, and every room gets a single emit.
+        """
+        from app import db
+        from models.channel import ChannelMember, DirectMessageParticipant
+        from sqlalchemy import and_
+        from sqlalchemy.orm import aliased
+        
+        statuses = dict.fromkeys(online, 'online')
+        statuses.update(dict.fromkeys(offline, 'offline'))
+        changed = list(statuses)
+        
+        rooms = defaultdict(set)
+        
+        memberships = ChannelMember.query \
+            .with_entities(ChannelMember.channel_id, ChannelMember.user_id) \
+            .filter(ChannelMember.user_id.in_(changed)) \
+            .all()
+            
+        for channel_id, user_id in memberships:
+            rooms[f'channel_{channel_id}'].add(user_id)
+            
+        partner = aliased(DirectMessageParticipant)
+        partnerships = db.session.query(partner.user_id, DirectMessageParticipant.user_id) \
+            .join(partner, and_(
+                partner.chat_id == DirectMessageParticipant.chat_id,
+                partner.user_id != DirectMessageParticipant.user_id
+            )) \
+            .filter(DirectMessageParticipant.user_id.in_(changed)) \
+            .all()
+            
+        for partner_id, user_id in partnerships:
+            rooms[f'user_{partner_id}'].add(user_id)
+            
+        # Explicit subscriptions, see 'subscribe_presence'
+        for user_id in changed:
+            rooms[f'presence_{user_id}'].add(user_id)
+            
+        for room, user_ids in rooms.items():
+            self.socketio.emit('presence_update', {
+                'online': sorted(uid for uid in user_ids if statuses[uid] == 'online'),
+                'offline': sorted(uid for uid in user_ids if statuses[uid] == 'offline')
+            }, room=room)
+
+    def _run(self):
+        from app import db
+        
+        last_persist = time.monotonic()
+        
+        while True:
+            self.socketio.sleep(self.flush_interval)
+            
+            with self.app.app_context():
+                try:
+                    self._resolve_offline(self._expired_offline_candidates())
+                    
+                    online, offline = self._collect_diff()
+                    if online or offline:
+                        self.publish(online, offline)
+                        
+                    if time.monotonic() - last_persist >= self.persist_interval:
+                        last_persist = time.monotonic()
+                        self._persist()
+                        
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Presence flush failed')
+                finally:
+                    db.session.remove()
+
+
+presence_tracker = PresenceTracker()
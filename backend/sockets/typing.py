@@ -0,0 +1,112 @@
+import threading
+import time
+
+
+class TypingAggregator:
+    """Coalesces typing indicators per room.
+
+    Typing state lives in memory with an expiry per user. Repeat keystroke
+    events from a user who is already typing only extend the expiry, and
+    changes are flushed as at most one 'typing_update' per room per tick, so
+    typing traffic is bounded per room rather than per keystroke.
+
+    Updates are deltas ('typing' and 'stopped' user ids). A user's events
+    always arrive on the worker holding their socket, so deltas from several
+    workers combine correctly on the client.
+    """
+
+    def __init__(self):
+        self.socketio = None
+        self.tick = 0.5
+        self.ttl = 6.0
+        self.rooms = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app, socketio):
+        self.socketio = socketio
+        self.tick = app.config.get('TYPING_FLUSH_INTERVAL', self.tick)
+        self.ttl = app.config.get('TYPING_TIMEOUT', self.ttl)
+
+    def _room(self, room, payload):
+        state = self.rooms.get(room)
+        if state is None:
+            state = self.rooms[room] = {
+                'payload': payload,
+                'typists': {},
+                'started': set(),
+                'stopped': set()
+            }
+        return state
+
+    def typing(self, room, user_id, payload):
+        """Record that user_id is typing in the Socket.IO room.
+
+        payload identifies the room to clients.
+        """
+        with self._lock:
+            state = self._room(room, payload)
+            
+            if user_id not in state['typists']:
+                state['started'].add(user_id)
+                state['stopped'].discard(user_id)
+                
+            state['typists'][user_id] = time.monotonic() + self.ttl
+            
+            if self._task is None:
+                self._task = self.socketio.start_background_task(self._run)
+
+    def stopped(self, room, user_id):
+        with self._lock:
+            state = self.rooms.get(room)
+            
+            if state is None or state['typists'].pop(user_id, None) is None:
+                return
+                
+            # Started and stopped within one tick: nobody needs to hear about it
+            if user_id in state['started']:
+                state['started'].discard(user_id)
+            else:
+                state['stopped'].add(user_id)
+
+    def _collect(self):
+        """Expire stale typists and return the (room, update) pairs to emit."""
+        now = time.monotonic()
+        updates = []
+        
+        with self._lock:
+            for room, state in list(self.rooms.items()):
+                for user_id, expires_at in list(state['typists'].items()):
+                    if expires_at <= now:
+                        del state['typists'][user_id]
+                        if user_id in state['started']:
+                            state['started'].discard(user_id)
+                        else:
+                            state['stopped'].add(user_id)
+                
+                if state['started'] or state['stopped']:
+                    updates.append((room, dict(
+                        state['payload'],
+                        typing=sorted(state['started']),
+                        stopped=sorted(state['stopped'])
+                    )))
+                    state['started'] = set()
+                    state['stopped'] = set()
+                    
+                if not state['typists']:
+                    del self.rooms[room]
+                    
+        return updates
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.tick)
+            
+            for room, update in self._collect():
+                try:
+                    self.socketio.emit('typing_update', update, room=room)
+                except Exception:
+                    pass  # Never let one failed emit stop the flush loop
+
+
+typing_aggregator = TypingAggregator()
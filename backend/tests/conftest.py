@@ -0,0 +1,54 @@
+import os
+import sys
+import pytest
+
+# Tests import app modules the way the app does, relative to the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests on the seeded dataset run against this (migrated) Postgres database, inside a
+# transaction that is rolled back, and are skipped when it is not set
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+# Multiplier for the seeded dataset, as with `flask check-query-plans --scale`
+TEST_SEED_SCALE = float(os.environ.get('TEST_SEED_SCALE', 1))
+
+
+@pytest.fixture(scope='session')
+def seeded_database():
+    """(connection, population): the check dataset, seeded once for the whole session.
+
+    db.session runs on the connection with join_transaction_mode
+    'create_savepoint', so service commits only release savepoints and the
+    seed and every write are rolled back at the end.
+    """
+    from app import create_app
+    from commands.query_plans import seed_dataset
+    from commands.seed import rolled_back_session
+    from config import Config
+
+    if not TEST_DATABASE_URL:
+        pytest.skip('set TEST_DATABASE_URL to a migrated Postgres database to run')
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = TEST_DATABASE_URL
+
+    app = create_app(TestConfig)
+
+    with app.app_context(), rolled_back_session() as connection:
+        yield connection, seed_dataset(connection, TEST_SEED_SCALE)
+
+
+@pytest.fixture
+def seeded(seeded_database):
+    """The seeded Population, with cold per-worker caches and the test's writes rolled back after it."""
+    from app import db
+    from commands.query_budgets import clear_caches
+
+    connection, population = seeded_database
+    savepoint = connection.begin_nested()
+    clear_caches()
+
+    yield population
+
+    db.session.remove()
+    savepoint.rollback()
@@ -0,0 +1,143 @@
+import json
+import multiprocessing
+from collections import namedtuple
+import pytest
+from sockets import message_queue
+from sockets.message_queue import NOTIFY_PAYLOAD_LIMIT, PostgresManager, split_utf8
+
+Notify = namedtuple('Notify', 'channel payload')
+
+
+class StubCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement, parameters=None):
+        # Only pg_notify carries data; LISTEN is a no-op here
+        if parameters is not None:
+            channel, payload = parameters
+            assert len(payload.encode('utf-8')) < 8000, 'Postgres would reject this NOTIFY'
+            self.connection.send(channel, payload)
+
+
+class StubConnection:
+    """Stands in for a psycopg2 connection, carrying NOTIFYs over a multiprocessing pipe."""
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.closed = False
+        self.autocommit = False
+        self.notifies = []
+        self.sent = []
+
+    def cursor(self):
+        return StubCursor(self)
+
+    def send(self, channel, payload):
+        self.sent.append(payload)
+        if self.pipe is not None:
+            self.pipe.send((channel, payload))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def fileno(self):
+        return self.pipe.fileno()
+
+    def poll(self):
+        while self.pipe.poll():
+            self.notifies.append(Notify(*self.pipe.recv()))
+
+
+def publish_all(pipe, messages):
+    """Publisher process: send each message through a manager connected to the pipe."""
+    message_queue.psycopg2.connect = lambda url: StubConnection(pipe)
+    manager = PostgresManager('postgresql://stub', json=json)
+    for message in messages:
+        manager._publish(message)
+
+
+MESSAGES = [
+    {'method': 'emit', 'event': 'new_message', 'data': 'short'},
+    {'method': 'emit', 'event': 'new_message', 'data': 'x' * (NOTIFY_PAYLOAD_LIMIT - 100)},
+    {'method': 'emit', 'event': 'new_message', 'data': 'é' * 5039},
+    {'method': 'emit', 'event': 'new_message', 'data': '日本語' * 4000 + '🙂' * 500},
+]
+
+
+@pytest.fixture(params=['stdlib', 'utf-8'])
+def codec(request):
+    if request.param == 'stdlib':
+        return json
+
+    class Utf8Codec:
+        # Like the orjson codec: non-ASCII characters written as UTF-8, not escaped
+        @staticmethod
+        def dumps(obj, **kwargs):
+            return json.dumps(obj, ensure_ascii=False, **kwargs)
+
+        loads = staticmethod(json.loads)
+
+    return Utf8Codec
+
+
+@pytest.mark.parametrize('text', ['a', 'é', '日', '🙂', 'aé日🙂'])
+@pytest.mark.parametrize('size', [4, 5, 7, 64])
+def test_split_utf8_never_splits_a_character(text, size):
+    data = (text * 50).encode('utf-8')
+    parts = split_utf8(data, size)
+
+    assert ''.join(parts) == text * 50
+    assert all(len(part.encode('utf-8')) <= size for part in parts)
+
+
+@pytest.mark.parametrize('message', MESSAGES)
+def test_publish_chunks_under_the_byte_limit_and_reassembles(monkeypatch, codec, message):
+    connection = StubConnection(None)
+    monkeypatch.setattr(message_queue.psycopg2, 'connect', lambda url: connection)
+
+    PostgresManager('postgresql://stub', json=codec)._publish(message)
+    listener = PostgresManager('postgresql://stub', json=codec)
+    assembled = [listener._assemble(payload) for payload in connection.sent]
+
+    assert all(len(payload.encode('utf-8')) <= NOTIFY_PAYLOAD_LIMIT for payload in connection.sent)
+    assert assembled[-1] == message
+    assert all(result is None for result in assembled[:-1])
+    assert listener.pending_chunks == {}
+
+
+def test_payload_at_the_byte_limit_is_not_chunked(monkeypatch):
+    connection = StubConnection(None)
+    monkeypatch.setattr(message_queue.psycopg2, 'connect', lambda url: connection)
+    message = {'data': ''}
+    overhead = len(json.dumps(message, separators=(',', ':')))
+    message['data'] = 'x' * (NOTIFY_PAYLOAD_LIMIT - overhead)
+
+    PostgresManager('postgresql://stub', json=json)._publish(message)
+
+    assert len(connection.sent) == 1 and not connection.sent[0].startswith('#')
+
+
+def test_messages_published_in_another_process_are_delivered(monkeypatch):
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    monkeypatch.setattr(message_queue.psycopg2, 'connect', lambda url: StubConnection(receiver))
+
+    publisher = context.Process(target=publish_all, args=(sender, MESSAGES))
+    publisher.start()
+
+    listen = PostgresManager('postgresql://stub', json=json)._listen()
+    received = [next(listen) for _ in MESSAGES]
+
+    publisher.join(10)
+    assert publisher.exitcode == 0
+    assert received == MESSAGES
@@ -0,0 +1,62 @@
+import time
+import bcrypt
+import pytest
+from commands.benchmark_hashing import _measure
+from utils.passwords import PasswordHasher
+
+gevent = pytest.importorskip('gevent')
+
+PASSWORD = 'correct horse battery staple'
+ROUNDS = 8
+LOGINS = 8
+
+
+@pytest.fixture(scope='module')
+def hasher():
+    return PasswordHasher(rounds=ROUNDS, threads=4, queue_size=LOGINS, use_gevent=True)
+
+
+@pytest.fixture(scope='module')
+def password_hash(hasher):
+    return hasher.hash(PASSWORD)
+
+
+@pytest.fixture(scope='module')
+def verify_seconds(password_hash):
+    """How long one bcrypt verification holds the CPU at the test's cost factor."""
+    started = time.perf_counter()
+    bcrypt.checkpw(PASSWORD.encode('utf-8'), password_hash.encode('utf-8'))
+    return time.perf_counter() - started
+
+
+def hub_delay_bound_ms(verify_seconds):
+    # Inline, the hub waits for every login's bcrypt call in turn (LOGINS of them). On the
+    # pool it only loses CPU time slices to the hashing threads, which on a single core can
+    # still add up to about one verification.
+    return verify_seconds * 1000 * 2
+
+
+def test_hub_stays_responsive_while_logins_hash(hasher, password_hash, verify_seconds):
+    bound_ms = hub_delay_bound_ms(verify_seconds)
+    results = []
+
+    def login():
+        results.append(hasher.verify(PASSWORD, password_hash))
+        results.append(hasher.hash(PASSWORD) != password_hash)
+
+    delays, _ = _measure(gevent, LOGINS, login)
+
+    assert results == [True] * (2 * LOGINS)
+    assert max(delays) < bound_ms, f'hub stalled {max(delays):.1f} ms, bound {bound_ms:.1f} ms'
+
+
+def test_inline_hashing_stalls_the_hub(password_hash, verify_seconds):
+    # The same bound must fail without the pool, or the test above proves nothing
+    bound_ms = hub_delay_bound_ms(verify_seconds)
+
+    def login():
+        bcrypt.checkpw(PASSWORD.encode('utf-8'), password_hash.encode('utf-8'))
+
+    delays, _ = _measure(gevent, LOGINS, login)
+
+    assert max(delays) > bound_ms
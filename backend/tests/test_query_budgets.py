@@ -0,0 +1,12 @@
+import pytest
+from commands.query_budgets import BUDGETS, measure
+
+
+@pytest.mark.parametrize('name, budget, prepare', BUDGETS, ids=[name for name, _, _ in BUDGETS])
+def test_hot_call_stays_within_query_budget(seeded, name, budget, prepare):
+    call = prepare(seeded)
+
+    counter, _ = measure(call)
+
+    statements = '\n'.join(' '.join(statement.split())[:160] for statement in counter.statements)
+    assert len(counter.statements) <= budget, f'{len(counter.statements)} queries, budget {budget}:\n{statements}'
@@ -0,0 +1,19 @@
+import pytest
+from commands.query_plans import (SCENARIOS, TRIGRAM_SCENARIOS, explain_call, large_tables,
+                                  trigram_indexes_available)
+
+# Only sequential scans of tables at least this large fail a scenario
+MIN_ROWS = 10000
+
+
+@pytest.mark.parametrize('name, call', SCENARIOS, ids=[name for name, _ in SCENARIOS])
+def test_hot_query_avoids_sequential_scans(seeded_database, seeded, name, call):
+    connection, _ = seeded_database
+
+    if name in TRIGRAM_SCENARIOS and not trigram_indexes_available(connection):
+        pytest.skip('pg_trgm is not installed')
+
+    queries, scanned = explain_call(connection, lambda: call(seeded), large_tables(connection, MIN_ROWS))
+
+    assert queries
+    assert not scanned, f'sequential scan on {", ".join(sorted(scanned))}'
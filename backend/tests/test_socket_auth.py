@@ -0,0 +1,51 @@
+from datetime import timedelta
+import jwt
+import pytest
+from flask import Flask, session
+from flask_jwt_extended import JWTManager, create_access_token
+from sockets.auth import authenticate_session
+
+SECRET = 'test-jwt-secret-of-at-least-32-bytes'
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', JWT_SECRET_KEY=SECRET)
+    JWTManager(app)
+    return app
+
+
+@pytest.fixture
+def token(app):
+    def make(identity, **kwargs):
+        with app.app_context():
+            return create_access_token(identity=identity, **kwargs)
+    return make
+
+
+def test_valid_token_stores_the_identity(app, token):
+    with app.test_request_context():
+        assert authenticate_session(token('7')) == 7
+        assert session['user_id'] == 7
+
+
+@pytest.mark.parametrize('make_token', [
+    lambda token: None,
+    lambda token: 'not a jwt',
+    lambda token: token('7')[:-4] + 'AAAA',  # bad signature
+    lambda token: token('7', expires_delta=timedelta(seconds=-1)),
+    lambda token: jwt.encode({'type': 'access'}, SECRET, algorithm='HS256'),  # no subject
+    lambda token: token('alice'),  # subject is not a user id
+])
+def test_invalid_tokens_are_rejected_without_raising(app, token, make_token):
+    with app.test_request_context():
+        assert authenticate_session(make_token(token)) is None
+        assert 'user_id' not in session
+
+
+def test_token_of_another_user_is_rejected(app, token):
+    with app.test_request_context():
+        authenticate_session(token('7'))
+        assert authenticate_session(token('8')) is None
+        assert session['user_id'] == 7
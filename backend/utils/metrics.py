@@ -0,0 +1,222 @@
+import os
+import re
+import time
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+# Emit recipients per delivery; rooms range from one socket to whole-workspace channels
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Per-worker cache stats are copied into the metrics at most this often (seconds)
+CACHE_STATS_INTERVAL = 5
+
+# Rooms named '<type>_<id>' ('channel_12', 'direct_3', 'user_7') are labelled by their type
+ROOM_TYPE = re.compile(r'^([a-z]+)_\d+$')
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency, until the response is returned to the server.',
+    ['method', 'blueprint', 'route']
+)
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by response status.',
+    ['method', 'blueprint', 'route', 'status']
+)
+SOCKET_EVENT_SECONDS = Histogram(
+    'socketio_event_duration_seconds', 'Socket.IO event handler latency (count is the number of events).',
+    ['event']
+)
+SOCKET_EMIT_RECIPIENTS = Histogram(
+    'socketio_emit_recipients', 'Sockets on this worker that one emit was delivered to.',
+    ['room_type'], buckets=FANOUT_BUCKETS
+)
+SOCKET_CONNECTIONS = Gauge(
+    'socketio_connected_sockets', 'Sockets connected to the worker.',
+    multiprocess_mode='liveall'
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    'db_pool_checkout_duration_seconds', 'Time to get a connection from the SQLAlchemy pool, waiting included.'
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections', "Connections checked out of the worker's pool.",
+    multiprocess_mode='liveall'
+)
+DB_POOL_SIZE = Gauge(
+    'db_pool_size', "Connections the worker's pool keeps open (excluding overflow).",
+    multiprocess_mode='liveall'
+)
+DB_COMMIT_SECONDS = Histogram(
+    'db_commit_duration_seconds', 'Session commit latency, including the flush.'
+)
+CACHE_ENTRIES = Gauge(
+    'cache_entries', "Entries in the worker's cache.",
+    ['cache'], multiprocess_mode='liveall'
+)
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total', 'Per-worker cache lookups by result (hit or miss).',
+    ['cache', 'result']
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout takes, including waiting for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        DB_POOL_SIZE.set(self.size())
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+@event.listens_for(TimedQueuePool, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(TimedQueuePool, 'checkin')
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+
+
+@event.listens_for(Session, 'before_commit')
+def _on_before_commit(session):
+    session.info['commit_started'] = time.perf_counter()
+
+
+@event.listens_for(Session, 'after_commit')
+def _on_after_commit(session):
+    started = session.info.pop('commit_started', None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+
+class Metrics:
+    """Prometheus instrumentation for HTTP requests, Socket.IO, the database and the per-worker caches.
+
+    Metric values live in the worker process. When PROMETHEUS_MULTIPROC_DIR is
+    set (see gunicorn.conf.py), prometheus_client keeps them in memory-mapped
+    files in that directory instead, and a scrape of /metrics on any worker
+    reads and combines the files of every worker, so no external collector
+    is needed. Per-worker gauges carry a pid label.
+    """
+
+    def __init__(self):
+        self.caches = {}
+        self.cache_lookups = {}
+        self.cache_stats_at = 0.0
+
+    def init_app(self, app):
+        """Time requests and use the timed pool; call before db.init_app."""
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        if not uri.startswith('sqlite'):
+            app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).setdefault('poolclass', TimedQueuePool)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def init_socketio(self, socketio):
+        """Time every registered event handler and record emit fan-out; call after registering events."""
+        handlers = socketio.server.handlers.get('/', {})
+        for name, handler in handlers.items():
+            handlers[name] = self._timed_handler(name, handler)
+
+        # Called for every delivery on this worker, including emits relayed by the message queue
+        manager = socketio.server.manager
+        get_participants = manager.get_participants
+
+        def counted_participants(namespace, room):
+            participants = list(get_participants(namespace, room))
+            SOCKET_EMIT_RECIPIENTS.labels(_room_type(room)).observe(len(participants))
+            return participants
+
+        manager.get_participants = counted_participants
+
+    def track_cache(self, name, get_stats):
+        """Report a per-worker cache; get_stats returns its TTLCache.stats() in the app context."""
+        self.caches[name] = get_stats
+
+    def _update_cache_metrics(self):
+        now = time.monotonic()
+        if now - self.cache_stats_at < CACHE_STATS_INTERVAL:
+            return
+        self.cache_stats_at = now
+
+        for name, get_stats in self.caches.items():
+            stats = get_stats()
+            CACHE_ENTRIES.labels(name).set(stats['size'])
+
+            # The cache keeps running totals; the counters get what was added since the last
+            # update (all of it if the cache was replaced, e.g. by another create_app)
+            for result, total in (('hit', stats['hits']), ('miss', stats['misses'])):
+                previous = self.cache_lookups.get((name, result), 0)
+                CACHE_LOOKUPS.labels(name, result).inc(total - previous if total >= previous else total)
+                self.cache_lookups[(name, result)] = total
+
+    def _timed_handler(self, name, handler):
+        timer = SOCKET_EVENT_SECONDS.labels(name)
+
+        def timed(*args):
+            started = time.perf_counter()
+            try:
+                result = handler(*args)
+            except Exception as e:
+                # python-socketio calls disconnect handlers again without the reason argument
+                # if they don't take it, so that first attempt is not an event
+                if not (name == 'disconnect' and isinstance(e, TypeError)):
+                    timer.observe(time.perf_counter() - started)
+                raise
+            timer.observe(time.perf_counter() - started)
+
+            if name == 'connect' and result is not False:
+                SOCKET_CONNECTIONS.inc()
+            elif name == 'disconnect':
+                SOCKET_CONNECTIONS.dec()
+            return result
+
+        return timed
+
+    def _before_request(self):
+        g.request_started = time.perf_counter()
+
+    def _after_request(self, response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # The URL rule, not the path, so ids don't become separate series
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            blueprint = request.blueprint or ''
+            HTTP_REQUEST_SECONDS.labels(request.method, blueprint, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(request.method, blueprint, route, response.status_code).inc()
+
+        self._update_cache_metrics()
+        return response
+
+    def export(self):
+        """Return the current metrics of all workers as (body, content type)."""
+        # Cache stats of the other workers are as of their last request
+        self._update_cache_metrics()
+
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _room_type(room):
+    if room is None:
+        return 'all'
+    match = ROOM_TYPE.match(room) if isinstance(room, str) else None
+    return match.group(1) if match else 'client'
+
+
+metrics = Metrics()
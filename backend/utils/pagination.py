@@ -0,0 +1,31 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(*values):
+    """Encode a keyset position as an opaque, URL-safe cursor string."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, *parsers):
+    """Decode a cursor produced by encode_cursor.
+
+    Each parser converts the matching position value (e.g. datetime.fromisoformat, int).
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(payload, list) or len(payload) != len(parsers):
+        raise ValueError('Invalid cursor')
+
+    try:
+        return tuple(parser(value) for parser, value in zip(parsers, payload))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
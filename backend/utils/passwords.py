@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool's queue is full."""
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a bounded pool of OS threads.
+
+    A bcrypt call takes tens to hundreds of milliseconds of CPU. Run inline on
+    a gevent worker it blocks the hub, and with it every socket and request
+    on that worker. bcrypt releases the GIL while it hashes, so handing the
+    work to real threads keeps the hub responsive and lets hashes run in
+    parallel. Under gevent (threading monkey-patched) the pool is gevent's
+    native ThreadPool, since patched threads would be greenlets.
+
+    At most `threads` hashes run at once and `queue_size` more may wait;
+    beyond that calls fail fast with PasswordHasherBusy instead of queueing
+    without bound during a login spike.
+    """
+
+    def __init__(self, rounds=12, threads=4, queue_size=64, use_gevent=None):
+        self.rounds = rounds
+        self.threads = threads
+        self.queue_size = queue_size
+        self.use_gevent = use_gevent
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(threads + queue_size)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_ROUNDS', self.rounds)
+        self.threads = app.config.get('PASSWORD_HASH_THREADS', self.threads)
+        self.queue_size = app.config.get('PASSWORD_HASH_QUEUE_SIZE', self.queue_size)
+        self._slots = threading.BoundedSemaphore(self.threads + self.queue_size)
+
+    def _get_pool(self):
+        # Created on first use so the threads belong to the worker process (and hub) using them
+        with self._lock:
+            if self._pool is None:
+                use_gevent = _gevent_patched() if self.use_gevent is None else self.use_gevent
+                if use_gevent:
+                    from gevent.threadpool import ThreadPool
+                    self._pool = ThreadPool(self.threads)
+                else:
+                    self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix='password-hasher')
+            return self._pool
+
+    def _run(self, function, *args):
+        """Run function in the pool and wait for it, blocking only the calling greenlet/thread."""
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        
+        try:
+            pool = self._get_pool()
+            if isinstance(pool, ThreadPoolExecutor):
+                return pool.submit(function, *args).result()
+            return pool.apply(function, args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password, password_hash):
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different cost factor than the configured one."""
+        # bcrypt hashes look like $2b$12$<salt+hash>
+        parts = password_hash.split('$')
+        return len(parts) < 4 or parts[2] != f'{self.rounds:02d}'
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,89 @@
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library is used instead
+    orjson = None
+
+
+def encode_value(value):
+    """Encode the non-JSON types models hand over as-is.
+
+    Naive datetimes are UTC throughout the app and get a 'Z' suffix.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.isoformat() + 'Z'
+        return value.isoformat().replace('+00:00', 'Z')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class StdlibCodec:
+    """json module replacement built on the standard library."""
+    name = 'stdlib'
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return json.dumps(obj, default=encode_value, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return json.loads(s)
+
+
+class OrjsonCodec:
+    """json module replacement built on orjson, which encodes datetimes natively."""
+    name = 'orjson'
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(
+            obj,
+            default=encode_value,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
+def get_codec(backend='auto'):
+    """Return the codec for the JSON_BACKEND setting ('auto', 'orjson' or 'stdlib').
+
+    Both codecs produce the same output for the same data, so the choice only
+    affects speed.
+    """
+    if backend == 'stdlib':
+        return StdlibCodec
+    if orjson is None:
+        if backend == 'orjson':
+            raise RuntimeError('JSON_BACKEND is orjson but the orjson package is not installed')
+        return StdlibCodec
+    return OrjsonCodec
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by the configured codec.
+
+    The same codec is given to the Socket.IO server and its message queue, so
+    HTTP responses and socket events share one encoding.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.codec = get_codec(app.config.get('JSON_BACKEND', 'auto'))
+
+    def dumps(self, obj, **kwargs):
+        return self.codec.dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return self.codec.loads(s)
@@ -1,4 +1,5 @@
 import api from './api';
+import socketService from './socket';
 
 const ChannelsAPI = {
   // Get all channels for the user
@@ -55,6 +56,10 @@ const ChannelsAPI = {
   createDirectMessage: async (recipientId) => {
     try {
       const response = await api.post('/channels/direct-messages', { recipient_id: recipientId });
+      // Join the new chat's room now rather than waiting for direct_message_created
+      if (response.data.success) {
+        socketService.joinDirect(response.data.direct_message.id);
+      }
       return response.data;
     } catch (error) {
       throw error.response?.data || { success: false, message: 'Failed to create direct message' };
@@ -1,11 +1,11 @@
 import api from './api';
 
 const MessagesAPI = {
-  // Get channel messages
-  getChannelMessages: async (channelId, page = 1, perPage = 50) => {
+  // Get channel messages, newest first; pass the last result's next_cursor as `before` for older ones
+  getChannelMessages: async (channelId, before = '', perPage = 50) => {
     try {
       const response = await api.get(`/messages/channel/${channelId}`, {
-        params: { page, per_page: perPage }
+        params: { before, per_page: perPage }
       });
       return response.data;
     } catch (error) {
@@ -23,11 +23,11 @@ const MessagesAPI = {
     }
   },
 
-  // Get direct messages
-  getDirectMessages: async (chatId, page = 1, perPage = 50) => {
+  // Get direct messages, newest first; pass the last result's next_cursor as `before` for older ones
+  getDirectMessages: async (chatId, before = '', perPage = 50) => {
     try {
       const response = await api.get(`/messages/direct/${chatId}`, {
-        params: { page, per_page: perPage }
+        params: { before, per_page: perPage }
       });
       return response.data;
     } catch (error) {
@@ -53,6 +53,16 @@ const MessagesAPI = {
     } catch (error) {
       throw error.response?.data || { success: false, message: 'Failed to add reaction' };
     }
+  },
+
+  // Remove the current user's reaction from a message
+  removeReaction: async (messageId, reaction) => {
+    try {
+      const response = await api.delete(`/messages/${messageId}/reactions`, { data: { reaction } });
+      return response.data;
+    } catch (error) {
+      throw error.response?.data || { success: false, message: 'Failed to remove reaction' };
+    }
   }
 };
 
@@ -37,6 +37,11 @@ class SocketService {
         this.connectAttempts = 0;
       });
 
+      // Chats created after connecting: join their room to receive DM events
+      this.socket.on('direct_message_created', (data) => {
+        this.joinDirect(data.direct_message.id);
+      });
+
       this.socket.on('disconnect', (reason) => {
         console.log(`Socket disconnected: ${reason}`);
       });
@@ -91,6 +96,18 @@ class SocketService {
     }
   }
 
+  // Join a direct message chat room
+  joinDirect(chatId) {
+    if (!this.socket || !this.socket.connected) return;
+    
+    try {
+      const token = localStorage.getItem('token');
+      this.socket.emit('join_direct', { chat_id: chatId, token });
+    } catch (error) {
+      console.error(`Error joining chat ${chatId}:`, error);
+    }
+  }
+
   // Other methods remain largely the same, but with better error handling
   leaveChannel(channelId) {
     if (!this.socket || !this.socket.connected) return;
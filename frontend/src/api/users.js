@@ -1,11 +1,12 @@
 import api from './api';
 
 const UsersAPI = {
-  // Get all users (with optional search)
-  getUsers: async (query = '') => {
+  // Search users; without a query returns the first page of the directory.
+  // mode is 'search' (ranked, paginated with cursor) or 'typeahead' (top prefix matches)
+  getUsers: async (query = '', { mode = 'search', cursor, perPage } = {}) => {
     try {
       const response = await api.get('/users', {
-        params: { query }
+        params: { query, mode, cursor, per_page: perPage }
       });
       return response.data;
     } catch (error) {
@@ -1,13 +1,37 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { format } from 'date-fns';
 import { FaSmile, FaEdit, FaTrash } from 'react-icons/fa';
 import EmojiPicker from 'emoji-picker-react';
 import MessagesAPI from '../../api/messages';
 
+// Set one emoji's count in a message's aggregated reactions; `me` is kept when not given
+export const updateReactionCount = (reactions, emoji, count, me) => {
+  let found = false;
+  const next = (reactions || []).map(reaction => {
+    if (reaction.emoji !== emoji) {
+      return reaction;
+    }
+    found = true;
+    return { ...reaction, count, me: me === undefined ? reaction.me : me };
+  });
+
+  if (!found) {
+    next.push({ emoji, count, me: Boolean(me) });
+  }
+
+  return next.filter(reaction => reaction.count > 0);
+};
+
 const MessageItem = ({ message, isOwnMessage, isChannel }) => {
   const [showEmojiPicker, setShowEmojiPicker] = useState(false);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [reactions, setReactions] = useState(message.reactions || []);
+
+  // Reaction events applied by the view replace the local copy
+  useEffect(() => {
+    setReactions(message.reactions || []);
+  }, [message.reactions]);
 
   // Format timestamp
   const formatTime = (timestamp) => {
@@ -26,7 +50,8 @@ const MessageItem = ({ message, isOwnMessage, isChannel }) => {
     setError(null);
 
     try {
-      await MessagesAPI.addReaction(message.id, emojiData.emoji);
+      const result = await MessagesAPI.addReaction(message.id, emojiData.emoji);
+      setReactions(prev => updateReactionCount(prev, emojiData.emoji, result.count, true));
     } catch (err) {
       setError('Failed to add reaction');
       console.error('Error adding reaction:', err);
@@ -35,27 +60,29 @@ const MessageItem = ({ message, isOwnMessage, isChannel }) => {
     }
   };
 
-  // Group reactions by emoji
-  const groupReactions = () => {
-    if (!message.reactions || message.reactions.length === 0) {
-      return [];
+  // Toggle the current user's reaction from a reaction chip
+  const handleReactionClick = async (reaction) => {
+    setLoading(true);
+    setError(null);
+
+    try {
+      const result = reaction.me
+        ? await MessagesAPI.removeReaction(message.id, reaction.emoji)
+        : await MessagesAPI.addReaction(message.id, reaction.emoji);
+
+      // Flip `me` right away so a second click toggles back instead of adding again
+      setReactions(prev => updateReactionCount(prev, reaction.emoji, result.count, !reaction.me));
+    } catch (err) {
+      setError('Failed to update reaction');
+      console.error('Error updating reaction:', err);
+    } finally {
+      setLoading(false);
     }
+  };
 
-    const groups = {};
-    message.reactions.forEach(reaction => {
-      if (!groups[reaction.reaction]) {
-        groups[reaction.reaction] = {
-          emoji: reaction.reaction,
-          count: 0,
-          users: []
-        };
-      }
-      
-      groups[reaction.reaction].count += 1;
-      groups[reaction.reaction].users.push(reaction.user_id);
-    });
-
-    return Object.values(groups);
+  // Reactions arrive already aggregated as { emoji, count, me }
+  const groupReactions = () => {
+    return reactions.filter(reaction => reaction.count > 0);
   };
 
   const groupedReactions = groupReactions();
@@ -121,8 +148,9 @@ const MessageItem = ({ message, isOwnMessage, isChannel }) => {
             {groupedReactions.map((reaction, index) => (
               <div 
                 key={index} 
-                className="flex items-center bg-gray-100 rounded-full px-2 py-1 text-xs cursor-pointer hover:bg-gray-200"
+                className={`flex items-center ${reaction.me ? 'bg-blue-100' : 'bg-gray-100'} rounded-full px-2 py-1 text-xs cursor-pointer hover:bg-gray-200`}
                 title={`${reaction.count} ${reaction.count === 1 ? 'reaction' : 'reactions'}`}
+                onClick={() => !loading && handleReactionClick(reaction)}
               >
                 <span>{reaction.emoji}</span>
                 <span className="ml-1">{reaction.count}</span>
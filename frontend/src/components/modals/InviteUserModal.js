@@ -7,49 +7,45 @@ import { useAuth } from '../../contexts/AuthContext';
 const InviteUserModal = ({ channelId, channelName, onClose }) => {
   const { user: currentUser } = useAuth();
   const [searchQuery, setSearchQuery] = useState('');
-  const [users, setUsers] = useState([]);
   const [filteredUsers, setFilteredUsers] = useState([]);
   const [selectedUsers, setSelectedUsers] = useState([]);
   const [loading, setLoading] = useState(false);
   const [success, setSuccess] = useState(null);
   const [error, setError] = useState(null);
 
-  // Fetch all users
+  // Search users on the server as the query changes (typeahead), or show the
+  // first page of the directory when the query is empty
   useEffect(() => {
+    let cancelled = false;
+    const query = searchQuery.trim();
+
     const fetchUsers = async () => {
       setLoading(true);
       try {
-        const result = await UsersAPI.getUsers();
-        if (result.success) {
+        const result = await UsersAPI.getUsers(query, { mode: 'typeahead', perPage: 20 });
+        if (result.success && !cancelled) {
           // Filter out current user
-          const filteredUsers = result.users.filter(u => u.id !== currentUser?.id);
-          setUsers(filteredUsers);
-          setFilteredUsers(filteredUsers);
+          setFilteredUsers(result.users.filter(u => u.id !== currentUser?.id));
         }
       } catch (err) {
-        setError('Failed to fetch users');
-        console.error('Error fetching users:', err);
+        if (!cancelled) {
+          setError('Failed to fetch users');
+          console.error('Error fetching users:', err);
+        }
       } finally {
-        setLoading(false);
+        if (!cancelled) {
+          setLoading(false);
+        }
       }
     };
 
-    fetchUsers();
-  }, [currentUser?.id]);
-
-  // Filter users based on search query
-  useEffect(() => {
-    if (searchQuery.trim() === '') {
-      setFilteredUsers(users);
-    } else {
-      const query = searchQuery.toLowerCase();
-      const filtered = users.filter(user => 
-        user.username.toLowerCase().includes(query) || 
-        (user.display_name && user.display_name.toLowerCase().includes(query))
-      );
-      setFilteredUsers(filtered);
-    }
-  }, [searchQuery, users]);
+    // Debounce keystrokes
+    const timer = setTimeout(fetchUsers, query ? 150 : 0);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, currentUser?.id]);
 
   // Toggle user selection
   const toggleUserSelection = (userId) => {
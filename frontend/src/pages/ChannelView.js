@@ -4,6 +4,7 @@ import { FaHashtag, FaInfoCircle, FaUserPlus } from 'react-icons/fa';
 import Sidebar from '../components/layout/Sidebar';
 import MessageList from '../components/messages/MessageList';
 import MessageInput from '../components/messages/MessageInput';
+import { updateReactionCount } from '../components/messages/MessageItem';
 import { useAuth } from '../contexts/AuthContext';
 import ChannelsAPI from '../api/channels';
 import MessagesAPI from '../api/messages';
@@ -17,7 +18,7 @@ const ChannelView = () => {
   const [messages, setMessages] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
-  const [page, setPage] = useState(1);
+  const [cursor, setCursor] = useState(null);
   const [hasMore, setHasMore] = useState(true);
   const [typingUsers, setTypingUsers] = useState([]);
   const [showInviteModal, setShowInviteModal] = useState(false);
@@ -51,11 +52,11 @@ const ChannelView = () => {
       setLoading(true);
       setError(null);
       try {
-        const result = await MessagesAPI.getChannelMessages(channelId, 1);
+        const result = await MessagesAPI.getChannelMessages(channelId);
         if (result.success) {
           setMessages(result.messages);
-          setHasMore(result.current_page < result.pages);
-          setPage(1);
+          setHasMore(result.has_more);
+          setCursor(result.next_cursor);
         } else {
           setError(result.message || 'Failed to fetch messages');
         }
@@ -92,35 +93,55 @@ const ChannelView = () => {
       }
     };
 
-    // Typing indicator handler
-    const handleUserTyping = (data) => {
-      if (data.channel_id === parseInt(channelId) && data.user_id !== user?.id) {
-        setTypingUsers(prev => {
-          if (!prev.includes(data.user_id)) {
-            return [...prev, data.user_id];
-          }
-          return prev;
-        });
+    // Batch sends (bots and integrations) arrive as one event per channel, oldest first
+    const handleNewMessages = (data) => {
+      if (data.channel_id === parseInt(channelId)) {
+        setMessages(prevMessages => [...data.messages.slice().reverse(), ...prevMessages]);
       }
     };
 
-    // Stopped typing handler
-    const handleUserStoppedTyping = (data) => {
+    // Typing indicator handler: the server sends coalesced started/stopped deltas per room
+    const handleTypingUpdate = (data) => {
       if (data.channel_id === parseInt(channelId)) {
-        setTypingUsers(prev => prev.filter(id => id !== data.user_id));
+        setTypingUsers(prev => {
+          const next = prev.filter(id => !data.stopped.includes(id));
+          data.typing.forEach(id => {
+            if (id !== user?.id && !next.includes(id)) {
+              next.push(id);
+            }
+          });
+          return next;
+        });
       }
     };
 
+    // Reaction counts are absolute; `me` only changes for the current user's own reactions
+    const applyReaction = (data, added) => {
+      const { message_id: messageId, user_id: userId, reaction: emoji } = data.reaction;
+      const me = userId === user?.id ? added : undefined;
+      setMessages(prevMessages => prevMessages.map(message => (
+        message.id === messageId
+          ? { ...message, reactions: updateReactionCount(message.reactions, emoji, data.count, me) }
+          : message
+      )));
+    };
+    const handleNewReaction = (data) => applyReaction(data, true);
+    const handleReactionRemoved = (data) => applyReaction(data, false);
+
     // Register socket events
     socketService.on('new_message', handleNewMessage);
-    socketService.on('user_typing', handleUserTyping);
-    socketService.on('user_stopped_typing', handleUserStoppedTyping);
+    socketService.on('new_messages', handleNewMessages);
+    socketService.on('typing_update', handleTypingUpdate);
+    socketService.on('new_reaction', handleNewReaction);
+    socketService.on('reaction_removed', handleReactionRemoved);
 
     // Cleanup
     return () => {
       socketService.off('new_message', handleNewMessage);
-      socketService.off('user_typing', handleUserTyping);
-      socketService.off('user_stopped_typing', handleUserStoppedTyping);
+      socketService.off('new_messages', handleNewMessages);
+      socketService.off('typing_update', handleTypingUpdate);
+      socketService.off('new_reaction', handleNewReaction);
+      socketService.off('reaction_removed', handleReactionRemoved);
     };
   }, [channelId, user?.id]);
 
@@ -129,13 +150,13 @@ const ChannelView = () => {
     if (!hasMore || loading) return;
 
     try {
-      const nextPage = page + 1;
-      const result = await MessagesAPI.getChannelMessages(channelId, nextPage);
+      // Messages that arrived since the first load don't shift the cursor, unlike a page number
+      const result = await MessagesAPI.getChannelMessages(channelId, cursor);
       
       if (result.success) {
         setMessages(prevMessages => [...prevMessages, ...result.messages]);
-        setHasMore(result.current_page < result.pages);
-        setPage(nextPage);
+        setHasMore(result.has_more);
+        setCursor(result.next_cursor);
       }
     } catch (err) {
       console.error('Error loading more messages:', err);
@@ -4,6 +4,7 @@ import { FaCircle } from 'react-icons/fa';
 import Sidebar from '../components/layout/Sidebar';
 import MessageList from '../components/messages/MessageList';
 import MessageInput from '../components/messages/MessageInput';
+import { updateReactionCount } from '../components/messages/MessageItem';
 import { useAuth } from '../contexts/AuthContext';
 import ChannelsAPI from '../api/channels';
 import MessagesAPI from '../api/messages';
@@ -17,7 +18,7 @@ const DirectMessageView = () => {
   const [messages, setMessages] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
-  const [page, setPage] = useState(1);
+  const [cursor, setCursor] = useState(null);
   const [hasMore, setHasMore] = useState(true);
   const [isTyping, setIsTyping] = useState(false);
 
@@ -64,11 +65,11 @@ const DirectMessageView = () => {
       setLoading(true);
       setError(null);
       try {
-        const result = await MessagesAPI.getDirectMessages(chatId, 1);
+        const result = await MessagesAPI.getDirectMessages(chatId);
         if (result.success) {
           setMessages(result.messages);
-          setHasMore(result.current_page < result.pages);
-          setPage(1);
+          setHasMore(result.has_more);
+          setCursor(result.next_cursor);
         } else {
           setError(result.message || 'Failed to fetch messages');
         }
@@ -92,30 +93,51 @@ const DirectMessageView = () => {
       }
     };
 
-    // Typing indicator handler
-    const handleUserTyping = (data) => {
-      if (data.chat_id === parseInt(chatId) && data.is_direct && data.user_id !== user?.id) {
-        setIsTyping(true);
+    // Batch sends arrive as one event per chat, oldest first
+    const handleNewMessages = (data) => {
+      if (data.chat_id === parseInt(chatId)) {
+        setMessages(prevMessages => [...data.messages.slice().reverse(), ...prevMessages]);
       }
     };
 
-    // Stopped typing handler
-    const handleUserStoppedTyping = (data) => {
+    // Typing indicator handler: the server sends coalesced started/stopped deltas per chat
+    const handleTypingUpdate = (data) => {
       if (data.chat_id === parseInt(chatId) && data.is_direct) {
-        setIsTyping(false);
+        if (data.typing.some(id => id !== user?.id)) {
+          setIsTyping(true);
+        } else if (data.stopped.some(id => id !== user?.id)) {
+          setIsTyping(false);
+        }
       }
     };
 
+    // Reaction counts are absolute; `me` only changes for the current user's own reactions
+    const applyReaction = (data, added) => {
+      const { message_id: messageId, user_id: userId, reaction: emoji } = data.reaction;
+      const me = userId === user?.id ? added : undefined;
+      setMessages(prevMessages => prevMessages.map(message => (
+        message.id === messageId
+          ? { ...message, reactions: updateReactionCount(message.reactions, emoji, data.count, me) }
+          : message
+      )));
+    };
+    const handleNewReaction = (data) => applyReaction(data, true);
+    const handleReactionRemoved = (data) => applyReaction(data, false);
+
     // Register socket events
     socketService.on('new_direct_message', handleNewMessage);
-    socketService.on('user_typing', handleUserTyping);
-    socketService.on('user_stopped_typing', handleUserStoppedTyping);
+    socketService.on('new_direct_messages', handleNewMessages);
+    socketService.on('typing_update', handleTypingUpdate);
+    socketService.on('new_reaction', handleNewReaction);
+    socketService.on('reaction_removed', handleReactionRemoved);
 
     // Cleanup
     return () => {
       socketService.off('new_direct_message', handleNewMessage);
-      socketService.off('user_typing', handleUserTyping);
-      socketService.off('user_stopped_typing', handleUserStoppedTyping);
+      socketService.off('new_direct_messages', handleNewMessages);
+      socketService.off('typing_update', handleTypingUpdate);
+      socketService.off('new_reaction', handleNewReaction);
+      socketService.off('reaction_removed', handleReactionRemoved);
     };
   }, [chatId, user?.id]);
 
@@ -124,13 +146,13 @@ const DirectMessageView = () => {
     if (!hasMore || loading) return;
 
     try {
-      const nextPage = page + 1;
-      const result = await MessagesAPI.getDirectMessages(chatId, nextPage);
+      // Messages that arrived since the first load don't shift the cursor, unlike a page number
+      const result = await MessagesAPI.getDirectMessages(chatId, cursor);
       
       if (result.success) {
         setMessages(prevMessages => [...prevMessages, ...result.messages]);
-        setHasMore(result.current_page < result.pages);
-        setPage(nextPage);
+        setHasMore(result.has_more);
+        setCursor(result.next_cursor);
       }
     } catch (err) {
       console.error('Error loading more messages:', err);